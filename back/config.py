@@ -17,6 +17,12 @@ class RedisSettings(EnvBaseSettings):
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 1
+    REDIS_MAX_CONNECTIONS: int = 20
+    # Сколько запрос ждет свободное соединение, когда все REDIS_MAX_CONNECTIONS заняты
+    REDIS_POOL_TIMEOUT: float = 5.0
+    # Разрешить portfolio_service включить keyspace-события (CONFIG SET notify-keyspace-events) на общем
+    # сервере для мгновенной инвалидации кеша цен; выключено - кеш проверяет версию снимка раз в секунду
+    REDIS_KEYSPACE_NOTIFICATIONS: bool = False
 
 
 class UserSettings(EnvBaseSettings):
@@ -37,10 +43,75 @@ class PortfolioSettings(EnvBaseSettings):
     DB_PORTFOLIOS_USER: str = "sqluser"
     DB_PORTFOLIOS_PASSWORD: str = "sqlpass"
 
+    # Пересчет стоимости портфеля после запросов пользователя: ждем затишья, но не дольше MAX_DELAY
+    PORTFOLIO_REVALUATION_DEBOUNCE_SECONDS: float = 2.0
+    PORTFOLIO_REVALUATION_MAX_DELAY_SECONDS: float = 10.0
+
+    COINGECKO_API_KEY: str = ""
+    ASSET_CATALOG_URL: str = "https://api.coingecko.com/api/v3/coins/list"
+    ASSET_CATALOG_SYNC_HOURS: int = 24
+    # Новые листинги добавляются, только если входят в топ рейтинга по капитализации; 0 - все
+    ASSET_CATALOG_MAX_RANK: int = 1000
+    # Если из каталога пропала большая доля активов, это скорее сбой провайдера, чем делистинг
+    ASSET_CATALOG_MAX_DELIST_RATIO: float = 0.1
+
+    # Архив истории market_data_service (том только для чтения); цены старше истории в Redis
+    # берутся оттуда. Пустая строка - только Redis
+    MARKET_ARCHIVE_DIR: str = "/data/market_archive"
+
+    @property
+    def DB_URL(self):
+        return (f"postgresql+asyncpg://{self.DB_PORTFOLIOS_USER}:{self.DB_PORTFOLIOS_PASSWORD}@"
+                f"{self.DB_PORTFOLIOS_HOST}:{self.DB_PORTFOLIOS_PORT}/{self.DB_PORTFOLIOS_NAME}")
+
 
 class MarketDataSettings(EnvBaseSettings):
     COINGECKO_API_KEY: str
     COINGECKO_URL: str
+    COINGECKO_MAX_IDS_LENGTH: int = 1500
+    COINGECKO_MAX_CONCURRENCY: int = 3
+    COINGECKO_REQUESTS_PER_MINUTE: int = 30
+    COINGECKO_MAX_RETRIES: int = 3
+    COINGECKO_TIMEOUT: float = 10.0
+
+    # Провайдеры цен по убыванию приоритета: coingecko, file
+    MARKET_PROVIDERS: str = "coingecko"
+    # Валюты котировок; USD - базовая, остальные хранятся курсами в market_data:fx
+    MARKET_QUOTE_CURRENCIES: str = "usd,eur,rub"
+    MARKET_PRICES_FILE: str = "market_prices.json"
+    MARKET_PROVIDER_COOLDOWN_SECONDS: float = 30.0
+
+    MARKET_RANKINGS_PAGES: int = 4
+    MARKET_RANKINGS_PER_PAGE: int = 250
+    MARKET_RANKINGS_REFRESH_MINUTES: int = 10
+
+    MARKET_DATA_API_HOST: str = "0.0.0.0"
+    MARKET_DATA_API_PORT: int = 8003
+
+    MARKET_UNIVERSE_REFRESH_MINUTES: int = 30
+    MARKET_RETIER_MINUTES: int = 15
+    MARKET_STALE_AFTER_MINUTES: int = 30
+    # Должно быть меньше интервала самого частого уровня, чтобы резерв успевал подхватить обновления
+    MARKET_LEADER_LEASE_SECONDS: float = 30
+    MARKET_REFRESH_BUDGET_PER_MINUTE: float = 20
+
+    MARKET_OUTLIER_WINDOW: int = 30
+    MARKET_OUTLIER_MIN_SAMPLES: int = 5
+    MARKET_OUTLIER_THRESHOLD: float = 6.0
+    MARKET_OUTLIER_MIN_DEVIATION: float = 0.005
+    MARKET_OUTLIER_CONFIRM_TOLERANCE: float = 0.02
+
+    # Сроки хранения в Redis рассчитаны на архив: старая история читается из MARKET_ARCHIVE_DIR.
+    # Без архива их стоит увеличить (раньше было 168 ч, 90 и 1095 дней)
+    MARKET_HISTORY_RETENTION_HOURS: int = 48
+    MARKET_CANDLES_5M_RETENTION_DAYS: int = 3
+    MARKET_CANDLES_1H_RETENTION_DAYS: int = 14
+    MARKET_CANDLES_1D_RETENTION_DAYS: int = 90
+
+    # Колоночный архив истории
+    MARKET_ARCHIVE_DIR: str = "/data/market_archive"
+    MARKET_ARCHIVE_INTERVAL_MINUTES: int = 60
+    MARKET_ARCHIVE_SETTLE_MINUTES: int = 60
 
 
 class NotificationSettings(EnvBaseSettings):
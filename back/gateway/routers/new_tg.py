@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
+import httpx
+from fastapi import APIRouter, HTTPException, Request, Depends, Header, Response
 
 from back.gateway.schemas import STransactionCreate
 from back.gateway.service import ServiceClient
@@ -7,6 +8,7 @@ from back.gateway.service import ServiceClient
 SERVICES = {
     "portfolio": "http://portfolio_app:8000",
     "user": "http://user_app:8001",
+    "market_data": "http://market_data_app:8003",
 }
 
 # Маршрутизатор
@@ -38,6 +40,44 @@ async def telegram_login(
     )
 
 
+# Заголовки ответа market data сервиса, которые нужны клиенту для условных запросов
+CACHE_HEADERS = ("ETag", "Cache-Control")
+
+
+def proxy_response(upstream: httpx.Response) -> Response:
+    """Ответ сервиса как есть: статус (в том числе 304), тело и заголовки кэширования"""
+    headers = {name: upstream.headers[name] for name in CACHE_HEADERS if name in upstream.headers}
+    if upstream.status_code == 304:
+        return Response(status_code=304, headers=headers)
+    return Response(content=upstream.content, status_code=upstream.status_code, headers=headers,
+                    media_type=upstream.headers.get("content-type"))
+
+
+@router.get("/prices")
+async def get_prices(
+        ids: str | None = None,
+        if_none_match: str | None = Header(default=None),
+        client: ServiceClient = Depends(get_service_client)
+):
+    """Текущие цены активов из снимка market data сервиса (ids через запятую); поддерживает If-None-Match"""
+    params = {"ids": ids} if ids else None
+    headers = {"If-None-Match": if_none_match} if if_none_match else None
+    return proxy_response(await client.send("GET", service="market_data", endpoint="/prices/",
+                                            params=params, headers=headers))
+
+
+@router.get("/prices/{asset}")
+async def get_price(
+        asset: str,
+        if_none_match: str | None = Header(default=None),
+        client: ServiceClient = Depends(get_service_client)
+):
+    """Текущая цена одного актива; поддерживает If-None-Match"""
+    headers = {"If-None-Match": if_none_match} if if_none_match else None
+    return proxy_response(await client.send("GET", service="market_data", endpoint=f"/prices/{asset}",
+                                            headers=headers))
+
+
 @router.get("/users/{tg_id}")
 async def get_user_by_tg(
         tg_id: int,
@@ -122,6 +162,7 @@ async def verify_email_code(
 @router.get("/portfolio/{tg_id}")
 async def get_portfolio_by_tg(
         tg_id: int,
+        currency: str = "usd",
         client: ServiceClient = Depends(get_service_client)
 ):
     """Получение портфеля пользователя по Telegram ID"""
@@ -137,6 +178,7 @@ async def get_portfolio_by_tg(
     return await client.get(
         service="portfolio",
         endpoint=f"/portfolio/by_user_id/{user_id}",
+        params={"currency": currency},
         headers={"X-User-ID": str(user_id)}
     )
 
@@ -145,13 +187,14 @@ async def get_portfolio_by_tg(
 async def get_assets(
         portfolio_id: int,
         user_id: int,
+        currency: str = "usd",
         client: ServiceClient = Depends(get_service_client)
 ):
     """Получение активов портфеля"""
     return await client.get(
         service="portfolio",
         endpoint=f"/portfolio_assets/{portfolio_id}",
-        params={"user_id": user_id},
+        params={"user_id": user_id, "currency": currency},
         headers={"X-User-ID": str(user_id)}
     )
 
@@ -180,3 +223,20 @@ async def post_transaction(
         headers={"X-User-ID": str(user_id)},
         json_data=transaction.model_dump()
     )
+
+
+@router.post("/portfolio/{portfolio_id}/transactions/bulk")
+async def post_transactions_bulk(
+        transactions: list[STransactionCreate],
+        portfolio_id: int,
+        user_id: int,
+        client: ServiceClient = Depends(get_service_client)
+):
+    """Пакетный импорт транзакций; цена без указания берется из истории на дату транзакции"""
+    return await client.post(
+        service="portfolio",
+        endpoint="/transactions/bulk",
+        params={"user_id": user_id, "portfolio_id": portfolio_id},
+        headers={"X-User-ID": str(user_id)},
+        json_data=[transaction.model_dump() for transaction in transactions]
+    )
@@ -40,7 +40,7 @@ class STransactionCreate(BaseModel):
     asset_id: int
     quantity: float
     transaction_type: TransactionType
-    price: float
+    price: float | None = None
     transaction_date: datetime
 
     @field_validator("transaction_date")
@@ -18,7 +18,7 @@ class ServiceClient:
     async def close(self):
         await self.client.aclose()
 
-    async def request(
+    async def send(
             self,
             method: str,
             service: str,
@@ -30,9 +30,10 @@ class ServiceClient:
             content: Optional[Union[str, bytes]] = None,
             data: Optional[Dict[str, Any]] = None,
             files: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
+    ) -> httpx.Response:
         """
-        Выполняет запрос к микросервису и обрабатывает ошибки
+        Выполняет запрос к микросервису и возвращает ответ как есть; ошибки сервиса
+        превращаются в HTTPException. 304 Not Modified ошибкой не считается.
 
         Args:
             method: HTTP метод (GET, POST, PUT, DELETE, etc.)
@@ -47,7 +48,7 @@ class ServiceClient:
             files: Файлы для отправки
 
         Returns:
-            Dict[str, Any]: Ответ сервиса в формате JSON
+            httpx.Response: Ответ сервиса
         """
         if service not in self.services:
             raise ValueError(f"Неизвестный сервис: {service}")
@@ -73,16 +74,9 @@ class ServiceClient:
                 data=data,
                 files=files
             )
-            response.raise_for_status()
-
-            if response.headers.get("content-type", "").startswith("application/json"):
-                return response.json()
-            else:
-                return {
-                    "content": response.text,
-                    "headers": dict(response.headers),
-                    "status_code": response.status_code
-                }
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
 
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP ошибка: {e.response.status_code} - {e.response.text}")
@@ -91,9 +85,6 @@ class ServiceClient:
             except json.JSONDecodeError:
                 detail = e.response.text or str(e)
             raise HTTPException(status_code=e.response.status_code, detail=detail)
-        except json.JSONDecodeError as e:
-            logger.error(f"Ошибка декодирования JSON: {str(e)} - {response.text}")
-            raise HTTPException(status_code=500, detail=f"Недопустимый JSON ответ: {response.text}")
         except httpx.RequestError as e:
             logger.error(f"Ошибка запроса: {str(e)}")
             raise HTTPException(status_code=503, detail=f"Сервис недоступен: {str(e)}")
@@ -101,6 +92,35 @@ class ServiceClient:
             logger.exception(f"Неожиданная ошибка: {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
 
+    async def request(self, method: str, service: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """
+        Выполняет запрос к микросервису и обрабатывает ошибки
+
+        Args:
+            method: HTTP метод (GET, POST, PUT, DELETE, etc.)
+            service: Имя сервиса из конфигурации
+            endpoint: Путь эндпоинта
+            **kwargs: Параметры запроса, как у send
+
+        Returns:
+            Dict[str, Any]: Ответ сервиса в формате JSON
+        """
+        response = await self.send(method, service, endpoint, **kwargs)
+
+        try:
+            if response.headers.get("content-type", "").startswith("application/json"):
+                return response.json()
+            else:
+                return {
+                    "content": response.text,
+                    "headers": dict(response.headers),
+                    "status_code": response.status_code
+                }
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Ошибка декодирования JSON: {str(e)} - {response.text}")
+            raise HTTPException(status_code=500, detail=f"Недопустимый JSON ответ: {response.text}")
+
     async def get(self, service: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         return await self.request("GET", service, endpoint, **kwargs)
 
@@ -0,0 +1,118 @@
+import logging
+from datetime import datetime
+
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
+
+from back.market_data_service.metrics import MarketDataMetrics
+from back.market_data_service.redis import RedisClient
+from back.market_data_service.snapshot_format import MarketSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+prices_router = APIRouter(
+    prefix="/prices",
+    tags=["prices"],
+)
+
+
+def snapshot_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def serialize_record(record: tuple[float, float, float]) -> dict:
+    current_price, usd_24h_change, last_updated = record
+    return {
+        "current_price": current_price,
+        "usd_24h_change": usd_24h_change,
+        "last_updated": datetime.fromtimestamp(last_updated).isoformat(),
+    }
+
+
+async def read_snapshot(request: Request, response: Response, if_none_match: str | None) -> MarketSnapshot | None:
+    """
+    Возвращает снимок рынка или None, если у клиента уже актуальная версия (ответ 304).
+    Проверка версии - один GET, сам снимок читается только если он изменился.
+    """
+    redis_client: RedisClient = request.app.state.redis_client
+
+    version = await redis_client.get_snapshot_version()
+    if not version:
+        raise HTTPException(status_code=503, detail="Market data snapshot is not available yet")
+
+    etag = snapshot_etag(version)
+    if if_none_match == etag:
+        return None
+
+    snapshot = await redis_client.get_snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Market data snapshot is not available yet")
+
+    response.headers["ETag"] = snapshot_etag(snapshot.version)
+    response.headers["Cache-Control"] = "no-cache"
+    return snapshot
+
+
+@prices_router.get("/")
+async def get_prices(request: Request, response: Response, ids: str | None = None,
+                     if_none_match: str | None = Header(default=None)):
+    """Цены нескольких активов одним запросом; без ids - все активы снимка"""
+    snapshot = await read_snapshot(request, response, if_none_match)
+    if snapshot is None:
+        return Response(status_code=304, headers={"ETag": if_none_match})
+
+    requested = [asset for asset in ids.split(",") if asset] if ids else snapshot.assets
+    prices, missing = {}, []
+    for asset in requested:
+        record = snapshot.get(asset)
+        if record is None:
+            missing.append(asset)
+        else:
+            prices[asset] = serialize_record(record)
+
+    return {
+        "version": snapshot.version,
+        "updated_at": datetime.fromtimestamp(snapshot.updated_at).isoformat(),
+        "prices": prices,
+        "missing": missing,
+    }
+
+
+@prices_router.get("/{asset}")
+async def get_price(asset: str, request: Request, response: Response,
+                    if_none_match: str | None = Header(default=None)):
+    snapshot = await read_snapshot(request, response, if_none_match)
+    if snapshot is None:
+        return Response(status_code=304, headers={"ETag": if_none_match})
+
+    record = snapshot.get(asset)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No market data for {asset}")
+
+    return {"asset": asset, "version": snapshot.version, **serialize_record(record)}
+
+
+monitoring_router = APIRouter(tags=["monitoring"])
+
+
+@monitoring_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    metrics: MarketDataMetrics = request.app.state.metrics
+    return metrics.render()
+
+
+@monitoring_router.get("/health")
+async def get_health(request: Request):
+    """Свежесть данных: последний цикл обновления и число устаревших активов"""
+    metrics: MarketDataMetrics = request.app.state.metrics
+    return {**metrics.health(), "stale_assets": sorted(metrics.stale_assets)}
+
+
+def create_market_data_app(redis_client: RedisClient, metrics: MarketDataMetrics) -> FastAPI:
+    app = FastAPI(title="Market Data Service")
+    app.state.redis_client = redis_client
+    app.state.metrics = metrics
+    app.include_router(prices_router)
+    app.include_router(monitoring_router)
+    return app
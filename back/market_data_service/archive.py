@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+
+from back.market_data_service.archive_format import TICKS, ArchiveWriter, candles_kind
+from back.market_data_service.candles import CANDLE_RESOLUTIONS
+from back.market_data_service.leader import LeaderLease
+from back.market_data_service.redis import RedisClient
+from back.market_data_service.universe import AssetUniverse
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataArchiver:
+    """
+    Переносит историю из Redis в колоночный архив до того, как ее обрежет срок хранения.
+
+    Каждый запуск дописывает тики и закрытые свечи новее последней строки архива, так что в Redis
+    можно держать только недавнюю историю. Отсюда архив только дописывается; историю старше
+    уже архивированной вставляет backfill через ArchiveWriter.merge.
+    """
+
+    def __init__(self, redis_client: RedisClient, writer: ArchiveWriter, universe: AssetUniverse,
+                 lease: LeaderLease = None, settle_seconds: float = 60 * 60, batch_size: int = 200,
+                 resolutions: dict[str, int] = None):
+        self.redis_client = redis_client
+        self.writer = writer
+        self.universe = universe
+        self.lease = lease
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self.resolutions = resolutions or CANDLE_RESOLUTIONS
+
+    def _write(self, kind: str, rows_by_asset: dict[str, list[tuple[float, ...]]]) -> int:
+        return sum(self.writer.append(kind, asset, rows) for asset, rows in rows_by_asset.items())
+
+    def _marks(self, kind: str, assets: list[str]) -> dict[str, float]:
+        marks = {}
+        for asset in assets:
+            last = self.writer.last_timestamp(kind, asset)
+            if last is not None:
+                marks[asset] = last
+        return marks
+
+    async def _archive_batch(self, assets: list[str], now: float) -> int:
+        marks = await asyncio.to_thread(self._marks, TICKS, assets)
+        ticks = await self.redis_client.get_history_ranges(assets, marks, now - self.settle_seconds)
+        written = await asyncio.to_thread(self._write, TICKS, ticks)
+
+        for resolution, seconds in self.resolutions.items():
+            kind = candles_kind(resolution)
+            marks = await asyncio.to_thread(self._marks, kind, assets)
+            # Открытая свеча еще меняется, в архив идут только закрытые
+            candles = await self.redis_client.get_candle_ranges(resolution, assets, marks, now - seconds)
+            written += await asyncio.to_thread(self._write, kind, {
+                asset: [(candle.start, candle.open, candle.high, candle.low, candle.close) for candle in rows]
+                for asset, rows in candles.items()
+            })
+        return written
+
+    async def archive(self):
+        if self.lease and not self.lease.is_leader:
+            return
+
+        try:
+            started = time.perf_counter()
+            now = time.time()
+            assets = list(self.universe.assets)
+            written = 0
+            for i in range(0, len(assets), self.batch_size):
+                written += await self._archive_batch(assets[i:i + self.batch_size], now)
+            logger.info(f"Archived {written} rows for {len(assets)} assets "
+                        f"in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Error during market data archiving: {e}")
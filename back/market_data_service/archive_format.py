@@ -0,0 +1,272 @@
+"""
+Колоночный архив истории цен на диске.
+
+Раскладка: {root}/{kind}/{asset}/{YYYY-MM}/{column}.f64, kind - ticks или candles_{resolution}.
+Каждая колонка - плоский массив float64 в порядке времени. Служебные файлы писателя
+(блокировка, временные партиции) начинаются с точки и читателем не видны.
+
+Модуль не зависит ни от чего, кроме stdlib, чтобы архив мог читать portfolio_service
+(том смонтирован в него только для чтения).
+"""
+import fcntl
+import mmap
+import os
+import shutil
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+TICKS = "ticks"
+TICK_COLUMNS = ("timestamp", "price")
+CANDLE_COLUMNS = ("timestamp", "open", "high", "low", "close")
+COLUMN_TYPECODE = "d"
+COLUMN_ITEMSIZE = array(COLUMN_TYPECODE).itemsize
+
+
+def candles_kind(resolution: str) -> str:
+    return f"candles_{resolution}"
+
+
+def kind_columns(kind: str) -> tuple[str, ...]:
+    return TICK_COLUMNS if kind == TICKS else CANDLE_COLUMNS
+
+
+def month_of(timestamp: float) -> str:
+    tm = time.gmtime(timestamp)
+    return f"{tm.tm_year:04d}-{tm.tm_mon:02d}"
+
+
+@dataclass
+class ArchiveSegment:
+    """Строки одной месячной партиции в [start, end); колонки - memoryview поверх mmap, без копирования"""
+    month: str
+    columns: dict[str, memoryview]
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+
+class ArchiveReader:
+    """
+    Чтение колоночного архива истории.
+
+    Колонки отсортированы по времени, поэтому диапазон ищется бинарным
+    поиском по колонке timestamp, а колонки отдаются срезами memoryview поверх mmap: читаются
+    только страницы, которые действительно затронуты.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _asset_dir(self, kind: str, asset: str) -> str:
+        if not asset or "/" in asset or asset.startswith("."):
+            raise ValueError(f"Invalid asset id for archive: {asset!r}")
+        return os.path.join(self.root, kind, asset)
+
+    def _column_path(self, kind: str, asset: str, month: str, column: str) -> str:
+        return os.path.join(self._asset_dir(kind, asset), month, f"{column}.f64")
+
+    def months(self, kind: str, asset: str) -> list[str]:
+        try:
+            return sorted(name for name in os.listdir(self._asset_dir(kind, asset)) if not name.startswith("."))
+        except FileNotFoundError:
+            return []
+
+    def _rows(self, kind: str, asset: str, month: str) -> int:
+        """Число целых строк партиции: колонки дописываются по очереди, после падения длины могут разойтись"""
+        sizes = []
+        for column in kind_columns(kind):
+            try:
+                sizes.append(os.path.getsize(self._column_path(kind, asset, month, column)))
+            except FileNotFoundError:
+                return 0
+        return min(sizes) // COLUMN_ITEMSIZE
+
+    def _map_column(self, path: str, rows: int) -> memoryview:
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # memoryview держит ссылку на mmap, отображение живет, пока живут срезы
+        return memoryview(mapped)[:rows * COLUMN_ITEMSIZE].cast(COLUMN_TYPECODE)
+
+    def first_timestamp(self, kind: str, asset: str) -> float | None:
+        for month in self.months(kind, asset):
+            if self._rows(kind, asset, month):
+                with open(self._column_path(kind, asset, month, "timestamp"), "rb") as file:
+                    return array(COLUMN_TYPECODE, file.read(COLUMN_ITEMSIZE))[0]
+        return None
+
+    def last_timestamp(self, kind: str, asset: str) -> float | None:
+        for month in reversed(self.months(kind, asset)):
+            rows = self._rows(kind, asset, month)
+            if rows:
+                path = self._column_path(kind, asset, month, "timestamp")
+                with open(path, "rb") as file:
+                    file.seek((rows - 1) * COLUMN_ITEMSIZE)
+                    return array(COLUMN_TYPECODE, file.read(COLUMN_ITEMSIZE))[0]
+        return None
+
+    def scan(self, kind: str, asset: str, start: float, end: float, columns: tuple[str, ...] = None):
+        """
+        Итератор по партициям с данными в [start, end).
+
+        Yields:
+            ArchiveSegment: Срезы колонок одной партиции
+        """
+        columns = columns or kind_columns(kind)
+        for month in self.months(kind, asset):
+            # Партиция целиком вне диапазона - даже не открываем
+            if month < month_of(start) or month > month_of(end):
+                continue
+            rows = self._rows(kind, asset, month)
+            if not rows:
+                continue
+
+            timestamps = self._map_column(self._column_path(kind, asset, month, "timestamp"), rows)
+            first, last = bisect_left(timestamps, start), bisect_left(timestamps, end)
+            if first == last:
+                continue
+            yield ArchiveSegment(month, {
+                column: (timestamps if column == "timestamp"
+                         else self._map_column(self._column_path(kind, asset, month, column), rows))[first:last]
+                for column in columns
+            })
+
+    def read(self, kind: str, asset: str, start: float, end: float, columns: tuple[str, ...] = None) -> dict:
+        """Диапазон, склеенный в array по колонкам; для небольших диапазонов, где копия не страшна"""
+        columns = columns or kind_columns(kind)
+        result = {column: array(COLUMN_TYPECODE) for column in columns}
+        for segment in self.scan(kind, asset, start, end, columns):
+            for column in columns:
+                result[column].frombytes(segment.columns[column].cast("B"))
+        return result
+
+
+class ArchiveWriter(ArchiveReader):
+    """
+    Запись в архив. Новые строки дописываются в конец месячных партиций (append), строки
+    задним числом вставляются переписыванием затронутых партиций (merge).
+
+    Сервис и backfill пишут из разных процессов, поэтому запись в архив актива идет под
+    flock на {kind}/{asset}/.lock.
+    """
+
+    @contextmanager
+    def _locked(self, kind: str, asset: str):
+        asset_dir = self._asset_dir(kind, asset)
+        os.makedirs(asset_dir, exist_ok=True)
+        with open(os.path.join(asset_dir, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._recover(asset_dir)
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _recover(asset_dir: str):
+        """Доводит до конца замену партиции, прерванную падением (см. _replace_partition)"""
+        for name in os.listdir(asset_dir):
+            path = os.path.join(asset_dir, name)
+            if name.endswith(".tmp"):
+                shutil.rmtree(path)
+            elif name.endswith(".old"):
+                month_dir = os.path.join(asset_dir, name[1:-len(".old")])
+                if os.path.exists(month_dir):
+                    shutil.rmtree(path)
+                else:
+                    os.rename(path, month_dir)
+
+    def _partition_rows(self, kind: str, asset: str, month: str) -> list[tuple[float, ...]]:
+        rows = self._rows(kind, asset, month)
+        if not rows:
+            return []
+        columns = [self._map_column(self._column_path(kind, asset, month, column), rows).tolist()
+                   for column in kind_columns(kind)]
+        return list(zip(*columns))
+
+    def _replace_partition(self, kind: str, asset: str, month: str, rows: list[tuple[float, ...]]):
+        """
+        Пишет партицию во временный каталог и подменяет ею старую двумя rename. Читатели, уже
+        отобразившие старые файлы, дочитывают их; если процесс упадет между rename, партицию
+        вернет _recover при следующей записи.
+        """
+        asset_dir = self._asset_dir(kind, asset)
+        month_dir = os.path.join(asset_dir, month)
+        tmp_dir, old_dir = os.path.join(asset_dir, f".{month}.tmp"), os.path.join(asset_dir, f".{month}.old")
+        os.makedirs(tmp_dir)
+        for i, column in enumerate(kind_columns(kind)):
+            with open(os.path.join(tmp_dir, f"{column}.f64"), "wb") as file:
+                array(COLUMN_TYPECODE, (row[i] for row in rows)).tofile(file)
+                file.flush()
+                os.fsync(file.fileno())
+
+        if os.path.exists(month_dir):
+            os.rename(month_dir, old_dir)
+        os.rename(tmp_dir, month_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @staticmethod
+    def _by_month(rows: list[tuple[float, ...]]) -> dict[str, list[tuple[float, ...]]]:
+        partitions: dict[str, list[tuple[float, ...]]] = {}
+        for row in rows:
+            partitions.setdefault(month_of(row[0]), []).append(row)
+        return partitions
+
+    def append(self, kind: str, asset: str, rows: list[tuple[float, ...]]) -> int:
+        """
+        Дописывает строки новее последней записанной; более старые пропускаются.
+
+        Args:
+            rows: Строки в порядке kind_columns, отсортированные по времени
+
+        Returns:
+            int: Сколько строк дописано
+        """
+        if not rows:
+            return 0
+        with self._locked(kind, asset):
+            last = self.last_timestamp(kind, asset)
+            if last is not None:
+                rows = [row for row in rows if row[0] > last]
+
+            columns = kind_columns(kind)
+            for month, partition_rows in self._by_month(rows).items():
+                os.makedirs(os.path.join(self._asset_dir(kind, asset), month), exist_ok=True)
+                complete_bytes = self._rows(kind, asset, month) * COLUMN_ITEMSIZE
+                for i, column in enumerate(columns):
+                    with open(self._column_path(kind, asset, month, column), "ab") as file:
+                        # Хвост от прерванной записи отрезаем, чтобы колонки оставались одной длины
+                        if file.tell() != complete_bytes:
+                            file.truncate(complete_bytes)
+                            file.seek(complete_bytes)
+                        array(COLUMN_TYPECODE, (row[i] for row in partition_rows)).tofile(file)
+        return len(rows)
+
+    def merge(self, kind: str, asset: str, rows: list[tuple[float, ...]]) -> int:
+        """
+        Вставляет строки в любое место архива, в том числе в прошлые месяцы (backfill).
+
+        Каждая затронутая партиция переписывается целиком, поэтому для потока свежих данных
+        нужен append. Строки с уже записанным timestamp пропускаются: данные сервиса важнее
+        догруженных.
+
+        Returns:
+            int: Сколько строк добавлено
+        """
+        added = 0
+        if not rows:
+            return added
+        with self._locked(kind, asset):
+            for month, partition_rows in self._by_month(rows).items():
+                existing = self._partition_rows(kind, asset, month)
+                written = {row[0] for row in existing}
+                new_rows = {row[0]: row for row in partition_rows if row[0] not in written}
+                if not new_rows:
+                    continue
+                self._replace_partition(kind, asset, month,
+                                        sorted(existing + list(new_rows.values()), key=lambda row: row[0]))
+                added += len(new_rows)
+        return added
@@ -0,0 +1,300 @@
+"""
+Догрузка истории цен для активов из таблицы assets.
+
+История каждого актива запрашивается кусками по --chunk-days дней (на интервале 2-90 дней
+CoinGecko отдает часовые цены) от --days дней назад до начала уже записанных данных,
+сворачивается в свечи 1h/1d и пишется в Redis одной транзакцией на кусок. Вместе с куском
+в market_data:backfill:checkpoint сохраняется прогресс, поэтому повторный запуск после
+падения продолжает с последнего записанного куска.
+
+В Redis попадает только то, что укладывается в его сроки хранения; более старая история
+пишется прямо в колоночный архив (--archive-dir, по умолчанию MARKET_ARCHIVE_DIR). Без архива
+--days ограничивается самым длинным сроком хранения свечей.
+
+    python -m back.market_data_service.backfill --days 365
+    python -m back.market_data_service.backfill --source file --file history.json --assets bitcoin,ethereum
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from back.market_data_service.archive_format import TICKS, ArchiveWriter, candles_kind
+from back.market_data_service.candles import CANDLE_RESOLUTIONS, Candle, CandleAggregator
+from back.market_data_service.main_market_data import create_coingecko_fetcher, create_redis_client, \
+    market_data_settings, portfolio_settings
+from back.market_data_service.market_data_fetcher import MarketDataFetcher
+from back.market_data_service.redis import RedisClient
+from back.market_data_service.universe import AssetUniverse
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = CANDLE_RESOLUTIONS["1d"]
+
+
+def align_to_day(timestamp: float) -> float:
+    return float(int(timestamp) - int(timestamp) % DAY_SECONDS)
+
+
+class CoinGeckoHistorySource:
+    """История из coins/{id}/market_chart/range, в пределах бюджета запросов общего клиента"""
+
+    def __init__(self, fetcher: MarketDataFetcher):
+        self.fetcher = fetcher
+
+    async def fetch_range(self, asset: str, start: float, end: float) -> list[tuple[float, float]] | None:
+        """
+        Returns:
+            list | None: [(timestamp, price), ...] по времени, None если запрос не удался
+        """
+        stats, prices = await self.fetcher.fetch_price_range(asset, start, end)
+        if stats.error:
+            logger.error(f"Failed to fetch history for {asset}: {stats.error}")
+            return None
+        return sorted(prices)
+
+    async def close(self):
+        await self.fetcher.close()
+
+
+class FileHistorySource:
+    """
+    История из JSON-файла: {asset: [[timestamp_ms, price], ...]} или {asset: {"prices": [...]}},
+    то есть ответы market_chart, сложенные по id актива.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._history: dict[str, list[tuple[float, float]]] | None = None
+        self._lock = asyncio.Lock()
+
+    def _read(self) -> dict[str, list[tuple[float, float]]]:
+        with open(self.path) as file:
+            data = json.load(file)
+
+        history = {}
+        for asset, points in data.items():
+            if isinstance(points, dict):
+                points = points.get("prices", [])
+            history[asset] = sorted((timestamp / 1000, float(price)) for timestamp, price in points
+                                    if price is not None)
+        return history
+
+    async def fetch_range(self, asset: str, start: float, end: float) -> list[tuple[float, float]] | None:
+        async with self._lock:
+            if self._history is None:
+                self._history = await asyncio.to_thread(self._read)
+                logger.info(f"Loaded history of {len(self._history)} assets from {self.path}")
+
+        points = self._history.get(asset, [])
+        return points[bisect_left(points, (start,)):bisect_left(points, (end,))]
+
+    async def close(self):
+        pass
+
+
+class HistoryBackfill:
+    """
+    Догружает историю активов кусками фиксированной длины.
+
+    Куски выровнены по суткам, поэтому каждая свеча 1h/1d целиком строится из одного куска
+    и перезапись куска не портит соседние. Активы обрабатываются параллельно (не больше
+    concurrency одновременно), куски одного актива - по порядку, чтобы чекпоинт был
+    одним моментом времени "записано до".
+
+    Данные старше сроков хранения Redis уходят в archive, если он задан, иначе глубина
+    догрузки ограничивается самым длинным сроком хранения свечей.
+    """
+
+    def __init__(self, source, redis_client: RedisClient, days: int, chunk_days: int = 30,
+                 concurrency: int = 3, resolutions: tuple[str, ...] = ("1h", "1d"), archive: ArchiveWriter = None):
+        self.source = source
+        self.redis_client = redis_client
+        self.archive = archive
+        self.days = days
+        self.chunk_seconds = chunk_days * DAY_SECONDS
+        self.concurrency = concurrency
+        self.resolutions = {resolution: CANDLE_RESOLUTIONS[resolution] for resolution in resolutions}
+
+    @staticmethod
+    def plan(start: float, live_start: float, checkpoint: tuple[float, float, float] | None) -> tuple:
+        """
+        Интервал догрузки актива с учетом чекпоинта прошлого запуска.
+
+        Args:
+            start: Начало запрошенной истории
+            live_start: Выровненное начало данных, записанных сервисом (или текущие сутки)
+            checkpoint: (start, done_until, end) прошлого запуска
+
+        Returns:
+            tuple: (range_start, resume_from, range_end)
+        """
+        if checkpoint is None:
+            return start, start, live_start
+
+        checkpoint_start, done_until, checkpoint_end = checkpoint
+        if checkpoint_start <= start:
+            # Прошлый запуск уже покрывает запрошенную глубину: продолжаем с места остановки
+            return checkpoint_start, max(start, done_until), checkpoint_end
+        if done_until >= checkpoint_end:
+            # Запрошена более глубокая история: догружаем только то, что раньше прошлого интервала
+            return start, start, checkpoint_start
+        return start, start, checkpoint_end
+
+    def build_candles(self, asset: str, ticks: list[tuple[float, float]]) -> list[tuple[str, Candle]]:
+        aggregator = CandleAggregator(self.resolutions)
+        candles = {}
+        for timestamp, price in ticks:
+            for resolution, _, candle in aggregator.add_tick(asset, timestamp, price):
+                candles[(resolution, candle.start)] = candle
+        return [(resolution, candle) for (resolution, _), candle in candles.items()]
+
+    def max_days(self) -> int | None:
+        """Глубина истории, которую можно хранить без архива; None - Redis хранит свечи бессрочно"""
+        retention = self.redis_client.candle_retention_seconds
+        if any(not retention.get(resolution) for resolution in self.resolutions):
+            return None
+        return max(retention[resolution] for resolution in self.resolutions) // DAY_SECONDS
+
+    def split_chunk(self, ticks: list[tuple[float, float]], candles: list[tuple[str, Candle]],
+                    now: float) -> tuple[list, list, dict[str, list[tuple[float, ...]]]]:
+        """
+        Делит кусок на то, что остается в Redis, и то, что старше его сроков хранения.
+
+        Returns:
+            tuple: (тики для Redis, свечи для Redis, {kind: строки} для архива)
+        """
+        history_cutoff = now - self.redis_client.history_retention_seconds
+        retention = self.redis_client.candle_retention_seconds
+        redis_candles, archived = [], {TICKS: [tick for tick in ticks if tick[0] < history_cutoff]}
+        for resolution, candle in candles:
+            if not retention.get(resolution) or candle.start >= now - retention[resolution]:
+                redis_candles.append((resolution, candle))
+            else:
+                archived.setdefault(candles_kind(resolution), []).append(
+                    (candle.start, candle.open, candle.high, candle.low, candle.close))
+        return [tick for tick in ticks if tick[0] >= history_cutoff], redis_candles, archived
+
+    def _merge(self, asset: str, archived: dict[str, list[tuple[float, ...]]]) -> int:
+        return sum(self.archive.merge(kind, asset, sorted(rows)) for kind, rows in archived.items())
+
+    def _archive_start(self, asset: str) -> float | None:
+        timestamps = [timestamp for timestamp in (self.archive.first_timestamp(TICKS, asset),
+                                                  self.archive.first_timestamp(candles_kind("1d"), asset))
+                      if timestamp is not None]
+        return min(timestamps, default=None)
+
+    async def backfill_asset(self, asset: str, range_start: float, resume_from: float, range_end: float,
+                             now: float) -> bool:
+        chunk_start, points = resume_from, 0
+        while chunk_start < range_end:
+            chunk_end = min(chunk_start + self.chunk_seconds, range_end)
+            ticks = await self.source.fetch_range(asset, chunk_start, chunk_end)
+            if ticks is None:
+                logger.error(f"Backfill of {asset} stopped at {chunk_start:.0f}, will resume from there")
+                return False
+
+            ticks = [(timestamp, price) for timestamp, price in ticks if chunk_start <= timestamp < chunk_end]
+            redis_ticks, redis_candles, archived = self.split_chunk(ticks, self.build_candles(asset, ticks), now)
+            # Архив пишется до чекпоинта: повтор куска после падения merge просто пропустит
+            if self.archive:
+                await asyncio.to_thread(self._merge, asset, archived)
+            await self.redis_client.save_backfill_chunk(
+                asset, chunk_start, chunk_end, redis_ticks, redis_candles,
+                (range_start, chunk_end, range_end),
+            )
+            points += len(ticks)
+            chunk_start = chunk_end
+
+        logger.info(f"Backfilled {asset}: {points} points")
+        return True
+
+    async def run(self, assets: list[str], now: float = None) -> Counter:
+        """
+        Returns:
+            Counter: Число активов по итогу: done, skipped (нечего догружать), failed
+        """
+        now = now or time.time()
+        days = self.days
+        max_days = self.max_days() if self.archive is None else None
+        if max_days is not None and days > max_days:
+            logger.warning(f"No archive configured: backfill limited to {max_days} days of Redis retention "
+                           f"instead of {days}")
+            days = max_days
+        start = align_to_day(now - days * DAY_SECONDS)
+        first_timestamps = await self.redis_client.get_first_timestamps(assets)
+        if self.archive:
+            # Уже архивированную историю не перезагружаем: догрузка идет до начала архива
+            archive_starts = await asyncio.to_thread(lambda: {asset: self._archive_start(asset) for asset in assets})
+            for asset, archive_start in archive_starts.items():
+                if archive_start is not None:
+                    first_timestamps[asset] = min(archive_start, first_timestamps.get(asset, archive_start))
+        checkpoints = await self.redis_client.get_backfill_checkpoints(assets)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_asset(asset: str) -> str:
+            live_start = align_to_day(min(now, first_timestamps.get(asset, now)))
+            range_start, resume_from, range_end = self.plan(start, live_start, checkpoints.get(asset))
+            if resume_from >= range_end:
+                return "skipped"
+            async with semaphore:
+                try:
+                    done = await self.backfill_asset(asset, range_start, resume_from, range_end, now)
+                except Exception as e:
+                    logger.error(f"Error during backfill of {asset}: {e}")
+                    done = False
+            return "done" if done else "failed"
+
+        return Counter(await asyncio.gather(*(run_asset(asset) for asset in assets)))
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill historical prices into market data storage")
+    parser.add_argument("--days", type=int, default=365, help="How far back to load history")
+    parser.add_argument("--chunk-days", type=int, default=30, help="Days per request; 2-90 gives hourly prices")
+    parser.add_argument("--concurrency", type=int, default=market_data_settings.COINGECKO_MAX_CONCURRENCY)
+    parser.add_argument("--source", choices=("coingecko", "file"), default="coingecko")
+    parser.add_argument("--file", default="market_history.json", help="History file for --source file")
+    parser.add_argument("--assets", default=None, help="Comma-separated ids instead of the assets table")
+    parser.add_argument("--reset", action="store_true", help="Drop checkpoints and load everything again")
+    parser.add_argument("--archive-dir", default=market_data_settings.MARKET_ARCHIVE_DIR,
+                        help="Archive for history older than Redis retention; empty to keep only what Redis holds")
+    args = parser.parse_args(argv)
+
+    if args.assets:
+        assets = [asset for asset in args.assets.split(",") if asset]
+    else:
+        universe = AssetUniverse(portfolio_settings.DB_URL, [])
+        await universe.refresh()
+        await universe.close()
+        assets = universe.assets
+    if not assets:
+        logger.error("No assets to backfill")
+        return 1
+
+    source = CoinGeckoHistorySource(create_coingecko_fetcher()) if args.source == "coingecko" \
+        else FileHistorySource(args.file)
+    redis_client = create_redis_client()
+    try:
+        await redis_client.connect()
+        if args.reset:
+            await redis_client.reset_backfill_checkpoints()
+        backfill = HistoryBackfill(source, redis_client, days=args.days, chunk_days=args.chunk_days,
+                                   concurrency=args.concurrency,
+                                   archive=ArchiveWriter(args.archive_dir) if args.archive_dir else None)
+        started = time.perf_counter()
+        results = await backfill.run(assets)
+    finally:
+        await source.close()
+        await redis_client.close()
+
+    logger.info(f"Backfill finished in {time.perf_counter() - started:.1f}s: {results['done']} done, "
+                f"{results['skipped']} up to date, {results['failed']} failed")
+    return 1 if results["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
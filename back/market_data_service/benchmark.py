@@ -0,0 +1,139 @@
+"""
+Нагрузочный прогон цикла обновления market data.
+
+Гоняет MarketDataUpdater.update_market_data против fake_coingecko (внутри
+процесса через ASGI или по URL) и локального либо fake Redis, и печатает
+время цикла, время записи в Redis и потребление памяти для разных размеров
+вселенной активов.
+
+    python -m back.market_data_service.benchmark --sizes 100,1000,10000 --fake-redis
+    python -m back.market_data_service.benchmark --redis localhost:6380/15 --server-url http://127.0.0.1:8010
+"""
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+
+import httpx
+
+from back.market_data_service.candles import CandleAggregator
+from back.market_data_service.events import SnapshotDiffer
+from back.market_data_service.fake_coingecko import FakeMarketConfig, create_app, fake_asset_ids
+from back.market_data_service.market_data_fetcher import MarketDataFetcher
+from back.market_data_service.providers import CoinGeckoProvider
+from back.market_data_service.redis import RedisClient
+from back.market_data_service.updater import MarketDataUpdater
+
+
+async def connect_redis(args) -> RedisClient:
+    if args.fake_redis:
+        try:
+            from fakeredis.aioredis import FakeRedis
+        except ImportError:
+            raise SystemExit("--fake-redis requires the fakeredis package")
+        redis_client = RedisClient("fake", 0, 0)
+        redis_client.redis = FakeRedis()
+        return redis_client
+
+    address, _, db = args.redis.partition("/")
+    host, _, port = address.partition(":")
+    redis_client = RedisClient(host, int(port or 6379), int(db or 15))
+    await redis_client.connect()
+    return redis_client
+
+
+async def used_memory(redis_client: RedisClient) -> int | None:
+    try:
+        info = await redis_client.redis.info("memory")
+        return int(info["used_memory"])
+    except Exception:
+        return None
+
+
+async def run_size(args, size: int) -> dict:
+    assets = fake_asset_ids(size)
+    if args.server_url:
+        api_url, transport = f"{args.server_url}/api/v3/simple/price", None
+    else:
+        fake_config = FakeMarketConfig(assets=size, latency_ms=args.latency_ms, rate_429=args.rate_429,
+                                       partial_rate=args.partial_rate, seed=size)
+        api_url = "http://fake-coingecko/api/v3/simple/price"
+        transport = httpx.ASGITransport(app=create_app(fake_config))
+
+    fetcher = CoinGeckoProvider(MarketDataFetcher(
+        api_url, "benchmark", max_concurrency=args.concurrency,
+        requests_per_minute=args.requests_per_minute, backoff_base=0.1, transport=transport,
+    ))
+    redis_client = await connect_redis(args)
+    if args.flush:
+        await redis_client.redis.flushdb()
+
+    write_times = []
+    save_market_snapshot = redis_client.save_market_snapshot
+
+    async def timed_save(*save_args, **save_kwargs):
+        started = time.perf_counter()
+        try:
+            return await save_market_snapshot(*save_args, **save_kwargs)
+        finally:
+            write_times.append(time.perf_counter() - started)
+
+    redis_client.save_market_snapshot = timed_save
+    updater = MarketDataUpdater(fetcher, redis_client, CandleAggregator(), SnapshotDiffer())
+
+    memory_before = await used_memory(redis_client)
+    cycle_times = []
+    try:
+        for _ in range(args.cycles):
+            started = time.perf_counter()
+            await updater.update_market_data(assets)
+            cycle_times.append(time.perf_counter() - started)
+        memory_after = await used_memory(redis_client)
+    finally:
+        await fetcher.close()
+        await redis_client.close()
+
+    return {
+        "assets": size,
+        "cycle_p50": statistics.median(cycle_times),
+        "cycle_max": max(cycle_times),
+        "write_p50": statistics.median(write_times) if write_times else None,
+        "redis_memory": (memory_after - memory_before) if memory_before is not None else None,
+        "process_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def format_seconds(value):
+    return "n/a" if value is None else f"{value * 1000:.1f}ms"
+
+
+def format_bytes(value):
+    return "n/a" if value is None else f"{value / 1024 / 1024:.2f}MB"
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Market data update cycle benchmark")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated universe sizes")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--redis", default="localhost:6379/15", help="host:port/db of a scratch Redis")
+    parser.add_argument("--fake-redis", action="store_true", help="Use in-process fakeredis")
+    parser.add_argument("--flush", action="store_true", help="FLUSHDB before each size")
+    parser.add_argument("--server-url", default=None, help="Running fake_coingecko URL; in-process if omitted")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests-per-minute", type=int, default=100000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--partial-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    print(f"{'assets':>8} {'cycle p50':>12} {'cycle max':>12} {'redis write':>12} {'redis mem':>10} {'rss':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        row = await run_size(args, size)
+        print(f"{row['assets']:>8} {format_seconds(row['cycle_p50']):>12} {format_seconds(row['cycle_max']):>12} "
+              f"{format_seconds(row['write_p50']):>12} {format_bytes(row['redis_memory']):>10} "
+              f"{row['process_rss_mb']:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+
+
+CANDLE_RESOLUTIONS = {
+    "5m": 5 * 60,
+    "1h": 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+
+@dataclass(slots=True)
+class Candle:
+    start: int
+    open: float
+    high: float
+    low: float
+    close: float
+
+    def update(self, price: float):
+        self.high = max(self.high, price)
+        self.low = min(self.low, price)
+        self.close = price
+
+    def encode(self) -> str:
+        return f"{self.start}:{self.open}:{self.high}:{self.low}:{self.close}"
+
+    @classmethod
+    def decode(cls, member: bytes) -> "Candle":
+        start, open_, high, low, close = member.decode().split(":")
+        return cls(int(start), float(open_), float(high), float(low), float(close))
+
+
+class CandleAggregator:
+    """
+    Инкрементально сворачивает тики в OHLC-свечи.
+
+    Для каждой пары (resolution, asset) в памяти держится только текущая
+    открытая свеча: тик из того же интервала обновляет ее на месте, тик из
+    следующего интервала закрывает ее и открывает новую.
+    """
+
+    def __init__(self, resolutions: dict[str, int] = None):
+        self.resolutions = resolutions or CANDLE_RESOLUTIONS
+        self._open_candles: dict[tuple[str, str], Candle] = {}
+
+    def restore(self, resolution: str, asset: str, candle: Candle):
+        self._open_candles[(resolution, asset)] = candle
+
+    def add_tick(self, asset: str, timestamp: float, price: float) -> list[tuple[str, str, Candle]]:
+        """
+        Returns:
+            list: Свечи, изменившиеся после тика, [(resolution, asset, candle), ...]
+        """
+        changed = []
+        for resolution, seconds in self.resolutions.items():
+            bucket_start = int(timestamp) - int(timestamp) % seconds
+            candle = self._open_candles.get((resolution, asset))
+
+            if candle is not None and bucket_start < candle.start:
+                continue  # тик из уже закрытого интервала
+            if candle is not None and bucket_start == candle.start:
+                candle.update(price)
+            else:
+                candle = Candle(bucket_start, price, price, price, price)
+                self._open_candles[(resolution, asset)] = candle
+            changed.append((resolution, asset, candle))
+        return changed
@@ -0,0 +1,60 @@
+class SnapshotDiffer:
+    """Хранит последние записанные цены и выделяет активы, цена которых изменилась"""
+
+    def __init__(self):
+        self.prices: dict[str, float] = {}
+        self.changes_24h: dict[str, float] = {}
+        self.last_updated: dict[str, float] = {}
+
+    def load(self, market_data: dict[str, dict]):
+        """
+        Args:
+            market_data: {asset: {"current_price", "usd_24h_change", "last_updated_unix"}} из Redis
+        """
+        self.apply(market_data)
+
+    def diff(self, snapshot: dict[str, dict]) -> list[dict]:
+        """
+        Args:
+            snapshot: {asset: {"current_price", "usd_24h_change", ...}}
+
+        Returns:
+            list: [{"asset", "old_price", "new_price", "usd_24h_change"}, ...] только для изменившихся цен
+        """
+        changes = []
+        for asset, data in snapshot.items():
+            old_price = self.prices.get(asset)
+            new_price = data["current_price"]
+            if old_price == new_price:
+                continue
+            changes.append({
+                "asset": asset,
+                "old_price": old_price,
+                "new_price": new_price,
+                "usd_24h_change": data["usd_24h_change"],
+            })
+        return changes
+
+    def records(self, snapshot: dict[str, dict]) -> dict[str, tuple[float, float, float]]:
+        """Полное состояние рынка с учетом нового (возможно частичного) снимка, для бинарного формата"""
+        records = {
+            asset: (price, self.changes_24h[asset], self.last_updated[asset])
+            for asset, price in self.prices.items()
+        }
+        for asset, data in snapshot.items():
+            records[asset] = (data["current_price"], data["usd_24h_change"], data["last_updated_unix"])
+        return records
+
+    def retain(self, assets: list[str]):
+        """Забывает активы вне assets, чтобы выпавшие из отслеживания не оставались в снимке"""
+        keep = set(assets)
+        for state in (self.prices, self.changes_24h, self.last_updated):
+            for asset in state.keys() - keep:
+                del state[asset]
+
+    def apply(self, snapshot: dict[str, dict]):
+        """Запоминает снимок как последний записанный; вызывается после успешной записи в Redis"""
+        for asset, data in snapshot.items():
+            self.prices[asset] = data["current_price"]
+            self.changes_24h[asset] = data["usd_24h_change"]
+            self.last_updated[asset] = data["last_updated_unix"]
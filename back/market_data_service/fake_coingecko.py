@@ -0,0 +1,193 @@
+"""
+Локальная замена CoinGecko для нагрузочных прогонов и тестов без API-ключа.
+
+Отдает /api/v3/simple/price, /api/v3/coins/list, /api/v3/coins/markets и
+/api/v3/coins/{id}/market_chart/range в формате CoinGecko; цены - случайное блуждание
+для любых запрошенных id. Умеет добавлять задержку, 429 и частичные ответы.
+
+    python -m back.market_data_service.fake_coingecko --assets 1000 --latency-ms 200 --rate-429 0.05
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+import zlib
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class FakeMarketConfig:
+    assets: int = 100
+    volatility: float = 0.002
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    rate_429: float = 0.0
+    error_rate: float = 0.0
+    partial_rate: float = 0.0
+    seed: int | None = None
+
+
+# Фиксированные курсы для котировок в других валютах
+FAKE_FX_RATES = {"usd": 1.0, "eur": 0.92, "rub": 90.0, "gbp": 0.79}
+
+
+def fake_asset_ids(count: int) -> list[str]:
+    return [f"asset-{i:05d}" for i in range(count)]
+
+
+class RandomWalkMarket:
+    def __init__(self, config: FakeMarketConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.prices: dict[str, float] = {}
+        self.open_24h: dict[str, float] = {}
+        self.updated_at: dict[str, float] = {}
+        for asset in fake_asset_ids(config.assets):
+            self._add(asset)
+
+    def _add(self, asset: str):
+        price = math.exp(self.random.uniform(-6, 11))
+        self.prices[asset] = price
+        self.open_24h[asset] = price
+        self.updated_at[asset] = time.time()
+
+    def quote(self, asset: str) -> tuple[float, float, float]:
+        if asset not in self.prices:
+            self._add(asset)
+        now = time.time()
+        # Шаг блуждания масштабируется по прошедшему времени, одна "минута" = один шаг volatility
+        steps = max((now - self.updated_at[asset]) / 60, 1e-3)
+        self.prices[asset] *= math.exp(self.random.gauss(0, self.config.volatility * math.sqrt(steps)))
+        self.updated_at[asset] = now
+        change_24h = (self.prices[asset] / self.open_24h[asset] - 1) * 100
+        return self.prices[asset], change_24h, now
+
+
+def create_app(config: FakeMarketConfig = None) -> FastAPI:
+    config = config or FakeMarketConfig()
+    market = RandomWalkMarket(config)
+    app = FastAPI(title="Fake CoinGecko")
+    app.state.market = market
+
+    async def simulate_network():
+        delay = config.latency_ms + market.random.uniform(0, config.latency_jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if market.random.random() < config.rate_429:
+            return JSONResponse({"status": {"error_code": 429, "error_message": "Rate limit"}},
+                                status_code=429, headers={"retry-after": "1"})
+        if market.random.random() < config.error_rate:
+            return JSONResponse({"error": "Internal error"}, status_code=500)
+        return None
+
+    @app.get("/api/v3/simple/price")
+    async def simple_price(ids: str, vs_currencies: str = "usd",
+                           include_24hr_change: bool = Query(False),
+                           include_last_updated_at: bool = Query(False)):
+        failure = await simulate_network()
+        if failure:
+            return failure
+
+        result = {}
+        for asset in filter(None, ids.split(",")):
+            if market.random.random() < config.partial_rate:
+                continue
+            price, change_24h, updated_at = market.quote(asset)
+            data = {}
+            for currency in filter(None, vs_currencies.lower().split(",")):
+                rate = FAKE_FX_RATES.get(currency)
+                if rate is None:
+                    continue
+                data[currency] = price * rate
+                if include_24hr_change:
+                    data[f"{currency}_24h_change"] = change_24h
+            if include_last_updated_at:
+                data["last_updated_at"] = int(updated_at)
+            result[asset] = data
+        return result
+
+    @app.get("/api/v3/coins/list")
+    async def coins_list():
+        failure = await simulate_network()
+        if failure:
+            return failure
+        return [{"id": asset, "symbol": asset.replace("-", "")[:6], "name": asset.title()} for asset in market.prices]
+
+    @app.get("/api/v3/coins/markets")
+    async def coins_markets(vs_currency: str = "usd", page: int = 1, per_page: int = 100):
+        failure = await simulate_network()
+        if failure:
+            return failure
+
+        # Капитализация - цена на фиксированное для актива предложение монет
+        quotes = {asset: market.quote(asset) for asset in list(market.prices)}
+        supply = {asset: zlib.crc32(asset.encode()) % 10 ** 6 + 1 for asset in quotes}
+        ranked = sorted(quotes, key=lambda asset: quotes[asset][0] * supply[asset], reverse=True)
+        rate = FAKE_FX_RATES.get(vs_currency.lower(), 1.0)
+        rows = []
+        for rank, asset in enumerate(ranked[(page - 1) * per_page:page * per_page], start=(page - 1) * per_page + 1):
+            price, change_24h, updated_at = quotes[asset]
+            market_cap = price * rate * supply[asset]
+            rows.append({
+                "id": asset,
+                "current_price": price * rate,
+                "market_cap": market_cap,
+                "market_cap_rank": rank,
+                "total_volume": market_cap * market.random.uniform(0.01, 0.2),
+                "price_change_percentage_24h": change_24h,
+                "last_updated": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(updated_at)),
+            })
+        return rows
+
+    @app.get("/api/v3/coins/{asset}/market_chart/range")
+    async def market_chart_range(asset: str, vs_currency: str = "usd", from_: int = Query(alias="from"),
+                                 to: int = Query()):
+        failure = await simulate_network()
+        if failure:
+            return failure
+
+        # Гранулярность как у CoinGecko: до суток - 5 минут, до 90 дней - час, дальше - сутки
+        span = to - from_
+        step = 300 if span <= 86400 else 3600 if span <= 90 * 86400 else 86400
+        price, _, _ = market.quote(asset)
+        rate = FAKE_FX_RATES.get(vs_currency.lower(), 1.0)
+        points = []
+        for timestamp in range(from_ - from_ % step + step, to + 1, step):
+            # Отклонение зависит только от актива и времени, повторный запрос отдает ту же историю
+            noise = random.Random(zlib.crc32(f"{asset}:{timestamp}".encode())).gauss(0, 0.05)
+            points.append([timestamp * 1000, price * rate * math.exp(noise)])
+        return {"prices": points}
+
+    return app
+
+
+def parse_args(argv=None) -> tuple[FakeMarketConfig, argparse.Namespace]:
+    parser = argparse.ArgumentParser(description="Fake CoinGecko price server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--assets", type=int, default=100, help="Number of pre-generated asset ids")
+    parser.add_argument("--volatility", type=float, default=0.002, help="Random walk sigma per minute")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability of a 429 response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 500 response")
+    parser.add_argument("--partial-rate", type=float, default=0.0, help="Probability to drop each id")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    config = FakeMarketConfig(
+        assets=args.assets, volatility=args.volatility, latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms, rate_429=args.rate_429, error_rate=args.error_rate,
+        partial_rate=args.partial_rate, seed=args.seed,
+    )
+    return config, args
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    fake_config, cli_args = parse_args()
+    uvicorn.run(create_app(fake_config), host=cli_args.host, port=cli_args.port)
@@ -0,0 +1,34 @@
+from statistics import median
+
+
+BASE_CURRENCY = "usd"
+
+
+def parse_currencies(value: str) -> list[str]:
+    """'usd,EUR, rub' -> ['usd', 'eur', 'rub']; базовая валюта всегда первая"""
+    currencies = [currency.strip().lower() for currency in value.split(",") if currency.strip()]
+    return [BASE_CURRENCY] + [currency for currency in dict.fromkeys(currencies) if currency != BASE_CURRENCY]
+
+
+def derive_fx_rates(data: dict[str, dict], currencies: list[str]) -> dict[str, float]:
+    """
+    Курсы валют к USD из ответа simple/price: для каждой валюты - медиана отношений
+    price_<currency> / price_usd по всем активам, так что единичные кривые котировки на курс не влияют.
+
+    Returns:
+        dict: {currency: units per 1 USD}; валюты, по которым нет ни одной котировки, пропускаются
+    """
+    rates = {}
+    for currency in currencies:
+        if currency == BASE_CURRENCY:
+            continue
+        ratios = [
+            quote[currency] / quote[BASE_CURRENCY]
+            for quote in data.values()
+            if quote.get(currency) and quote.get(BASE_CURRENCY)
+        ]
+        if ratios:
+            rates[currency] = median(ratios)
+    if rates:
+        rates[BASE_CURRENCY] = 1.0
+    return rates
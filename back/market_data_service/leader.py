@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from aioredis import Redis
+
+from back.market_data_service.redis import FENCING_TOKEN_KEY, LEADER_KEY
+
+logger = logging.getLogger(__name__)
+
+
+# Аренда берется, только если ее ни у кого нет; токен выдается атомарно вместе с ней
+ACQUIRE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return redis.call('INCR', KEYS[2])
+end
+return false
+"""
+
+# Продлить или отпустить аренду может только ее владелец
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def default_instance_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderLease:
+    """
+    Аренда (lease) лидерства в Redis (SET NX PX) с fencing-токеном из INCR.
+    Писать в Redis может только лидер, причем со своим токеном: если аренда истекла
+    и ее взяла другая реплика, токен устаревает и запись снимка отклоняется.
+    Реплика сама перестает считать себя лидером, если не смогла продлить аренду за ttl.
+    """
+
+    def __init__(self, redis: Redis, ttl_seconds: float, instance_id: str = None,
+                 on_acquired: Callable[[int], Awaitable[None]] = None):
+        """
+        Args:
+            redis: Подключение к Redis
+            ttl_seconds: Время жизни аренды; резервная реплика забирает лидерство не позже чем через
+                ttl + ttl / 3 после падения лидера
+            on_acquired: Вызывается с новым токеном при получении лидерства
+        """
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.instance_id = instance_id or default_instance_id()
+        self.on_acquired = on_acquired
+        self.token: int | None = None
+        self._valid_until = 0.0
+        self._acquire = redis.register_script(ACQUIRE_SCRIPT)
+        self._renew = redis.register_script(RENEW_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+
+    @property
+    def ttl_ms(self) -> int:
+        return int(self.ttl_seconds * 1000)
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None and time.monotonic() < self._valid_until
+
+    def step_down(self, reason: str):
+        if self.token is not None:
+            logger.warning(f"Instance {self.instance_id} lost market data leadership "
+                           f"(token {self.token}): {reason}")
+        self.token = None
+        self._valid_until = 0.0
+
+    async def try_acquire(self) -> bool:
+        started = time.monotonic()
+        token = await self._acquire(keys=[LEADER_KEY, FENCING_TOKEN_KEY], args=[self.instance_id, self.ttl_ms])
+        if not token:
+            return False
+
+        self.token = int(token)
+        self._valid_until = started + self.ttl_seconds
+        logger.info(f"Instance {self.instance_id} became market data leader with token {self.token}")
+        if self.on_acquired:
+            await self.on_acquired(self.token)
+        return True
+
+    async def renew(self) -> bool:
+        started = time.monotonic()
+        if await self._renew(keys=[LEADER_KEY], args=[self.instance_id, self.ttl_ms]):
+            self._valid_until = started + self.ttl_seconds
+            return True
+        self.step_down("lease is held by another instance")
+        return False
+
+    async def release(self):
+        if self.token is None:
+            return
+        await self._release(keys=[LEADER_KEY], args=[self.instance_id])
+        logger.info(f"Instance {self.instance_id} released market data leadership (token {self.token})")
+        self.token = None
+        self._valid_until = 0.0
+
+    async def run(self):
+        """Лидер продлевает аренду, резервная реплика пытается ее взять; каждые ttl / 3"""
+        interval = self.ttl_seconds / 3
+        while True:
+            try:
+                if self.token is not None:
+                    if not self.is_leader:
+                        self.step_down("lease expired before renewal")
+                    else:
+                        await self.renew()
+                if self.token is None:
+                    await self.try_acquire()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Leader lease error: {e}")
+                if self.token is not None and not self.is_leader:
+                    self.step_down("lease expired while Redis was unavailable")
+            await asyncio.sleep(interval)
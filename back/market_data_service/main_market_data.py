@@ -1,12 +1,31 @@
 import asyncio
 import logging
+from datetime import datetime, timedelta
 
+import uvicorn
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from back.logging import setup_logging_base_config
-from back.config import MarketDataSettings, RedisSettings
+from back.config import MarketDataSettings, RedisSettings, PortfolioSettings
+from back.market_data_service.api import create_market_data_app
+from back.market_data_service.archive import MarketDataArchiver
+from back.market_data_service.archive_format import ArchiveWriter
+from back.market_data_service.candles import CandleAggregator
+from back.market_data_service.events import SnapshotDiffer
+from back.market_data_service.fx import parse_currencies
+from back.market_data_service.leader import LeaderLease
 from back.market_data_service.market_data_fetcher import MarketDataFetcher
+from back.market_data_service.metrics import MarketDataMetrics
+from back.market_data_service.outliers import OutlierFilter
+from back.market_data_service.message_broker.producer import rabbit_producer
+from back.market_data_service.message_broker.rabbitmq import rabbit_broker
+from back.market_data_service.providers import CoinGeckoProvider, FailoverPriceSource, FilePriceProvider, \
+    PriceProvider
+from back.market_data_service.rankings import RankingsUpdater
 from back.market_data_service.redis import RedisClient
+from back.market_data_service.refresh_scheduler import TieredRefreshScheduler
+from back.market_data_service.universe import AssetUniverse
+from back.market_data_service.updater import MarketDataUpdater
 
 
 setup_logging_base_config()
@@ -14,7 +33,9 @@ logger = logging.getLogger(__name__)
 
 market_data_settings = MarketDataSettings()
 redis_settings = RedisSettings()
+portfolio_settings = PortfolioSettings()
 
+# Используется, пока таблица assets недоступна
 CRYPTO_ASSETS = [
     "bitcoin", "ethereum", "solana", "tether", "usd-coin", "ripple", "binancecoin",
     "the-open-network", "dogecoin", "shiba-inu", "grass", "official-trump", "optimism",
@@ -34,37 +55,38 @@ CRYPTO_ASSETS = [
 
 
 
-async def update_market_data(market_data_fetcher: MarketDataFetcher, redis_client: RedisClient):
-    logger.info("Starting market data update")
-    try:
-        market_data_crypto = await market_data_fetcher.fetch_market_data_crypto(CRYPTO_ASSETS)
-        if market_data_crypto:
-            processed_count = 0
-            for asset, data in market_data_crypto.items():
-                current_price = data.get("usd")
-                usd_24h_change = data.get("usd_24h_change")
-                last_updated_unix = data.get("last_updated_at")
-
-                if current_price is not None and usd_24h_change is not None and last_updated_unix is not None:
-                    await redis_client.save_market_data_crypto(asset, current_price, usd_24h_change, last_updated_unix)
-                    processed_count += 1
-                else:
-                    logger.warning(f"Invalid data for asset {asset}: {data}")
-            
-            logger.info(f"Market data update completed. Processed {processed_count} assets.")
-        else:
-            logger.warning("No market data received from fetcher")
-    except Exception as e:
-        logger.error(f"Error during market data update: {e}")
-
-
-async def start_scheduler(market_fetcher: MarketDataFetcher, redis_client: RedisClient):
+async def start_scheduler(updater: MarketDataUpdater, universe: AssetUniverse,
+                          rankings_updater: RankingsUpdater = None, archiver: MarketDataArchiver = None):
     logger.info("Starting market data scheduler")
     scheduler = AsyncIOScheduler()
 
-    scheduler.add_job(update_market_data, 'interval', minutes=3, args=[market_fetcher, redis_client])
+    refresh_scheduler = TieredRefreshScheduler(
+        scheduler,
+        updater.update_market_data,
+        universe,
+        updater.snapshot_differ,
+        updater.redis_client,
+        max_ids_length=market_data_settings.COINGECKO_MAX_IDS_LENGTH,
+        budget_per_minute=market_data_settings.MARKET_REFRESH_BUDGET_PER_MINUTE,
+    )
+
+    async def refresh_universe():
+        await universe.refresh()
+        updater.retain(universe.assets)
+        await refresh_scheduler.reschedule()
+
+    await refresh_scheduler.reschedule()
+    scheduler.add_job(refresh_universe, 'interval', minutes=market_data_settings.MARKET_UNIVERSE_REFRESH_MINUTES)
+    scheduler.add_job(refresh_scheduler.reschedule, 'interval', minutes=market_data_settings.MARKET_RETIER_MINUTES)
+    if rankings_updater:
+        scheduler.add_job(rankings_updater.update_rankings, 'interval',
+                          minutes=market_data_settings.MARKET_RANKINGS_REFRESH_MINUTES,
+                          next_run_time=datetime.now() + timedelta(seconds=30), max_instances=1, coalesce=True)
+    if archiver:
+        scheduler.add_job(archiver.archive, 'interval', minutes=market_data_settings.MARKET_ARCHIVE_INTERVAL_MINUTES,
+                          max_instances=1, coalesce=True)
     scheduler.start()
-    logger.info("Market data scheduler started with 3-minute intervals")
+    logger.info("Market data scheduler started with tiered refresh intervals")
 
     try:
         while True:
@@ -74,19 +96,129 @@ async def start_scheduler(market_fetcher: MarketDataFetcher, redis_client: Redis
         scheduler.shutdown()
         logger.info("Market data scheduler shutdown complete")
 
+
+def create_coingecko_fetcher() -> MarketDataFetcher:
+    return MarketDataFetcher(
+        market_data_settings.COINGECKO_URL,
+        market_data_settings.COINGECKO_API_KEY,
+        max_ids_length=market_data_settings.COINGECKO_MAX_IDS_LENGTH,
+        max_concurrency=market_data_settings.COINGECKO_MAX_CONCURRENCY,
+        requests_per_minute=market_data_settings.COINGECKO_REQUESTS_PER_MINUTE,
+        max_retries=market_data_settings.COINGECKO_MAX_RETRIES,
+        timeout=market_data_settings.COINGECKO_TIMEOUT,
+        vs_currencies=parse_currencies(market_data_settings.MARKET_QUOTE_CURRENCIES),
+    )
+
+
+def create_redis_client() -> RedisClient:
+    return RedisClient(
+        redis_settings.REDIS_HOST,
+        redis_settings.REDIS_PORT,
+        redis_settings.REDIS_DB,
+        history_retention_seconds=market_data_settings.MARKET_HISTORY_RETENTION_HOURS * 60 * 60,
+        candle_retention_seconds={
+            "5m": market_data_settings.MARKET_CANDLES_5M_RETENTION_DAYS * 24 * 60 * 60,
+            "1h": market_data_settings.MARKET_CANDLES_1H_RETENTION_DAYS * 24 * 60 * 60,
+            "1d": market_data_settings.MARKET_CANDLES_1D_RETENTION_DAYS * 24 * 60 * 60,
+        },
+    )
+
+
+def create_price_provider(coingecko_fetcher: MarketDataFetcher) -> PriceProvider:
+    """Провайдеры из MARKET_PROVIDERS в порядке приоритета, с переключением при отказах"""
+    factories = {
+        "coingecko": lambda: CoinGeckoProvider(coingecko_fetcher),
+        "file": lambda: FilePriceProvider(market_data_settings.MARKET_PRICES_FILE),
+    }
+    names = [name.strip() for name in market_data_settings.MARKET_PROVIDERS.split(",") if name.strip()]
+    unknown = [name for name in names if name not in factories]
+    if unknown or not names:
+        raise ValueError(f"Unknown market data providers: {unknown or names}")
+
+    logger.info(f"Market data providers: {names}")
+    return FailoverPriceSource(
+        [factories[name]() for name in names],
+        stale_after_seconds=market_data_settings.MARKET_STALE_AFTER_MINUTES * 60,
+        cooldown_seconds=market_data_settings.MARKET_PROVIDER_COOLDOWN_SECONDS,
+    )
+
+
 async def main():
     logger.info("Starting market data service")
     
-    market_data_fetcher = MarketDataFetcher(market_data_settings.COINGECKO_URL, market_data_settings.COINGECKO_API_KEY)
-    redis_client = RedisClient(redis_settings.REDIS_HOST, redis_settings.REDIS_PORT, redis_settings.REDIS_DB)
+    # Один клиент CoinGecko на цены и рейтинги: у них общий бюджет запросов
+    coingecko_fetcher = create_coingecko_fetcher()
+    price_provider = create_price_provider(coingecko_fetcher)
+    redis_client = create_redis_client()
+    candle_aggregator = CandleAggregator()
+    universe = AssetUniverse(portfolio_settings.DB_URL, CRYPTO_ASSETS)
+    snapshot_differ = SnapshotDiffer()
+    outlier_filter = OutlierFilter(
+        window=market_data_settings.MARKET_OUTLIER_WINDOW,
+        min_samples=market_data_settings.MARKET_OUTLIER_MIN_SAMPLES,
+        threshold=market_data_settings.MARKET_OUTLIER_THRESHOLD,
+        min_relative_deviation=market_data_settings.MARKET_OUTLIER_MIN_DEVIATION,
+        confirm_tolerance=market_data_settings.MARKET_OUTLIER_CONFIRM_TOLERANCE,
+    )
+    lease = None
+
+    async def restore_state(fencing_token: int = None):
+        # Резервная реплика могла долго простаивать: свечи и последние цены берем из Redis
+        for resolution, asset, candle in await redis_client.load_open_candles(universe.assets):
+            candle_aggregator.restore(resolution, asset, candle)
+        snapshot_differ.load(await redis_client.load_market_data(universe.assets))
+        recent_ticks = await redis_client.load_recent_ticks(universe.assets, outlier_filter.window)
+        for asset, ticks in recent_ticks.items():
+            outlier_filter.seed(asset, ticks)
 
     try:
         await redis_client.connect()
         logger.info("Redis client connected in market data service")
-        await start_scheduler(market_data_fetcher, redis_client)
+
+        await rabbit_broker.start()
+        logger.info("RabbitMQ broker started in market data service")
+
+        await universe.refresh()
+        lease = LeaderLease(redis_client.redis, market_data_settings.MARKET_LEADER_LEASE_SECONDS,
+                            on_acquired=restore_state)
+
+        metrics = MarketDataMetrics(stale_after_seconds=market_data_settings.MARKET_STALE_AFTER_MINUTES * 60)
+        updater = MarketDataUpdater(price_provider, redis_client, candle_aggregator, snapshot_differ,
+                                    producer=rabbit_producer, metrics=metrics, lease=lease,
+                                    outlier_filter=outlier_filter,
+                                    quote_currencies=parse_currencies(market_data_settings.MARKET_QUOTE_CURRENCIES))
+        api_server = uvicorn.Server(uvicorn.Config(
+            create_market_data_app(redis_client, metrics),
+            host=market_data_settings.MARKET_DATA_API_HOST,
+            port=market_data_settings.MARKET_DATA_API_PORT,
+            log_config=None,
+        ))
+        rankings_updater = RankingsUpdater(coingecko_fetcher, redis_client,
+                                           pages=market_data_settings.MARKET_RANKINGS_PAGES,
+                                           per_page=market_data_settings.MARKET_RANKINGS_PER_PAGE, lease=lease,
+                                           # Несколько частичных обновлений подряд не выкидывают актив
+                                           evict_after_seconds=3 * market_data_settings.MARKET_RANKINGS_REFRESH_MINUTES * 60)
+        archiver = None
+        if market_data_settings.MARKET_ARCHIVE_DIR:
+            archiver = MarketDataArchiver(redis_client, ArchiveWriter(market_data_settings.MARKET_ARCHIVE_DIR),
+                                          universe, lease=lease,
+                                          settle_seconds=market_data_settings.MARKET_ARCHIVE_SETTLE_MINUTES * 60)
+        await asyncio.gather(lease.run(), start_scheduler(updater, universe, rankings_updater, archiver),
+                             api_server.serve())
     except Exception as e:
         logger.error(f"Error in market data service main: {e}")
         raise
+    finally:
+        if lease:
+            try:
+                await lease.release()
+            except Exception as e:
+                logger.error(f"Failed to release market data leader lease: {e}")
+        await rabbit_broker.stop()
+        await universe.close()
+        await price_provider.close()
+        await coingecko_fetcher.close()
+        await redis_client.close()
 
 
 if __name__ == "__main__":
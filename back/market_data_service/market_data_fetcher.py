@@ -1,27 +1,211 @@
-import httpx
+import asyncio
 import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import httpx
 
 logger = logging.getLogger(__name__)
 
 
+class RequestBudget:
+    """Скользящее окно запросов, чтобы не выходить за лимит demo-ключа CoinGecko"""
+
+    def __init__(self, max_requests: int, period_seconds: float = 60.0):
+        self.max_requests = max_requests
+        self.period_seconds = period_seconds
+        self._sent = deque()
+        self._lock = asyncio.Lock()
+
+    def _drop_expired(self, now: float):
+        while self._sent and now - self._sent[0] >= self.period_seconds:
+            self._sent.popleft()
+
+    @property
+    def remaining(self) -> int:
+        self._drop_expired(time.monotonic())
+        return self.max_requests - len(self._sent)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._drop_expired(now)
+                if len(self._sent) < self.max_requests:
+                    self._sent.append(now)
+                    return
+                wait = self.period_seconds - (now - self._sent[0])
+                logger.debug(f"Request budget exhausted, waiting {wait:.1f}s")
+                await asyncio.sleep(wait)
+
+
+@dataclass
+class ChunkStats:
+    index: int
+    assets_count: int
+    attempts: int = 0
+    duration: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class FetchResult:
+    data: dict[str, dict] = field(default_factory=dict)
+    chunks: list[ChunkStats] = field(default_factory=list)
+    failed_assets: list[str] = field(default_factory=list)
+    sources: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def failed_chunks(self) -> list[ChunkStats]:
+        return [chunk for chunk in self.chunks if chunk.error]
+
+
 class MarketDataFetcher:
-    def __init__(self, api_url, api_key):
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_url, api_key, max_ids_length: int = 1500, max_concurrency: int = 3,
+                 requests_per_minute: int = 30, max_retries: int = 3, backoff_base: float = 1.0,
+                 timeout: float = 10.0, transport: httpx.AsyncBaseTransport = None,
+                 vs_currencies: list[str] = None, markets_url: str = None, history_url: str = None):
         self.api_url = api_url
         self.api_key = api_key
+        self.max_ids_length = max_ids_length
+        self.max_retries = max_retries
+        self.vs_currencies = vs_currencies or ["usd"]
+        self.markets_url = markets_url or api_url.replace("/simple/price", "/coins/markets")
+        self.history_url = history_url or api_url.replace("/simple/price", "/coins/{asset}/market_chart/range")
+        self.backoff_base = backoff_base
+        self.budget = RequestBudget(requests_per_minute)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = httpx.AsyncClient(
+            headers={"accept": "application/json", "x-cg-demo-api-key": self.api_key},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+
+    async def close(self):
+        await self.client.aclose()
+
+    def split_into_chunks(self, crypto_assets: list[str]) -> list[list[str]]:
+        """Режет список id так, чтобы параметр ids в каждом запросе не превышал max_ids_length"""
+        chunks, current, current_length = [], [], 0
+        for asset in crypto_assets:
+            added_length = len(asset) + (1 if current else 0)
+            if current and current_length + added_length > self.max_ids_length:
+                chunks.append(current)
+                current, current_length = [], 0
+                added_length = len(asset)
+            current.append(asset)
+            current_length += added_length
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _backoff_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        if response is not None and response.headers.get("retry-after", "").isdigit():
+            return float(response.headers["retry-after"])
+        return random.uniform(0, self.backoff_base * 2 ** attempt)
+
+    def _price_params(self, chunk: list[str]) -> dict:
+        return {"ids": ','.join(chunk), "vs_currencies": ",".join(self.vs_currencies),
+                "include_24hr_change": "true", "include_last_updated_at": "true"}
+
+    async def _request(self, url: str, params: dict):
+        await self.budget.acquire()
+        response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _fetch_with_retries(self, index: int, assets_count: int, url: str,
+                                  params: dict) -> tuple[ChunkStats, dict | list]:
+        stats = ChunkStats(index=index, assets_count=assets_count)
+        started = time.perf_counter()
+
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                stats.attempts = attempt + 1
+                response = None
+                try:
+                    data = await self._request(url, params)
+                    stats.error = None
+                    stats.duration = time.perf_counter() - started
+                    return stats, data
+                except httpx.HTTPStatusError as e:
+                    response = e.response
+                    stats.error = f"HTTP {e.response.status_code}"
+                    if e.response.status_code not in self.RETRYABLE_STATUS_CODES:
+                        logger.error(f"HTTP error in market data chunk {index}: "
+                                     f"{e.response.status_code} - {e.response.text}")
+                        break
+                except httpx.RequestError as e:
+                    stats.error = f"Request error: {e}"
+                except Exception as e:
+                    stats.error = f"Unexpected error: {e}"
+                    logger.error(f"Unexpected error in market data chunk {index}: {e}")
+                    break
+
+                if attempt < self.max_retries:
+                    delay = self._backoff_delay(attempt, response)
+                    logger.warning(f"Market data chunk {index} failed ({stats.error}), "
+                                   f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+        stats.duration = time.perf_counter() - started
+        return stats, {}
+
+    async def fetch_markets(self, pages: int, per_page: int = 250) -> FetchResult:
+        """
+        Страницы coins/markets (капитализация, объем, ранг) по убыванию капитализации,
+        все страницы запрашиваются параллельно в пределах семафора и бюджета запросов.
+
+        Returns:
+            FetchResult: data - {asset: запись coins/markets}, chunks - по странице на элемент
+        """
+        params = [{"vs_currency": "usd", "order": "market_cap_desc", "per_page": per_page, "page": page,
+                   "price_change_percentage": "24h"} for page in range(1, pages + 1)]
+        results = await asyncio.gather(*(self._fetch_with_retries(i, per_page, self.markets_url, page_params)
+                                         for i, page_params in enumerate(params)))
+
+        fetch_result = FetchResult()
+        for stats, rows in results:
+            fetch_result.chunks.append(stats)
+            for row in rows or []:
+                fetch_result.data[row["id"]] = row
+
+        if fetch_result.failed_chunks:
+            logger.error(f"Markets fetch: {len(fetch_result.failed_chunks)}/{pages} pages failed")
+        return fetch_result
+
+    async def fetch_price_range(self, asset: str, start: float, end: float) -> tuple[ChunkStats, list]:
+        """
+        История цены актива в USD за [start, end] через coins/{id}/market_chart/range.
+        Гранулярность выбирает CoinGecko по длине интервала: 2-90 дней - часовая, дольше - дневная.
+
+        Returns:
+            tuple: (stats, [(timestamp, price), ...]), при ошибке stats.error заполнен, список пуст
+        """
+        params = {"vs_currency": "usd", "from": int(start), "to": int(end)}
+        stats, data = await self._fetch_with_retries(0, 1, self.history_url.format(asset=asset), params)
+        prices = [(timestamp / 1000, float(price)) for timestamp, price in (data or {}).get("prices", [])
+                  if price is not None]
+        return stats, prices
+
+    async def fetch_market_data_crypto(self, crypto_assets: list[str]) -> FetchResult:
+        chunks = self.split_into_chunks(crypto_assets)
+        results = await asyncio.gather(*(self._fetch_with_retries(i, len(chunk), self.api_url, self._price_params(chunk))
+                                         for i, chunk in enumerate(chunks)))
+
+        fetch_result = FetchResult()
+        for (stats, data), chunk in zip(results, chunks):
+            fetch_result.chunks.append(stats)
+            fetch_result.data.update(data)
+            if stats.error:
+                fetch_result.failed_assets.extend(chunk)
 
-    async def fetch_market_data_crypto(self, crypto_assets):
-        try:
-            async with httpx.AsyncClient() as client:
-                headers = {"accept": "application/json", "x-cg-demo-api-key": self.api_key}
-                params = {"ids": ','.join(crypto_assets), "vs_currencies": "usd",
-                          "include_24hr_change": "true", "include_last_updated_at": "true"}
-                response = await client.get(self.api_url, headers=headers, params=params)
-                response.raise_for_status()
-
-            return response.json()
-        except httpx.RequestError as e:
-            logger.error(f"Request error in market data fetch: {e}")
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error in market data fetch: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            logger.error(f"Unexpected error in market data fetch: {e}")
+        if fetch_result.failed_chunks:
+            logger.error(f"Market data fetch: {len(fetch_result.failed_chunks)}/{len(chunks)} chunks failed, "
+                         f"{len(fetch_result.failed_assets)} assets missing")
+        return fetch_result
@@ -0,0 +1,24 @@
+import logging
+
+from faststream.rabbit import RabbitBroker
+
+from back.market_data_service.message_broker.rabbitmq import rabbit_broker, market_data_exchange
+
+logger = logging.getLogger(__name__)
+
+
+class Producer:
+    def __init__(self, broker, market_data_exch):
+        self.broker: RabbitBroker = broker
+        self.market_data_exch = market_data_exch
+
+    async def price_changes(self, version: int, changes: list[dict]):
+        message = {"version": version, "changes": changes}
+        try:
+            await self.broker.publish(message, routing_key="portfolio_price_changed", exchange=self.market_data_exch)
+            logger.info(f"Price change event published for snapshot {version}: {len(changes)} assets in RabbitMQ")
+        except Exception as e:
+            logger.error(f"Failed to publish price change event for snapshot {version}: {e} in RabbitMQ")
+
+
+rabbit_producer = Producer(rabbit_broker, market_data_exchange)
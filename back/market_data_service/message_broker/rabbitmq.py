@@ -0,0 +1,7 @@
+from faststream.rabbit import RabbitBroker, RabbitExchange, ExchangeType
+
+from back.config import RabbitMQSettings
+
+rabbit_broker = RabbitBroker(RabbitMQSettings().RABBITMQ_MQ)
+
+market_data_exchange = RabbitExchange("market_data_exchange", type=ExchangeType.DIRECT)
@@ -0,0 +1,111 @@
+import time
+from dataclasses import dataclass, field, asdict
+
+
+@dataclass
+class CycleMetrics:
+    """Результат одного цикла обновления"""
+    started_at: float
+    requested: int
+    fetch_duration: float = 0.0
+    write_duration: float = 0.0
+    written: int = 0
+    failed_assets: list[str] = field(default_factory=list)
+    quarantined_assets: list[str] = field(default_factory=list)
+    version: int | None = None
+    error: str | None = None
+
+
+class MarketDataMetrics:
+    """
+    Телеметрия свежести рыночных данных: последний цикл, счетчики циклов
+    и возраст last_updated каждого актива. Актив считается устаревшим,
+    если его данные старше stale_after_seconds или их нет вовсе.
+    """
+
+    def __init__(self, stale_after_seconds: float):
+        self.stale_after_seconds = stale_after_seconds
+        self.last_cycle: CycleMetrics | None = None
+        self.cycles_total = 0
+        self.failed_cycles_total = 0
+        self.quarantined_total = 0
+        self.asset_ages: dict[str, float | None] = {}
+        self.stale_assets: set[str] = set()
+
+    def record_cycle(self, cycle: CycleMetrics, last_updated: dict[str, float], assets: list[str] = (),
+                     now: float = None):
+        """
+        Args:
+            cycle: Метрики завершенного цикла
+            last_updated: {asset: last_updated_unix} последних записанных данных
+            assets: Активы цикла; те, по которым данных нет совсем, попадают в устаревшие с возрастом None
+        """
+        now = now or time.time()
+        self.last_cycle = cycle
+        self.cycles_total += 1
+        if cycle.error or (cycle.requested and not cycle.written):
+            self.failed_cycles_total += 1
+        self.quarantined_total += len(cycle.quarantined_assets)
+
+        for asset in assets:
+            self.asset_ages.setdefault(asset, None)
+        for asset, timestamp in last_updated.items():
+            self.asset_ages[asset] = now - timestamp
+        self.stale_assets = {
+            asset for asset, age in self.asset_ages.items()
+            if age is None or age > self.stale_after_seconds
+        }
+
+    def retain(self, assets: list[str]):
+        """Убирает возраст активов, выпавших из отслеживания: обновляться они больше не будут"""
+        keep = set(assets)
+        self.asset_ages = {asset: age for asset, age in self.asset_ages.items() if asset in keep}
+        self.stale_assets &= keep
+
+    def health(self) -> dict:
+        known_ages = [age for age in self.asset_ages.values() if age is not None]
+        return {
+            "status": "ok" if self.last_cycle and not self.stale_assets else "degraded",
+            "updated_at": time.time(),
+            "stale_after_seconds": self.stale_after_seconds,
+            "cycles_total": self.cycles_total,
+            "failed_cycles_total": self.failed_cycles_total,
+            "quarantined_total": self.quarantined_total,
+            "assets_total": len(self.asset_ages),
+            "stale_total": len(self.stale_assets),
+            "max_age_seconds": max(known_ages, default=None),
+            "last_cycle": asdict(self.last_cycle) if self.last_cycle else None,
+        }
+
+    def render(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        cycle = self.last_cycle
+        lines = [
+            "# TYPE market_data_cycles_total counter",
+            f"market_data_cycles_total {self.cycles_total}",
+            "# TYPE market_data_failed_cycles_total counter",
+            f"market_data_failed_cycles_total {self.failed_cycles_total}",
+            "# TYPE market_data_quarantined_ticks_total counter",
+            f"market_data_quarantined_ticks_total {self.quarantined_total}",
+            "# TYPE market_data_stale_assets gauge",
+            f"market_data_stale_assets {len(self.stale_assets)}",
+        ]
+        if cycle:
+            lines += [
+                "# TYPE market_data_last_cycle_timestamp_seconds gauge",
+                f"market_data_last_cycle_timestamp_seconds {cycle.started_at}",
+                "# TYPE market_data_fetch_duration_seconds gauge",
+                f"market_data_fetch_duration_seconds {cycle.fetch_duration}",
+                "# TYPE market_data_write_duration_seconds gauge",
+                f"market_data_write_duration_seconds {cycle.write_duration}",
+                "# TYPE market_data_written_assets gauge",
+                f"market_data_written_assets {cycle.written}",
+                "# TYPE market_data_failed_assets gauge",
+                f"market_data_failed_assets {len(cycle.failed_assets)}",
+                "# TYPE market_data_quarantined_assets gauge",
+                f"market_data_quarantined_assets {len(cycle.quarantined_assets)}",
+            ]
+        lines.append("# TYPE market_data_asset_age_seconds gauge")
+        for asset, age in sorted(self.asset_ages.items()):
+            lines.append(f'market_data_asset_age_seconds{{asset="{asset}"}} {"NaN" if age is None else round(age, 3)}')
+        return "\n".join(lines) + "\n"
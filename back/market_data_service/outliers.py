@@ -0,0 +1,170 @@
+from bisect import bisect_left, insort
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+
+MAD_TO_SIGMA = 1.4826
+
+
+def kth_smallest(a: Callable[[int], float], len_a: int, b: Callable[[int], float], len_b: int, k: int) -> float:
+    """
+    k-й (с нуля) наименьший элемент объединения двух отсортированных последовательностей
+    за O(log) обращений; последовательности заданы функциями доступа по индексу
+    """
+    lo, hi = max(0, k + 1 - len_b), min(k + 1, len_a)
+    while lo < hi:
+        i = (lo + hi) // 2
+        if a(i) < b(k - i):
+            lo = i + 1
+        else:
+            hi = i
+    i, j = lo, k + 1 - lo
+    candidates = []
+    if i > 0:
+        candidates.append(a(i - 1))
+    if j > 0:
+        candidates.append(b(j - 1))
+    return max(candidates)
+
+
+class RollingMedian:
+    """
+    Скользящее окно с медианой и MAD. Окно хранится дважды: в порядке поступления (deque)
+    и отсортированным (bisect). Отклонения от медианы - это две отсортированные
+    последовательности (левее и правее медианы), поэтому MAD ищется как k-й элемент
+    их объединения без сортировки отклонений.
+    """
+    __slots__ = ("size", "values", "ordered")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.ordered = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, value: float):
+        if len(self.values) == self.size:
+            oldest = self.values.popleft()
+            del self.ordered[bisect_left(self.ordered, oldest)]
+        self.values.append(value)
+        insort(self.ordered, value)
+
+    def clear(self):
+        self.values.clear()
+        self.ordered.clear()
+
+    def median(self) -> float:
+        ordered, n = self.ordered, len(self.ordered)
+        half = n // 2
+        return ordered[half] if n % 2 else (ordered[half - 1] + ordered[half]) / 2
+
+    def mad(self, median: float = None) -> float:
+        ordered, n = self.ordered, len(self.ordered)
+        median = self.median() if median is None else median
+        half = n // 2
+
+        # ordered[:half] <= median <= ordered[half:], отклонения в каждой части упорядочены
+        def left(i):
+            return median - ordered[half - 1 - i]
+
+        def right(i):
+            return ordered[half + i] - median
+
+        if n % 2:
+            return kth_smallest(left, half, right, n - half, half)
+        return (kth_smallest(left, half, right, n - half, half - 1)
+                + kth_smallest(left, half, right, n - half, half)) / 2
+
+
+@dataclass(slots=True)
+class QuarantinedTick:
+    timestamp: float
+    price: float
+
+
+class OutlierFilter:
+    """
+    Отсеивает выбросы в ценах по каждому активу: тик, отстоящий от скользящей медианы
+    больше чем на threshold сигм (оценка через MAD), уходит в карантин и не записывается.
+    Если следующий тик (с другим временем) подтверждает новый уровень, оба принимаются
+    и окно начинается заново; если цена вернулась к медиане, выброс отбрасывается.
+    """
+
+    def __init__(self, window: int = 30, min_samples: int = 5, threshold: float = 6.0,
+                 min_relative_deviation: float = 0.005, confirm_tolerance: float = 0.02):
+        """
+        Args:
+            window: Размер окна в тиках
+            min_samples: До стольких тиков в окне фильтр все пропускает
+            threshold: Допустимое отклонение от медианы в сигмах
+            min_relative_deviation: Нижняя граница сигмы в долях медианы, чтобы на плоском
+                графике (MAD = 0) не отсекались обычные колебания
+            confirm_tolerance: Насколько (в долях) второй тик может отличаться от карантинного,
+                чтобы считаться подтверждением
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.threshold = threshold
+        self.min_relative_deviation = min_relative_deviation
+        self.confirm_tolerance = confirm_tolerance
+        self.windows: dict[str, RollingMedian] = {}
+        self.last_timestamps: dict[str, float] = {}
+        self.quarantine: dict[str, QuarantinedTick] = {}
+
+    def _window(self, asset: str) -> RollingMedian:
+        window = self.windows.get(asset)
+        if window is None:
+            window = self.windows[asset] = RollingMedian(self.window)
+        return window
+
+    def _accept(self, asset: str, timestamp: float, price: float):
+        self._window(asset).add(price)
+        self.last_timestamps[asset] = timestamp
+
+    def seed(self, asset: str, ticks: list[tuple[float, float]]):
+        """Заполняет окно заново историей [(timestamp, price), ...], например после рестарта"""
+        self._window(asset).clear()
+        self.quarantine.pop(asset, None)
+        for timestamp, price in ticks[-self.window:]:
+            self._accept(asset, timestamp, price)
+
+    def is_outlier(self, asset: str, price: float) -> bool:
+        window = self.windows.get(asset)
+        if window is None or len(window) < self.min_samples:
+            return False
+        median = window.median()
+        sigma = max(MAD_TO_SIGMA * window.mad(median), abs(median) * self.min_relative_deviation)
+        return abs(price - median) > self.threshold * sigma
+
+    def check(self, asset: str, timestamp: float, price: float) -> bool:
+        """
+        Returns:
+            bool: True - тик можно записывать, False - он в карантине
+        """
+        if timestamp == self.last_timestamps.get(asset):
+            # Провайдер вернул тот же тик, что уже принят
+            return True
+
+        pending = self.quarantine.get(asset)
+        if pending is not None and timestamp == pending.timestamp:
+            # Повтор карантинного тика подтверждением не считается
+            return False
+
+        if not self.is_outlier(asset, price):
+            self.quarantine.pop(asset, None)
+            self._accept(asset, timestamp, price)
+            return True
+
+        if pending is not None and abs(price - pending.price) <= abs(pending.price) * self.confirm_tolerance:
+            # Новый уровень подтвержден вторым наблюдением: старое окно больше не показательно
+            del self.quarantine[asset]
+            self._window(asset).clear()
+            self._accept(asset, pending.timestamp, pending.price)
+            self._accept(asset, timestamp, price)
+            return True
+
+        self.quarantine[asset] = QuarantinedTick(timestamp, price)
+        return False
@@ -0,0 +1,4 @@
+from back.market_data_service.providers.base import PriceProvider
+from back.market_data_service.providers.coingecko import CoinGeckoProvider
+from back.market_data_service.providers.failover import FailoverPriceSource, ProviderHealth
+from back.market_data_service.providers.local import FilePriceProvider, StaticPriceProvider
@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+
+from back.market_data_service.market_data_fetcher import FetchResult
+
+
+REQUIRED_FIELDS = ("usd", "usd_24h_change", "last_updated_at")
+
+
+def is_complete(data: dict) -> bool:
+    return all(data.get(field) is not None for field in REQUIRED_FIELDS)
+
+
+class PriceProvider(ABC):
+    """
+    Источник цен. Ответ в формате CoinGecko simple/price:
+    {asset: {"usd", "usd_24h_change", "last_updated_at"}}, недополученные активы - в failed_assets.
+    """
+    name: str = "provider"
+
+    @abstractmethod
+    async def fetch_market_data_crypto(self, assets: list[str]) -> FetchResult:
+        ...
+
+    async def close(self):
+        pass
@@ -0,0 +1,15 @@
+from back.market_data_service.market_data_fetcher import FetchResult, MarketDataFetcher
+from back.market_data_service.providers.base import PriceProvider
+
+
+class CoinGeckoProvider(PriceProvider):
+    name = "coingecko"
+
+    def __init__(self, fetcher: MarketDataFetcher):
+        self.fetcher = fetcher
+
+    async def fetch_market_data_crypto(self, assets: list[str]) -> FetchResult:
+        return await self.fetcher.fetch_market_data_crypto(assets)
+
+    async def close(self):
+        await self.fetcher.close()
@@ -0,0 +1,129 @@
+import logging
+import time
+from dataclasses import dataclass
+
+from back.market_data_service.market_data_fetcher import FetchResult
+from back.market_data_service.providers.base import PriceProvider, is_complete
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProviderHealth:
+    """
+    Оценка здоровья провайдера: score - скользящее среднее доли полученных активов,
+    после подряд идущих полных отказов (исключение или ни одного актива) провайдер
+    уходит на экспоненциально растущий cooldown.
+    """
+    score: float = 1.0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    last_error: str | None = None
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def record(self, coverage: float, error: str | None, now: float, alpha: float,
+               cooldown_seconds: float, max_cooldown_seconds: float):
+        self.score = (1 - alpha) * self.score + alpha * coverage
+        self.last_error = error
+        if coverage == 0:
+            self.consecutive_failures += 1
+            cooldown = min(cooldown_seconds * 2 ** (self.consecutive_failures - 1), max_cooldown_seconds)
+            self.cooldown_until = now + cooldown
+        else:
+            self.consecutive_failures = 0
+            self.cooldown_until = 0.0
+
+
+class FailoverPriceSource(PriceProvider):
+    """
+    Опрашивает провайдеров в порядке приоритета: следующий получает только активы,
+    которые не отдали предыдущие (или отдали со старым last_updated_at). Цена, полученная раньше,
+    заменяется только если она устарела, а новая - нет: более новая метка времени сама по себе
+    не дает резервному провайдеру перекрыть основной. Провайдеры на cooldown
+    опрашиваются, только если доступных не осталось. Отказ одного провайдера
+    уменьшает покрытие, а не обнуляет снимок.
+    """
+    name = "failover"
+
+    def __init__(self, providers: list[PriceProvider], stale_after_seconds: float = None,
+                 min_score: float = 0.5, score_alpha: float = 0.3,
+                 cooldown_seconds: float = 30.0, max_cooldown_seconds: float = 600.0):
+        """
+        Args:
+            providers: Провайдеры по убыванию приоритета
+            stale_after_seconds: Цена старше этого возраста запрашивается и у следующего провайдера
+            min_score: Провайдеры со score ниже опрашиваются после здоровых
+        """
+        self.providers = providers
+        self.stale_after_seconds = stale_after_seconds
+        self.min_score = min_score
+        self.score_alpha = score_alpha
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.health = {provider.name: ProviderHealth() for provider in providers}
+
+    def ordered_providers(self, now: float = None) -> list[PriceProvider]:
+        """Порядок опроса: доступные и здоровые по приоритету, затем деградировавшие, затем на cooldown"""
+        now = now or time.monotonic()
+        priority = {provider.name: i for i, provider in enumerate(self.providers)}
+
+        def sort_key(provider: PriceProvider):
+            health = self.health[provider.name]
+            return not health.available(now), health.score < self.min_score, priority[provider.name]
+
+        return sorted(self.providers, key=sort_key)
+
+    def _needs_refresh(self, data: dict | None, now: float) -> bool:
+        if data is None:
+            return True
+        return self.stale_after_seconds is not None and now - data["last_updated_at"] > self.stale_after_seconds
+
+    async def fetch_market_data_crypto(self, assets: list[str]) -> FetchResult:
+        merged = FetchResult()
+        pending = list(assets)
+        tried_available = False
+
+        for provider in self.ordered_providers():
+            if not pending:
+                break
+            available = self.health[provider.name].available(time.monotonic())
+            if not available and tried_available:
+                continue
+            tried_available = tried_available or available
+
+            error = None
+            try:
+                result = await provider.fetch_market_data_crypto(pending)
+            except Exception as e:
+                logger.error(f"Price provider {provider.name} failed: {e}")
+                result, error = FetchResult(), str(e)
+
+            received = {asset: data for asset, data in result.data.items() if is_complete(data)}
+            merged.chunks.extend(result.chunks)
+            if not error and result.failed_chunks:
+                error = result.failed_chunks[0].error
+            self.health[provider.name].record(
+                len(received) / len(pending), error, time.monotonic(),
+                self.score_alpha, self.cooldown_seconds, self.max_cooldown_seconds,
+            )
+
+            now = time.time()
+            for asset, data in received.items():
+                current = merged.data.get(asset)
+                if current is None or (self._needs_refresh(current, now) and not self._needs_refresh(data, now)):
+                    merged.data[asset] = data
+                    merged.sources[asset] = provider.name
+
+            pending = [asset for asset in pending if self._needs_refresh(merged.data.get(asset), now)]
+            if pending:
+                logger.info(f"Price provider {provider.name}: {len(received)} assets, "
+                            f"{len(pending)} left for fallback providers")
+
+        merged.failed_assets = [asset for asset in assets if asset not in merged.data]
+        return merged
+
+    async def close(self):
+        for provider in self.providers:
+            await provider.close()
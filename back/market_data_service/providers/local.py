@@ -0,0 +1,72 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from back.market_data_service.market_data_fetcher import FetchResult
+from back.market_data_service.providers.base import PriceProvider, is_complete
+
+logger = logging.getLogger(__name__)
+
+
+class StaticPriceProvider(PriceProvider):
+    """Цены из словаря в памяти, для тестов и локального запуска"""
+    name = "static"
+
+    def __init__(self, prices: dict[str, dict] = None, refresh_timestamps: bool = False):
+        """
+        Args:
+            prices: {asset: {"usd", "usd_24h_change", "last_updated_at"}}
+            refresh_timestamps: Подставлять текущее время вместо last_updated_at, чтобы данные не устаревали
+        """
+        self.prices = prices or {}
+        self.refresh_timestamps = refresh_timestamps
+
+    async def _load_prices(self) -> dict[str, dict]:
+        return self.prices
+
+    async def fetch_market_data_crypto(self, assets: list[str]) -> FetchResult:
+        prices = await self._load_prices()
+        now = int(time.time())
+
+        result = FetchResult()
+        for asset in assets:
+            data = prices.get(asset)
+            if data is None:
+                result.failed_assets.append(asset)
+            elif self.refresh_timestamps:
+                result.data[asset] = {**data, "last_updated_at": now}
+            else:
+                result.data[asset] = data
+        return result
+
+
+class FilePriceProvider(StaticPriceProvider):
+    """
+    Цены из JSON-файла в формате ответа simple/price. Файл перечитывается при изменении,
+    если он пропал или поврежден - используется последнее удачно прочитанное содержимое.
+    Метки времени берутся из файла: старый файл должен выглядеть устаревшим и для failover, и для метрик.
+    """
+    name = "file"
+
+    def __init__(self, path: str, refresh_timestamps: bool = False):
+        super().__init__(refresh_timestamps=refresh_timestamps)
+        self.path = path
+        self._mtime = None
+
+    def _read(self) -> dict[str, dict]:
+        with open(self.path) as file:
+            return json.load(file)
+
+    async def _load_prices(self) -> dict[str, dict]:
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime != self._mtime:
+                prices = await asyncio.to_thread(self._read)
+                self.prices = {asset: data for asset, data in prices.items() if is_complete(data)}
+                self._mtime = mtime
+                logger.info(f"Loaded {len(self.prices)} prices from {self.path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read prices file {self.path}: {e}")
+        return self.prices
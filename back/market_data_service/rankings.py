@@ -0,0 +1,63 @@
+import logging
+
+from back.market_data_service.leader import LeaderLease
+from back.market_data_service.market_data_fetcher import MarketDataFetcher
+from back.market_data_service.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+
+# Метрика рейтинга -> поле записи coins/markets
+RANKING_FIELDS = {
+    "market_cap": "market_cap",
+    "volume_24h": "total_volume",
+    "change_24h": "price_change_percentage_24h",
+}
+
+
+def build_rankings(markets: dict[str, dict]) -> dict[str, dict[str, float]]:
+    """{metric: {asset: score}}; активы без значения метрики в рейтинг не попадают"""
+    rankings = {metric: {} for metric in RANKING_FIELDS}
+    for asset, row in markets.items():
+        for metric, field in RANKING_FIELDS.items():
+            value = row.get(field)
+            if value is not None:
+                rankings[metric][asset] = float(value)
+    return rankings
+
+
+class RankingsUpdater:
+    """Периодически обновляет рейтинги рынка (ZSET по капитализации, объему и изменению за 24ч)"""
+
+    def __init__(self, fetcher: MarketDataFetcher, redis_client: RedisClient, pages: int, per_page: int = 250,
+                 lease: LeaderLease = None, evict_after_seconds: float = None):
+        """
+        Args:
+            evict_after_seconds: Через сколько без появления в ответе актив удаляется из рейтингов
+                при частичном обновлении (когда рейтинг сливается, а не пересобирается)
+        """
+        self.fetcher = fetcher
+        self.redis_client = redis_client
+        self.pages = pages
+        self.per_page = per_page
+        self.lease = lease
+        self.evict_after_seconds = evict_after_seconds
+
+    async def update_rankings(self):
+        if self.lease and not self.lease.is_leader:
+            return
+
+        try:
+            result = await self.fetcher.fetch_markets(self.pages, self.per_page)
+            if not result.data:
+                logger.warning("Market rankings update skipped: no markets data received")
+                return
+
+            # Если часть страниц не пришла, старые позиции остаются, иначе рейтинг пересобирается целиком
+            replace = not result.failed_chunks
+            evicted = await self.redis_client.save_rankings(build_rankings(result.data), replace=replace,
+                                                            evict_after_seconds=self.evict_after_seconds)
+            mode = "replaced" if replace else f"merged, some pages failed, {evicted} evicted"
+            logger.info(f"Market rankings updated for {len(result.data)} assets ({mode})")
+        except Exception as e:
+            logger.error(f"Error during market rankings update: {e}")
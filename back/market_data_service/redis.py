@@ -1,25 +1,366 @@
+import json
 from datetime import datetime
 
 from aioredis import Redis
+from aioredis.exceptions import WatchError
+
+from back.market_data_service.candles import Candle, CANDLE_RESOLUTIONS
+from back.market_data_service.snapshot_format import SNAPSHOT_BLOB_KEY, MarketSnapshot, encode_snapshot, \
+    decode_snapshot
+
+
+MARKET_DATA_KEY = "market_data:{asset}"
+SNAPSHOT_VERSION_KEY = "market_data:version"
+SNAPSHOT_UPDATED_AT_KEY = "market_data:updated_at"
+PRICE_HISTORY_KEY = "market_history:{asset}"
+CANDLES_KEY = "market_candles:{resolution}:{asset}"
+SCHEDULE_KEY = "market_data:schedule"
+HEALTH_KEY = "market_data:health"
+STALE_ASSETS_KEY = "market_data:stale"
+FX_RATES_KEY = "market_data:fx"
+FX_UPDATED_AT_KEY = "market_data:fx:updated_at"
+RANKING_KEY = "market_rank:{metric}"
+RANKING_SEEN_KEY = "market_rank:seen"
+LEADER_KEY = "market_data:leader"
+FENCING_TOKEN_KEY = "market_data:fencing_token"
+BACKFILL_CHECKPOINT_KEY = "market_data:backfill:checkpoint"
+
+
+class StaleFencingTokenError(Exception):
+    """Запись от реплики, которая уже не является лидером"""
+
+
+def encode_tick(timestamp: float, price: float) -> str:
+    return f"{timestamp}:{price}"
+
+
+def decode_tick(member: bytes) -> tuple[float, float]:
+    timestamp, price = member.decode().split(":")
+    return float(timestamp), float(price)
 
 
 class RedisClient:
-    def __init__(self, host, port, db):
+    def __init__(self, host, port, db, history_retention_seconds: int = 7 * 24 * 60 * 60,
+                 candle_retention_seconds: dict[str, int] = None):
         self.host = host
         self.port = port
         self.db = db
+        self.history_retention_seconds = history_retention_seconds
+        self.candle_retention_seconds = candle_retention_seconds or {}
         self.redis = None
 
     async def connect(self):
         self.redis = await Redis(host=self.host, port=self.port, db=self.db)
 
-    async def save_market_data_crypto(self, asset: str, current_price: float, usd_24h_change: float, last_updated_unix: float):
-        key = f"market_data:{asset}"
-        await self.redis.hset(key, mapping={
-            "current_price": current_price,
-            "usd_24h_change": usd_24h_change,
-            "last_updated": datetime.fromtimestamp(last_updated_unix).isoformat()
-        })
+    async def save_market_snapshot(self, snapshot: dict[str, dict],
+                                   candles: list[tuple[str, str, Candle]] = None,
+                                   blob_records: dict[str, tuple[float, float, float]] = None,
+                                   fencing_token: int = None, fx_rates: dict[str, float] = None) -> int:
+        """
+        Записывает весь снимок рынка одной транзакцией MULTI/EXEC.
+        Каждая цена также дописывается в историю актива (ZSET по времени),
+        записи старше history_retention_seconds отрезаются.
+
+        Если передан fencing_token, запись проходит только пока он совпадает с последним
+        выданным (market_data:fencing_token); ключ под WATCH, так что смена лидера
+        между проверкой и EXEC тоже отклоняет запись.
+
+        Args:
+            snapshot: {asset: {"current_price", "usd_24h_change", "last_updated_unix"}}
+            candles: Изменившиеся свечи от CandleAggregator, перезаписываются на месте
+            blob_records: Полное состояние рынка для бинарного снимка (см. snapshot_format)
+            fencing_token: Токен лидерства записывающей реплики (см. leader.LeaderLease)
+            fx_rates: {currency: units per 1 USD}, пишутся в market_data:fx вместе со снимком
+
+        Returns:
+            int: Новая версия снимка (market_data:version)
+
+        Raises:
+            StaleFencingTokenError: Выдан более новый токен, реплика больше не лидер
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Версия нужна внутри бинарного снимка, поэтому читаем ее под WATCH, а не через INCR
+                    await pipe.watch(SNAPSHOT_VERSION_KEY, FENCING_TOKEN_KEY)
+                    if fencing_token is not None:
+                        current_token = int(await pipe.get(FENCING_TOKEN_KEY) or 0)
+                        if current_token != fencing_token:
+                            raise StaleFencingTokenError(
+                                f"Fencing token {fencing_token} is stale, current is {current_token}")
+                    version = int(await pipe.get(SNAPSHOT_VERSION_KEY) or 0) + 1
+                    pipe.multi()
+                    self._queue_snapshot(pipe, version, snapshot, candles, blob_records, fx_rates)
+                    await pipe.execute()
+                    return version
+                except WatchError:
+                    continue
+
+    def _queue_snapshot(self, pipe, version: int, snapshot: dict[str, dict],
+                        candles: list[tuple[str, str, Candle]] = None,
+                        blob_records: dict[str, tuple[float, float, float]] = None,
+                        fx_rates: dict[str, float] = None):
+        now = datetime.now().timestamp()
+        history_cutoff = now - self.history_retention_seconds
+
+        for asset, data in snapshot.items():
+            pipe.hset(MARKET_DATA_KEY.format(asset=asset), mapping={
+                "current_price": data["current_price"],
+                "usd_24h_change": data["usd_24h_change"],
+                "last_updated": datetime.fromtimestamp(data["last_updated_unix"]).isoformat()
+            })
+            history_key = PRICE_HISTORY_KEY.format(asset=asset)
+            tick = encode_tick(data["last_updated_unix"], data["current_price"])
+            pipe.zadd(history_key, {tick: data["last_updated_unix"]})
+            pipe.zremrangebyscore(history_key, "-inf", f"({history_cutoff}")
+        for resolution, asset, candle in candles or []:
+            self._save_candle(pipe, resolution, asset, candle)
+        if blob_records is not None:
+            pipe.set(SNAPSHOT_BLOB_KEY, encode_snapshot(version, now, blob_records))
+        if fx_rates:
+            # У курсов своя метка свежести: они обновляются, только если провайдер вернул котировки
+            pipe.hset(FX_RATES_KEY, mapping=fx_rates)
+            pipe.set(FX_UPDATED_AT_KEY, now)
+        pipe.set(SNAPSHOT_VERSION_KEY, version)
+        pipe.set(SNAPSHOT_UPDATED_AT_KEY, now)
+
+    async def get_snapshot_version(self) -> int:
+        version = await self.redis.get(SNAPSHOT_VERSION_KEY)
+        return int(version) if version else 0
+
+    async def get_snapshot(self) -> MarketSnapshot | None:
+        blob = await self.redis.get(SNAPSHOT_BLOB_KEY)
+        return decode_snapshot(blob) if blob else None
+
+    async def get_price_history(self, asset: str, start: float, end: float) -> list[tuple[float, float]]:
+        """
+        Цены актива в интервале [start, end] (unix-время), отсортированные по времени.
+
+        Returns:
+            list: [(timestamp, price), ...]
+        """
+        members = await self.redis.zrangebyscore(PRICE_HISTORY_KEY.format(asset=asset), start, end)
+        return [decode_tick(member) for member in members]
+
+    async def load_recent_ticks(self, assets: list[str], count: int) -> dict[str, list[tuple[float, float]]]:
+        """Последние count тиков истории каждого актива, одним пайплайном"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for asset in assets:
+                pipe.zrange(PRICE_HISTORY_KEY.format(asset=asset), -count, -1)
+            results = await pipe.execute()
+
+        return {asset: [decode_tick(member) for member in members]
+                for asset, members in zip(assets, results) if members}
+
+    async def get_history_ranges(self, assets: list[str], since: dict[str, float],
+                                 until: float) -> dict[str, list[tuple[float, float]]]:
+        """Тики каждого актива в (since[asset], until], одним пайплайном; без since - с начала истории"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for asset in assets:
+                start = f"({since[asset]}" if asset in since else "-inf"
+                pipe.zrangebyscore(PRICE_HISTORY_KEY.format(asset=asset), start, until)
+            results = await pipe.execute()
+
+        return {asset: [decode_tick(member) for member in members]
+                for asset, members in zip(assets, results) if members}
+
+    async def load_market_data(self, assets: list[str]) -> dict[str, dict]:
+        """Последние записанные данные активов из market_data:{asset}, одним пайплайном"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for asset in assets:
+                pipe.hmget(MARKET_DATA_KEY.format(asset=asset), "current_price", "usd_24h_change", "last_updated")
+            results = await pipe.execute()
+
+        return {
+            asset: {
+                "current_price": float(price),
+                "usd_24h_change": float(change),
+                "last_updated_unix": datetime.fromisoformat(last_updated.decode()).timestamp(),
+            }
+            for asset, (price, change, last_updated) in zip(assets, results)
+            if price is not None and change is not None and last_updated is not None
+        }
+
+    def _save_candle(self, pipe, resolution: str, asset: str, candle: Candle):
+        key = CANDLES_KEY.format(resolution=resolution, asset=asset)
+        pipe.zremrangebyscore(key, candle.start, candle.start)
+        pipe.zadd(key, {candle.encode(): candle.start})
+        retention = self.candle_retention_seconds.get(resolution)
+        if retention:
+            pipe.zremrangebyscore(key, "-inf", f"({candle.start - retention}")
+
+    async def load_open_candles(self, assets: list[str],
+                                resolutions: dict[str, int] = None) -> list[tuple[str, str, Candle]]:
+        """Последняя свеча каждого актива и разрешения, чтобы продолжить агрегацию после рестарта"""
+        keys = [(resolution, asset) for resolution in (resolutions or CANDLE_RESOLUTIONS) for asset in assets]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for resolution, asset in keys:
+                pipe.zrange(CANDLES_KEY.format(resolution=resolution, asset=asset), -1, -1)
+            results = await pipe.execute()
+
+        return [(resolution, asset, Candle.decode(members[0]))
+                for (resolution, asset), members in zip(keys, results) if members]
+
+    async def get_candle_ranges(self, resolution: str, assets: list[str], since: dict[str, float],
+                                until: float) -> dict[str, list[Candle]]:
+        """Свечи каждого актива с началом в (since[asset], until], одним пайплайном"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for asset in assets:
+                start = f"({since[asset]}" if asset in since else "-inf"
+                pipe.zrangebyscore(CANDLES_KEY.format(resolution=resolution, asset=asset), start, until)
+            results = await pipe.execute()
+
+        return {asset: [Candle.decode(member) for member in members]
+                for asset, members in zip(assets, results) if members}
+
+    async def get_candles(self, assets: list[str], resolution: str, start: float, end: float) -> dict:
+        """
+        Свечи нескольких активов за [start, end], выровненные по общей временной сетке.
+        Все активы читаются одним пайплайном.
+
+        Returns:
+            dict: {"timestamps": [...], "candles": {asset: {"open": [...], "high": [...],
+                   "low": [...], "close": [...]}}}, пропуски заполнены None
+        """
+        seconds = CANDLE_RESOLUTIONS[resolution]
+        first_bucket = int(start) - int(start) % seconds
+        timestamps = list(range(first_bucket, int(end) + 1, seconds))
+        positions = {timestamp: i for i, timestamp in enumerate(timestamps)}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for asset in assets:
+                pipe.zrangebyscore(CANDLES_KEY.format(resolution=resolution, asset=asset), first_bucket, end)
+            results = await pipe.execute()
+
+        candles = {}
+        for asset, members in zip(assets, results):
+            columns = {field: [None] * len(timestamps) for field in ("open", "high", "low", "close")}
+            for member in members:
+                candle = Candle.decode(member)
+                i = positions.get(candle.start)
+                if i is None:
+                    continue
+                columns["open"][i] = candle.open
+                columns["high"][i] = candle.high
+                columns["low"][i] = candle.low
+                columns["close"][i] = candle.close
+            candles[asset] = columns
+
+        return {"timestamps": timestamps, "candles": candles}
+
+    async def save_rankings(self, rankings: dict[str, dict[str, float]], replace: bool = True,
+                            evict_after_seconds: float = None):
+        """
+        Рейтинги {metric: {asset: score}} в ZSET market_rank:{metric}.
+        При replace рейтинг собирается во временном ключе и подменяется RENAME,
+        так что читатели не видят его наполовину записанным.
+
+        Время последнего появления актива в ответе хранится в market_rank:seen. При слиянии
+        (replace=False) активы, которых не было дольше evict_after_seconds, удаляются из всех
+        рейтингов, иначе выпавшие из топа монеты копились бы в ZSET бесконечно.
+        """
+        now = datetime.now().timestamp()
+        seen = {asset: now for scores in rankings.values() for asset in scores}
+        expired = []
+        if not replace and evict_after_seconds:
+            expired = await self.redis.zrangebyscore(RANKING_SEEN_KEY, "-inf", f"({now - evict_after_seconds}")
+            expired = [asset for asset in expired if asset.decode() not in seen]
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for metric, scores in rankings.items():
+                key = RANKING_KEY.format(metric=metric)
+                if not scores:
+                    continue
+                if replace:
+                    tmp_key = f"{key}:tmp"
+                    pipe.delete(tmp_key)
+                    pipe.zadd(tmp_key, scores)
+                    pipe.rename(tmp_key, key)
+                else:
+                    pipe.zadd(key, scores)
+                    if expired:
+                        pipe.zrem(key, *expired)
+            if replace:
+                pipe.delete(RANKING_SEEN_KEY)
+            elif expired:
+                pipe.zrem(RANKING_SEEN_KEY, *expired)
+            if seen:
+                pipe.zadd(RANKING_SEEN_KEY, seen)
+            await pipe.execute()
+        return len(expired)
+
+    async def get_first_timestamps(self, assets: list[str]) -> dict[str, float]:
+        """
+        Время самой ранней записи актива (дневная свеча или тик истории), одним пайплайном.
+        Активы без данных в результат не попадают.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for asset in assets:
+                pipe.zrange(CANDLES_KEY.format(resolution="1d", asset=asset), 0, 0, withscores=True)
+                pipe.zrange(PRICE_HISTORY_KEY.format(asset=asset), 0, 0, withscores=True)
+            results = await pipe.execute()
+
+        first_timestamps = {}
+        for i, asset in enumerate(assets):
+            scores = [score for _, score in results[2 * i] + results[2 * i + 1]]
+            if scores:
+                first_timestamps[asset] = min(scores)
+        return first_timestamps
+
+    async def get_backfill_checkpoints(self, assets: list[str]) -> dict[str, tuple[float, float, float]]:
+        """
+        Returns:
+            dict: {asset: (start, done_until, end)} - интервал догрузки и момент, до которого он уже записан
+        """
+        values = await self.redis.hmget(BACKFILL_CHECKPOINT_KEY, assets) if assets else []
+        return {asset: tuple(float(part) for part in value.decode().split(":"))
+                for asset, value in zip(assets, values) if value}
+
+    async def reset_backfill_checkpoints(self):
+        await self.redis.delete(BACKFILL_CHECKPOINT_KEY)
+
+    async def save_backfill_chunk(self, asset: str, start: float, end: float, ticks: list[tuple[float, float]],
+                                  candles: list[tuple[str, Candle]], checkpoint: tuple[float, float, float]):
+        """
+        Записывает кусок исторических данных актива за [start, end) и чекпоинт догрузки одной транзакцией:
+        после падения кусок либо записан целиком вместе с чекпоинтом, либо не записан вовсе.
+        Прежние записи в интервале заменяются, поэтому повтор куска ничего не дублирует.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if ticks:
+                key = PRICE_HISTORY_KEY.format(asset=asset)
+                pipe.zremrangebyscore(key, start, f"({end}")
+                pipe.zadd(key, {encode_tick(timestamp, price): timestamp for timestamp, price in ticks})
+
+            by_resolution = {}
+            for resolution, candle in candles:
+                by_resolution.setdefault(resolution, {})[candle.encode()] = candle.start
+            for resolution, members in by_resolution.items():
+                key = CANDLES_KEY.format(resolution=resolution, asset=asset)
+                pipe.zremrangebyscore(key, start, f"({end}")
+                pipe.zadd(key, members)
+
+            pipe.hset(BACKFILL_CHECKPOINT_KEY, asset, ":".join(str(part) for part in checkpoint))
+            await pipe.execute()
+
+    async def save_schedule(self, schedule: list[dict]):
+        await self.redis.set(SCHEDULE_KEY, json.dumps(schedule))
+
+    async def save_health(self, health: dict, stale_assets: set[str], ttl_seconds: int = None):
+        """
+        Сводка свежести в market_data:health и множество устаревших активов для SISMEMBER.
+
+        Ключи живут ttl_seconds: если лидер упал или завис, они пропадают, а не показывают
+        последнее "свежее" состояние. Отсутствие market_data:health читатели считают деградацией.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(HEALTH_KEY, json.dumps(health), ex=ttl_seconds)
+            pipe.delete(STALE_ASSETS_KEY)
+            if stale_assets:
+                pipe.sadd(STALE_ASSETS_KEY, *stale_assets)
+                if ttl_seconds:
+                    pipe.expire(STALE_ASSETS_KEY, ttl_seconds)
+            await pipe.execute()
 
     async def close(self):
         if self.redis:
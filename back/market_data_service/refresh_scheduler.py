@@ -0,0 +1,132 @@
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from back.market_data_service.events import SnapshotDiffer
+from back.market_data_service.universe import AssetUniverse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RefreshTier:
+    name: str
+    interval_minutes: float
+    min_holders: int
+    min_volatility: float
+    assets: list[str] = field(default_factory=list)
+
+    def accepts(self, holders: int, volatility: float) -> bool:
+        return (self.min_holders > 0 and holders >= self.min_holders) or volatility >= self.min_volatility
+
+
+def default_tiers() -> list[RefreshTier]:
+    return [
+        RefreshTier("hot", interval_minutes=1, min_holders=5, min_volatility=5.0),
+        RefreshTier("warm", interval_minutes=3, min_holders=1, min_volatility=2.0),
+        RefreshTier("cold", interval_minutes=15, min_holders=0, min_volatility=0.0),
+    ]
+
+
+class TieredRefreshScheduler:
+    """
+    Раскладывает активы по уровням частоты обновления.
+
+    Уровень выбирается по числу портфелей, в которых лежит актив, и по модулю
+    изменения цены за 24ч. Если суммарное число запросов в минуту не влезает в
+    budget_per_minute, наименее приоритетные активы понижаются на уровень ниже,
+    а если не хватает и этого - растягивается интервал последнего уровня.
+    """
+
+    def __init__(self, scheduler: AsyncIOScheduler, update_job: Callable[[list[str]], Awaitable],
+                 universe: AssetUniverse, snapshot_differ: SnapshotDiffer, redis_client,
+                 max_ids_length: int, budget_per_minute: float, tiers: list[RefreshTier] = None):
+        self.scheduler = scheduler
+        self.update_job = update_job
+        self.universe = universe
+        self.snapshot_differ = snapshot_differ
+        self.redis_client = redis_client
+        self.max_ids_length = max_ids_length
+        self.budget_per_minute = budget_per_minute
+        self.tiers = tiers or default_tiers()
+        self._base_intervals = {tier.name: tier.interval_minutes for tier in self.tiers}
+
+    def _requests_per_minute(self, ids_length: int, interval_minutes: float) -> float:
+        return math.ceil(ids_length / self.max_ids_length) / interval_minutes
+
+    def assign_tiers(self):
+        holders = self.universe.holders
+        volatility = {asset: abs(change) for asset, change in self.snapshot_differ.changes_24h.items()}
+        ranked = sorted(self.universe.assets,
+                        key=lambda a: (holders.get(a, 0), volatility.get(a, 0.0)), reverse=True)
+
+        for tier in self.tiers:
+            tier.assets = []
+            tier.interval_minutes = self._base_intervals[tier.name]
+        for asset in ranked:
+            tier = next(t for t in self.tiers if t.accepts(holders.get(asset, 0), volatility.get(asset, 0.0)))
+            tier.assets.append(asset)
+
+        # Длина параметра ids (с запятыми) для оценки числа чанков без повторной нарезки
+        ids_length = {tier.name: sum(len(a) + 1 for a in tier.assets) for tier in self.tiers}
+
+        def total_requests() -> float:
+            return sum(self._requests_per_minute(ids_length[t.name], t.interval_minutes) for t in self.tiers)
+
+        for upper, lower in zip(self.tiers, self.tiers[1:]):
+            while upper.assets and total_requests() > self.budget_per_minute:
+                asset = upper.assets.pop()
+                lower.assets.insert(0, asset)
+                ids_length[upper.name] -= len(asset) + 1
+                ids_length[lower.name] += len(asset) + 1
+
+        last = self.tiers[-1]
+        if total_requests() > self.budget_per_minute:
+            upper_requests = total_requests() - self._requests_per_minute(ids_length[last.name], last.interval_minutes)
+            remaining_budget = max(self.budget_per_minute - upper_requests, 1e-6)
+            last.interval_minutes = math.ceil(ids_length[last.name] / self.max_ids_length) / remaining_budget
+
+    def get_schedule(self) -> list[dict]:
+        return [
+            {
+                "tier": tier.name,
+                "interval_minutes": round(tier.interval_minutes, 2),
+                "assets_count": len(tier.assets),
+                "requests_per_minute": round(
+                    self._requests_per_minute(sum(len(a) + 1 for a in tier.assets), tier.interval_minutes), 2),
+            }
+            for tier in self.tiers
+        ]
+
+    async def _refresh_tier(self, tier_name: str):
+        tier = next(t for t in self.tiers if t.name == tier_name)
+        if tier.assets:
+            await self.update_job(list(tier.assets))
+
+    async def reschedule(self):
+        self.assign_tiers()
+
+        for tier in self.tiers:
+            job_id = f"refresh_{tier.name}"
+            trigger = IntervalTrigger(minutes=tier.interval_minutes)
+            job = self.scheduler.get_job(job_id)
+            if job:
+                # Перезапускаем таймер только при смене интервала, иначе джоб никогда не дождется срабатывания
+                if job.trigger.interval != trigger.interval:
+                    self.scheduler.reschedule_job(job_id, trigger=trigger)
+            else:
+                self.scheduler.add_job(self._refresh_tier, trigger=trigger, args=[tier.name], id=job_id,
+                                       max_instances=1, coalesce=True)
+
+        schedule = self.get_schedule()
+        logger.info("Market data refresh schedule: " + "; ".join(
+            f"{t['tier']} every {t['interval_minutes']}m: {t['assets_count']} assets, "
+            f"{t['requests_per_minute']} req/min" for t in schedule))
+        try:
+            await self.redis_client.save_schedule(schedule)
+        except Exception as e:
+            logger.warning(f"Failed to publish refresh schedule to Redis: {e}")
@@ -0,0 +1,95 @@
+"""
+Бинарный формат полного снимка рынка в одном ключе Redis (market_data:snapshot:bin).
+
+Раскладка (little-endian):
+    header   - magic, версия формата, версия снимка, время записи, число активов, размер таблицы имен
+    names    - имена активов в UTF-8, разделенные "\\n"; позиция имени - индекс записи
+    records  - count * 3 float64: current_price, usd_24h_change, last_updated (unix)
+
+Модуль не зависит ни от чего, кроме stdlib, чтобы его можно было
+использовать в portfolio_service и в боте.
+"""
+import struct
+import sys
+from array import array
+
+SNAPSHOT_BLOB_KEY = "market_data:snapshot:bin"
+
+MAGIC = b"MDSN"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHxxQdII")
+FIELDS_PER_RECORD = 3
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+def encode_snapshot(version: int, updated_at: float, records: dict[str, tuple[float, float, float]]) -> bytes:
+    """
+    Args:
+        records: {asset: (current_price, usd_24h_change, last_updated_unix)}
+    """
+    names = "\n".join(records).encode()
+    values = array("d")
+    for price, change, last_updated in records.values():
+        values.extend((price, change, last_updated))
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, version, updated_at, len(records), len(names))
+    return header + names + values.tobytes()
+
+
+class MarketSnapshot:
+    """Декодированный снимок: одна таблица индексов и один плоский массив float64"""
+
+    __slots__ = ("version", "updated_at", "assets", "index", "values")
+
+    def __init__(self, version: int, updated_at: float, assets: list[str], values: array):
+        self.version = version
+        self.updated_at = updated_at
+        self.assets = assets
+        self.index = {asset: i for i, asset in enumerate(assets)}
+        self.values = values
+
+    def __len__(self):
+        return len(self.assets)
+
+    def __contains__(self, asset: str):
+        return asset in self.index
+
+    def get(self, asset: str) -> tuple[float, float, float] | None:
+        """(current_price, usd_24h_change, last_updated_unix) или None, если актива нет в снимке"""
+        i = self.index.get(asset)
+        if i is None:
+            return None
+        offset = i * FIELDS_PER_RECORD
+        return self.values[offset], self.values[offset + 1], self.values[offset + 2]
+
+    def price(self, asset: str) -> float | None:
+        i = self.index.get(asset)
+        return None if i is None else self.values[i * FIELDS_PER_RECORD]
+
+
+def decode_snapshot(blob: bytes) -> MarketSnapshot:
+    if len(blob) < HEADER.size:
+        raise SnapshotFormatError("Snapshot blob is truncated")
+
+    magic, format_version, version, updated_at, count, names_size = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise SnapshotFormatError(f"Unknown snapshot magic {magic!r}")
+    if format_version != FORMAT_VERSION:
+        raise SnapshotFormatError(f"Unsupported snapshot format version {format_version}")
+
+    names_end = HEADER.size + names_size
+    values = array("d")
+    values_size = count * FIELDS_PER_RECORD * values.itemsize
+    if len(blob) < names_end + values_size:
+        raise SnapshotFormatError("Snapshot blob is truncated")
+    values.frombytes(blob[names_end:names_end + values_size])
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    assets = blob[HEADER.size:names_end].decode().split("\n") if count else []
+    return MarketSnapshot(version, updated_at, assets, values)
@@ -0,0 +1,57 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+logger = logging.getLogger(__name__)
+
+
+TRACKED_ASSETS_QUERY = text("""
+    SELECT a.name,
+           COUNT(DISTINCT pa.portfolio_id) FILTER (WHERE pa.quantity > 0) AS holders
+    FROM assets a
+    LEFT JOIN portfolio_assets pa ON pa.asset_id = a.id
+    WHERE a.asset_type = 'crypto' AND a.is_active
+    GROUP BY a.id, a.name
+    ORDER BY holders DESC, a.id
+""")
+
+
+class AssetUniverse:
+    """
+    Набор отслеживаемых активов, загружаемый из таблицы assets портфельной БД.
+
+    Активы, которые сейчас лежат хотя бы в одном портфеле, идут первыми,
+    поэтому при нехватке лимита запросов они запрашиваются в первую очередь.
+    """
+
+    def __init__(self, db_url: str, fallback_assets: list[str]):
+        self.engine = create_async_engine(db_url, pool_size=1, max_overflow=0)
+        self.fallback_assets = fallback_assets
+        self.assets: list[str] = list(fallback_assets)
+        self.holders: dict[str, int] = {}
+
+    @property
+    def held_assets(self) -> list[str]:
+        return [asset for asset in self.assets if self.holders.get(asset, 0) > 0]
+
+    async def refresh(self):
+        try:
+            async with self.engine.connect() as connection:
+                rows = (await connection.execute(TRACKED_ASSETS_QUERY)).all()
+        except Exception as e:
+            logger.error(f"Failed to load asset universe from portfolio DB, keeping {len(self.assets)} assets: {e}")
+            return
+
+        if not rows:
+            logger.warning("Assets table is empty, keeping previous asset universe")
+            return
+
+        added = {row.name for row in rows} - set(self.assets)
+        self.assets = [row.name for row in rows]
+        self.holders = {row.name: row.holders for row in rows}
+        logger.info(f"Asset universe refreshed: {len(self.assets)} assets, {len(self.held_assets)} held, "
+                    f"{len(added)} new")
+
+    async def close(self):
+        await self.engine.dispose()
@@ -0,0 +1,142 @@
+import logging
+import time
+from collections import Counter
+
+from back.market_data_service.candles import CandleAggregator
+from back.market_data_service.events import SnapshotDiffer
+from back.market_data_service.fx import derive_fx_rates
+from back.market_data_service.leader import LeaderLease
+from back.market_data_service.metrics import CycleMetrics, MarketDataMetrics
+from back.market_data_service.outliers import OutlierFilter
+from back.market_data_service.providers import PriceProvider
+from back.market_data_service.redis import RedisClient, StaleFencingTokenError
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataUpdater:
+    """Один цикл обновления: запрос цен, запись снимка в Redis, публикация изменений"""
+
+    def __init__(self, price_provider: PriceProvider, redis_client: RedisClient,
+                 candle_aggregator: CandleAggregator, snapshot_differ: SnapshotDiffer, producer=None,
+                 metrics: MarketDataMetrics = None, lease: LeaderLease = None,
+                 outlier_filter: OutlierFilter = None, quote_currencies: list[str] = None):
+        self.price_provider = price_provider
+        self.redis_client = redis_client
+        self.candle_aggregator = candle_aggregator
+        self.snapshot_differ = snapshot_differ
+        self.producer = producer
+        self.metrics = metrics
+        self.lease = lease
+        self.outlier_filter = outlier_filter
+        self.quote_currencies = quote_currencies or []
+
+    async def update_market_data(self, assets: list[str]):
+        if self.lease and not self.lease.is_leader:
+            logger.debug(f"Standby instance, skipping market data update for {len(assets)} assets")
+            return
+        # Токен фиксируется на весь цикл: если аренда истечет во время медленного запроса,
+        # запись все равно пойдет со старым токеном и будет отклонена, а не пройдет без проверки
+        fencing_token = self.lease.token if self.lease else None
+
+        logger.info(f"Starting market data update for {len(assets)} assets")
+        cycle = CycleMetrics(started_at=time.time(), requested=len(assets))
+        try:
+            fetch_started = time.perf_counter()
+            fetch_result = await self.price_provider.fetch_market_data_crypto(assets)
+            cycle.fetch_duration = time.perf_counter() - fetch_started
+            cycle.failed_assets = list(fetch_result.failed_assets)
+            chunk_timings = ", ".join(f"#{c.index}: {c.duration:.2f}s/{c.attempts}" for c in fetch_result.chunks)
+            logger.info(f"Fetched {len(fetch_result.data)} assets in {len(fetch_result.chunks)} chunks ({chunk_timings})")
+            if fetch_result.sources:
+                sources = Counter(fetch_result.sources.values())
+                logger.info(f"Assets by provider: {dict(sources)}")
+            if fetch_result.failed_assets:
+                logger.warning(f"Assets missing after retries: {fetch_result.failed_assets}")
+
+            if fetch_result.data:
+                snapshot = {}
+                for asset, data in fetch_result.data.items():
+                    current_price = data.get("usd")
+                    usd_24h_change = data.get("usd_24h_change")
+                    last_updated_unix = data.get("last_updated_at")
+
+                    if current_price is not None and usd_24h_change is not None and last_updated_unix is not None:
+                        snapshot[asset] = {
+                            "current_price": current_price,
+                            "usd_24h_change": usd_24h_change,
+                            "last_updated_unix": last_updated_unix
+                        }
+                    else:
+                        logger.warning(f"Invalid data for asset {asset}: {data}")
+                        cycle.failed_assets.append(asset)
+
+                if self.outlier_filter:
+                    cycle.quarantined_assets = self._quarantine_outliers(snapshot)
+
+                if snapshot:
+                    candles = []
+                    for asset, data in snapshot.items():
+                        candles.extend(self.candle_aggregator.add_tick(asset, data["last_updated_unix"],
+                                                                       data["current_price"]))
+
+                    changes = self.snapshot_differ.diff(snapshot)
+                    fx_rates = derive_fx_rates(fetch_result.data, self.quote_currencies)
+                    if self.lease and fencing_token is None:
+                        raise StaleFencingTokenError("Leadership lost before the snapshot write")
+                    write_started = time.perf_counter()
+                    version = await self.redis_client.save_market_snapshot(
+                        snapshot, candles, blob_records=self.snapshot_differ.records(snapshot),
+                        fencing_token=fencing_token, fx_rates=fx_rates)
+                    cycle.write_duration = time.perf_counter() - write_started
+                    cycle.written, cycle.version = len(snapshot), version
+                    self.snapshot_differ.apply(snapshot)
+                    logger.info(f"Market data update completed. Processed {len(snapshot)} assets, "
+                                f"snapshot version {version}.")
+
+                    if changes and self.producer:
+                        await self.producer.price_changes(version, changes)
+                else:
+                    logger.warning("Market data update skipped: no valid assets in response")
+            else:
+                logger.warning("No market data received from fetcher")
+        except StaleFencingTokenError as e:
+            # Другая реплика уже стала лидером: ее снимок не перезаписываем и ее health не трогаем
+            self.lease.step_down(str(e))
+            return
+        except Exception as e:
+            logger.error(f"Error during market data update: {e}")
+            cycle.error = str(e)
+        await self._report_cycle(cycle, assets)
+
+    def _quarantine_outliers(self, snapshot: dict[str, dict]) -> list[str]:
+        """Убирает из снимка подозрительные тики до подтверждения следующим наблюдением"""
+        quarantined = [
+            asset for asset, data in snapshot.items()
+            if not self.outlier_filter.check(asset, data["last_updated_unix"], data["current_price"])
+        ]
+        for asset in quarantined:
+            pending = self.outlier_filter.quarantine[asset]
+            logger.warning(f"Quarantined {asset} tick {pending.price} at {pending.timestamp}, "
+                           f"last written price {self.snapshot_differ.prices.get(asset)}")
+            del snapshot[asset]
+        return quarantined
+
+    def retain(self, assets: list[str]):
+        """Забывает состояние активов, которых больше нет в отслеживаемом наборе"""
+        self.snapshot_differ.retain(assets)
+        if self.metrics:
+            self.metrics.retain(assets)
+
+    async def _report_cycle(self, cycle: CycleMetrics, assets: list[str]):
+        if not self.metrics:
+            return
+        self.metrics.record_cycle(cycle, self.snapshot_differ.last_updated, assets)
+        if self.metrics.stale_assets:
+            logger.warning(f"{len(self.metrics.stale_assets)} assets have stale market data")
+        try:
+            # После stale_after_seconds без новых циклов сводка все равно уже неверна
+            await self.redis_client.save_health(self.metrics.health(), self.metrics.stale_assets,
+                                                ttl_seconds=int(self.metrics.stale_after_seconds))
+        except Exception as e:
+            logger.error(f"Failed to save market data health: {e}")
@@ -5,7 +5,18 @@ from back.portfolio_service.exceptions import UserDoesntOwnPortfolioException, U
     TransactionDoesntExistsException, PortfolioDoesntExistException
 from back.portfolio_service.utils.uow import IUnitOfWork, UnitOfWork
 
-UOWDep = Annotated[IUnitOfWork, Depends(UnitOfWork)]
+
+async def get_uow():
+    """
+    Один UoW на запрос: FastAPI кэширует зависимость в пределах запроса, поэтому роут и проверки
+    владения работают в одной сессии на одном соединении, а сервисы входят в нее вложенно
+    """
+    uow = UnitOfWork()
+    async with uow:
+        yield uow
+
+
+UOWDep = Annotated[IUnitOfWork, Depends(get_uow)]
 
 
 async def user_owns_portfolio(user_id: int, portfolio_id: int, uow: UOWDep):
@@ -23,6 +23,16 @@ class TransactionCannotConductException(PortfolioException):
     detail = "Can not conduct transaction"
 
 
+class TransactionPriceUnavailableException(PortfolioException):
+    status_code = 422
+    detail = "Price is not specified and there is no price history for the asset at transaction date"
+
+
+class UnsupportedCurrencyException(PortfolioException):
+    status_code = 400
+    detail = "Currency is not supported"
+
+
 class PortfolioAlreadyExistException(PortfolioException):
     status_code = 409
     detail = "Portfolio already exist"
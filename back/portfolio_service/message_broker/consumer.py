@@ -1,12 +1,19 @@
+import logging
+
 from faststream.rabbit import RabbitRouter, RabbitExchange, ExchangeType
 
 from back.portfolio_service.database import async_session_maker
 from back.portfolio_service.repositories.portfolio import PortfolioRepository
 from back.portfolio_service.repositories.users import UsersRepository
+from back.portfolio_service.services.bulk_revaluation import bulk_revaluation_service
+from back.portfolio_service.utils.uow import UnitOfWork
+
+logger = logging.getLogger(__name__)
 
 rabbit_router = RabbitRouter()
 
 user_exchange = RabbitExchange("user_exchange", type=ExchangeType.DIRECT)
+market_data_exchange = RabbitExchange("market_data_exchange", type=ExchangeType.DIRECT)
 
 
 
@@ -35,3 +42,19 @@ async def handle_delete_user(message):
     async with async_session_maker() as session:
         await UsersRepository(session).delete(int(user_id))
         await session.commit()
+
+
+@rabbit_router.subscriber("portfolio_price_changed", market_data_exchange)
+async def handle_price_changes(message):
+    from back.portfolio_service.portfolio_main import price_scheduler
+
+    try:
+        await bulk_revaluation_service.revalue_all(UnitOfWork())
+    except Exception as e:
+        logger.error(f"Bulk revaluation failed for snapshot {message['version']}: {e}")
+
+    if price_scheduler is None or not price_scheduler.is_running:
+        logger.debug(f"Skipping price change event for snapshot {message['version']}: monitoring is not running")
+        return
+
+    await price_scheduler.price_monitoring_service.check_price_change_events(message["changes"])
@@ -0,0 +1,31 @@
+"""asset catalog sync
+
+Revision ID: 8d2f4c6a1b3e
+Revises: 25111fc37b2d
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f4c6a1b3e'
+down_revision: Union[str, None] = '25111fc37b2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('assets', sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=False))
+    op.add_column('assets', sa.Column('delisted_at', sa.DateTime(timezone=True), nullable=True))
+    # Ключ для INSERT ... ON CONFLICT при синхронизации каталога
+    op.create_unique_constraint('uq_assets_name', 'assets', ['name'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_assets_name', 'assets', type_='unique')
+    op.drop_column('assets', 'delisted_at')
+    op.drop_column('assets', 'is_active')
@@ -1,4 +1,6 @@
-from sqlalchemy import Enum
+from datetime import datetime
+
+from sqlalchemy import DateTime, Enum, true
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from back.portfolio_service.database import Base
@@ -9,9 +11,11 @@ class Assets(Base):
     __tablename__ = "assets"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str]
+    name: Mapped[str] = mapped_column(unique=True)
     symbol: Mapped[str]
     asset_type: Mapped[AssetType] = mapped_column(Enum(AssetType))
+    is_active: Mapped[bool] = mapped_column(default=True, server_default=true())
+    delisted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     portfolio_assets: Mapped[list["PortfolioAssets"]] = relationship(back_populates="asset")
     transactions: Mapped[list["Transactions"]] = relationship(back_populates="asset")
@@ -21,5 +25,6 @@ class Assets(Base):
             id=self.id,
             name=self.name,
             symbol=self.symbol,
-            asset_type=self.asset_type
+            asset_type=self.asset_type,
+            is_active=self.is_active
         )
@@ -3,32 +3,38 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 
+from back.config import PortfolioSettings
 from back.logging import setup_logging_base_config
 from back.portfolio_service.message_broker.rabbitmq import rabbit_broker
 from back.portfolio_service.routers import all_routers
-from back.portfolio_service.utils.uow import UnitOfWork
 from back.portfolio_service.redis import redis_client
+from back.portfolio_service.schedulers.catalog_scheduler import AssetCatalogScheduler
 from back.portfolio_service.schedulers.price_scheduler import PriceMonitoringScheduler
-from back.portfolio_service.services.portfolio import PortfolioService
+from back.portfolio_service.services.asset_catalog import AssetCatalogService
+from back.portfolio_service.services.revaluation import revaluation_queue
 
 
 setup_logging_base_config()
 logger = logging.getLogger(__name__)
 
+portfolio_settings = PortfolioSettings()
+
 price_scheduler: PriceMonitoringScheduler = None
+catalog_scheduler: AssetCatalogScheduler = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global price_scheduler
+    global price_scheduler, catalog_scheduler
     
     try:
-        await rabbit_broker.start()
-        logger.info("RabbitMQ broker started in portfolio service")
-
+        # Redis нужен обработчикам portfolio_price_changed, поэтому подключается до старта брокера
         await redis_client.connect()
         logger.info("Redis client connected in portfolio service")
 
+        await rabbit_broker.start()
+        logger.info("RabbitMQ broker started in portfolio service")
+
         price_scheduler = PriceMonitoringScheduler(
             price_change_threshold=5.0,
             check_interval_minutes=15
@@ -38,6 +44,20 @@ async def lifespan(app: FastAPI):
             logger.info("Price monitoring scheduler started successfully")
         else:
             logger.error("Failed to start price monitoring scheduler")
+
+        catalog_scheduler = AssetCatalogScheduler(
+            AssetCatalogService(
+                portfolio_settings.ASSET_CATALOG_URL,
+                api_key=portfolio_settings.COINGECKO_API_KEY,
+                max_rank=portfolio_settings.ASSET_CATALOG_MAX_RANK,
+                max_delist_ratio=portfolio_settings.ASSET_CATALOG_MAX_DELIST_RATIO,
+            ),
+            sync_interval_hours=portfolio_settings.ASSET_CATALOG_SYNC_HOURS,
+        )
+        if not await catalog_scheduler.start():
+            logger.error("Failed to start asset catalog scheduler")
+
+        revaluation_queue.start()
         
     except Exception as e:
         logger.error(f"Startup error in portfolio service: {e}")
@@ -47,8 +67,12 @@ async def lifespan(app: FastAPI):
 
     logger.info("Portfolio service shutdown initiated")
 
+    await revaluation_queue.stop()
+
     if price_scheduler:
         await price_scheduler.stop()
+    if catalog_scheduler:
+        await catalog_scheduler.stop()
 
     try:
         await rabbit_broker.stop()
@@ -76,10 +100,8 @@ async def update_portfolio_value_middleware(request: Request, call_next):
 
     if user_id:
         try:
-            user_id = int(user_id)
-            portfolio_id = await PortfolioService().get_portfolio(UnitOfWork(), user_id=user_id)
-            if portfolio_id:
-                await PortfolioService().update_portfolio_value(UnitOfWork(), portfolio_id.id)
+            # Пересчет стоимости идет в фоне, ответ его не ждет
+            revaluation_queue.enqueue(int(user_id))
         except ValueError:
             logger.warning(f"Invalid user_id: {user_id}")
 
@@ -1,34 +1,260 @@
-from aioredis import Redis
+import asyncio
+import json
+import logging
+import time
+
+from aioredis import BlockingConnectionPool, Redis
 
 from back.config import RedisSettings
+from back.market_data_service.snapshot_format import SNAPSHOT_BLOB_KEY, MarketSnapshot, decode_snapshot
+
+logger = logging.getLogger(__name__)
 
 redis_settings = RedisSettings()
 
+SNAPSHOT_VERSION_KEY = "market_data:version"
+# Порог устаревания, пока market_data:health нет (как MARKET_STALE_AFTER_MINUTES по умолчанию)
+DEFAULT_STALE_AFTER_SECONDS = 30 * 60
+
+
+class PriceNearCache:
+    """
+    Декодированные market_data:{asset} в памяти процесса, действительные в пределах одного снимка рынка.
+
+    Новый снимок (смена market_data:version) сбрасывает кэш целиком: о смене сообщает keyspace-уведомление,
+    если они включены (REDIS_KEYSPACE_NOTIFICATIONS), иначе - проверка версии не чаще раза
+    в version_check_seconds. TTL записей -
+    страховка на случай потерянного уведомления.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, version_check_seconds: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.notifications = False
+        self.generation = 0
+        self._entries: dict[str, tuple[dict, int, float]] = {}
+        self._version = None
+        self._version_checked_at = 0.0
+
+    def invalidate(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def needs_version_check(self) -> bool:
+        # С уведомлениями версию сверяем только как страховку, раз в TTL
+        interval = self.ttl_seconds if self.notifications else self.version_check_seconds
+        return time.monotonic() - self._version_checked_at >= interval
+
+    def observe_version(self, version: int):
+        if version != self._version:
+            self._version = version
+            self.invalidate()
+        self._version_checked_at = time.monotonic()
+
+    def get(self, asset: str) -> dict | None:
+        entry = self._entries.get(asset)
+        if entry is None:
+            return None
+        data, generation, stored_at = entry
+        if generation != self.generation or time.monotonic() - stored_at >= self.ttl_seconds:
+            return None
+        return data
+
+    def put(self, asset: str, data: dict, generation: int):
+        # Данные, прочитанные до сброса, в кэш не попадают
+        if generation == self.generation:
+            self._entries[asset] = (data, generation, time.monotonic())
+
 
 class RedisClient:
-    def __init__(self, host, port, db):
+    """
+    Один долгоживущий клиент на процесс поверх пула соединений.
+    connect/close вызывает только lifespan приложения, сервисы просто используют redis_client.
+    """
+
+    def __init__(self, host, port, db, max_connections: int = 20, pool_timeout: float = 5.0,
+                 near_cache: PriceNearCache = None, keyspace_notifications: bool = False):
+        """
+        Args:
+            max_connections: Размер пула; когда он исчерпан, запросы ждут освободившееся соединение
+            pool_timeout: Сколько ждать соединение, прежде чем вернуть ошибку
+            keyspace_notifications: Включить на сервере keyspace-события и инвалидировать near-cache по ним;
+                это меняет конфигурацию общего Redis, поэтому только явно
+        """
         self.host = host
         self.port = port
         self.db = db
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.keyspace_notifications = keyspace_notifications
+        self.near_cache = near_cache or PriceNearCache()
+        self.pool = None
         self.redis = None
+        self._listener = None
 
     async def connect(self):
-        self.redis = await Redis(host=self.host, port=self.port, db=self.db)
+        # Обычный ConnectionPool при исчерпании сразу бросает "Too many connections", блокирующий ставит в очередь
+        self.pool = BlockingConnectionPool(host=self.host, port=self.port, db=self.db,
+                                           max_connections=self.max_connections, timeout=self.pool_timeout)
+        self.redis = await Redis(connection_pool=self.pool)
+        if self.keyspace_notifications and await self._enable_keyspace_events():
+            self._listener = asyncio.create_task(self._listen_snapshot_version())
+
+    async def _enable_keyspace_events(self) -> bool:
+        """Добавляет флаги K$ (keyspace-события строковых команд) к уже настроенным на сервере"""
+        try:
+            config = await self.redis.config_get("notify-keyspace-events")
+            flags = config.get("notify-keyspace-events") or ""
+            if "K" not in flags or not ("$" in flags or "A" in flags):
+                await self.redis.config_set("notify-keyspace-events", "".join(sorted(set(flags + "K$"))))
+            return True
+        except Exception as e:
+            logger.warning(f"Keyspace notifications unavailable, price cache falls back to version polling: {e}")
+            return False
+
+    async def _listen_snapshot_version(self):
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(f"__keyspace@{self.db}__:{SNAPSHOT_VERSION_KEY}")
+            self.near_cache.notifications = True
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self.near_cache.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Snapshot version listener stopped, price cache falls back to version polling: {e}")
+        finally:
+            self.near_cache.notifications = False
+            await pubsub.close()
 
     async def get_asset(self, asset: str):
-        key = f"market_data:{asset}"
-        data = await self.redis.hgetall(key)
-        return {k.decode(): v.decode() for k, v in data.items()}
+        return (await self.get_assets([asset]))[asset]
 
     async def get_assets(self, assets: list[str]):
-        res = {}
+        """
+        Данные активов из near-cache; промахи дочитываются одним пайплайном.
+        Возвращаемые словари общие с кэшем, менять их нельзя.
+        """
+        cache = self.near_cache
+        if cache.needs_version_check():
+            cache.observe_version(await self.get_snapshot_version())
+
+        generation = cache.generation
+        res, missing = {}, []
         for asset in assets:
-            res[asset] = await self.get_asset(asset)
-        return res
+            data = cache.get(asset)
+            if data is None:
+                missing.append(asset)
+            else:
+                res[asset] = data
+
+        if missing:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for asset in missing:
+                    pipe.hgetall(f"market_data:{asset}")
+                results = await pipe.execute()
+            for asset, data in zip(missing, results):
+                res[asset] = {k.decode(): v.decode() for k, v in data.items()}
+                cache.put(asset, res[asset], generation)
+
+        return {asset: res[asset] for asset in assets}
+
+    async def get_snapshot_version(self) -> int:
+        """Версия последнего снимка рынка, записанного market_data_service"""
+        version = await self.redis.get(SNAPSHOT_VERSION_KEY)
+        return int(version) if version else 0
+
+    async def get_snapshot(self) -> MarketSnapshot | None:
+        """Полный снимок рынка одним GET (бинарный формат market_data_service)"""
+        blob = await self.redis.get(SNAPSHOT_BLOB_KEY)
+        return decode_snapshot(blob) if blob else None
+
+    async def get_price_series_sources(self, assets: list[str],
+                                       since: dict[str, dict[str, float]] = None) -> dict[str, dict[str, list[bytes]]]:
+        """
+        Сырые ряды цен market_data_service для каждого актива одним пайплайном:
+        тики (market_history) и свечи всех разрешений (market_candles), отсортированные по времени.
+
+        Args:
+            since: {asset: {source: score}} - читать только записи не раньше score (ZRANGEBYSCORE);
+                источники без score читаются целиком
+
+        Returns:
+            dict: {asset: {"ticks": [...], "5m": [...], "1h": [...], "1d": [...]}}
+        """
+        since = since or {}
+        sources = ("ticks", "5m", "1h", "1d")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for asset in assets:
+                asset_since = since.get(asset, {})
+                for source in sources:
+                    key = f"market_history:{asset}" if source == "ticks" else f"market_candles:{source}:{asset}"
+                    pipe.zrangebyscore(key, asset_since.get(source, "-inf"), "+inf")
+            results = await pipe.execute()
+
+        return {
+            asset: dict(zip(sources, results[i * len(sources):(i + 1) * len(sources)]))
+            for i, asset in enumerate(assets)
+        }
+
+    async def get_fx_rates(self) -> tuple[dict[str, float], float | None]:
+        """Курсы валют к USD (market_data:fx) и время их последнего обновления"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall("market_data:fx")
+            pipe.get("market_data:fx:updated_at")
+            rates, updated_at = await pipe.execute()
+        return ({k.decode(): float(v) for k, v in rates.items()},
+                float(updated_at) if updated_at else None)
+
+    async def get_stale_assets(self, assets: list[str]) -> set[str]:
+        """
+        Активы из списка с устаревшими ценами. Возраст считается по last_updated снимка в момент
+        чтения, поэтому остановка market_data_service тоже видна, а не только его собственные пометки.
+        """
+        snapshot, health = await self.get_snapshot(), await self.get_market_health()
+        stale_after = health["stale_after_seconds"] if health else DEFAULT_STALE_AFTER_SECONDS
+        now = time.time()
+        stale = set()
+        for asset in assets:
+            record = snapshot.get(asset) if snapshot else None
+            if record is None or now - record[2] > stale_after:
+                stale.add(asset)
+        return stale
+
+    async def get_market_health(self) -> dict | None:
+        """Сводка свежести рыночных данных (market_data:health); None - сервис давно не отчитывался"""
+        health = await self.redis.get("market_data:health")
+        return json.loads(health) if health else None
+
+    async def get_ranked_assets(self, limit: int, rank_by: str = "market_cap") -> list[str]:
+        """Первые limit активов рейтинга market_data_service (market_rank:{metric})"""
+        members = await self.redis.zrevrange(f"market_rank:{rank_by}", 0, limit - 1)
+        return [member.decode() for member in members]
+
+    async def acquire_lock(self, key: str, ttl_seconds: int) -> bool:
+        """SET NX EX: True только у одного из воркеров, пока ключ не истек"""
+        return bool(await self.redis.set(key, "1", nx=True, ex=ttl_seconds))
+
+    async def release_lock(self, key: str):
+        await self.redis.delete(key)
 
     async def close(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
         if self.redis:
             await self.redis.close()
+        if self.pool:
+            await self.pool.disconnect()
+        self.redis = self.pool = None
 
 
-redis_client = RedisClient(redis_settings.REDIS_HOST, redis_settings.REDIS_PORT, redis_settings.REDIS_DB)
\ No newline at end of file
+redis_client = RedisClient(redis_settings.REDIS_HOST, redis_settings.REDIS_PORT, redis_settings.REDIS_DB,
+                           max_connections=redis_settings.REDIS_MAX_CONNECTIONS,
+                           pool_timeout=redis_settings.REDIS_POOL_TIMEOUT,
+                           keyspace_notifications=redis_settings.REDIS_KEYSPACE_NOTIFICATIONS)
\ No newline at end of file
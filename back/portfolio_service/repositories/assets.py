@@ -1,6 +1,57 @@
+from sqlalchemy import select, text
+
 from back.portfolio_service.repositories.base import SQLAlchemyRepository
 from back.portfolio_service.models.assets import Assets
+from back.portfolio_service.schemas.assets import AssetType
+
+
+# Массивы передаются двумя параметрами, поэтому размер каталога не упирается в лимит параметров запроса
+UPSERT_CATALOG_QUERY = text("""
+    INSERT INTO assets (name, symbol, asset_type, is_active)
+    SELECT coins.name, coins.symbol, CAST('crypto' AS assettype), true
+    FROM unnest(CAST(:names AS varchar[]), CAST(:symbols AS varchar[])) AS coins(name, symbol)
+    ON CONFLICT (name) DO UPDATE
+    SET symbol = EXCLUDED.symbol, is_active = true, delisted_at = NULL
+""")
+
+DELIST_CATALOG_QUERY = text("""
+    UPDATE assets
+    SET is_active = false, delisted_at = now()
+    WHERE name = ANY(CAST(:names AS varchar[])) AND is_active
+""")
+
+HELD_DELISTED_QUERY = text("""
+    SELECT a.name, COUNT(DISTINCT pa.portfolio_id) AS holders
+    FROM assets a
+    JOIN portfolio_assets pa ON pa.asset_id = a.id
+    WHERE NOT a.is_active AND pa.quantity > 0
+    GROUP BY a.name
+""")
 
 
 class AssetsRepository(SQLAlchemyRepository):
     model = Assets
+
+    async def get_names(self, asset_ids: list[int]) -> dict[int, str]:
+        """{asset_id: name} для списка id одним запросом"""
+        query = select(Assets.id, Assets.name).where(Assets.id.in_(asset_ids))
+        res = await self.session.execute(query)
+        return {row.id: row.name for row in res.all()}
+
+    async def get_catalog(self, asset_type: AssetType) -> dict[str, tuple[str, bool]]:
+        """{name: (symbol, is_active)} всех активов типа"""
+        query = select(Assets.name, Assets.symbol, Assets.is_active).where(Assets.asset_type == asset_type)
+        res = await self.session.execute(query)
+        return {row.name: (row.symbol, row.is_active) for row in res.all()}
+
+    async def upsert_catalog(self, names: list[str], symbols: list[str]):
+        """Новые активы добавляются, существующие обновляют тикер и снова становятся активными"""
+        await self.session.execute(UPSERT_CATALOG_QUERY, {"names": names, "symbols": symbols})
+
+    async def delist_catalog(self, names: list[str]):
+        await self.session.execute(DELIST_CATALOG_QUERY, {"names": names})
+
+    async def get_held_delisted(self) -> dict[str, int]:
+        """{name: число портфелей} для снятых с листинга активов, которые еще лежат в портфелях"""
+        res = await self.session.execute(HELD_DELISTED_QUERY)
+        return {row.name: row.holders for row in res.all()}
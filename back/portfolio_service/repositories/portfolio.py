@@ -1,6 +1,70 @@
+from sqlalchemy import select, text
+
 from back.portfolio_service.repositories.base import SQLAlchemyRepository
 from back.portfolio_service.models.portfolio import Portfolio
 
 
+# Цены передаются двумя массивами, так что запрос один и тот же при любом числе активов и портфелей.
+# Портфели, где у какого-то актива нет цены, не трогаем: частичная сумма была бы хуже устаревшей.
+# UPDATE идет по всем портфелям через LEFT JOIN, чтобы портфель без позиций получил 0
+REVALUE_ALL_QUERY = text("""
+    UPDATE portfolios p
+    SET current_value = COALESCE(totals.value, 0)
+    FROM portfolios base
+    LEFT JOIN (
+        SELECT pa.portfolio_id, SUM(pa.quantity * prices.price) AS value,
+               COUNT(prices.price) = COUNT(*) AS complete
+        FROM portfolio_assets pa
+        JOIN assets a ON a.id = pa.asset_id
+        LEFT JOIN unnest(CAST(:names AS varchar[]), CAST(:prices AS float8[])) AS prices(name, price)
+            ON prices.name = a.name
+        GROUP BY pa.portfolio_id
+    ) AS totals ON totals.portfolio_id = base.id
+    WHERE p.id = base.id
+        AND COALESCE(totals.complete, true)
+        AND p.current_value IS DISTINCT FROM COALESCE(totals.value, 0)
+""")
+
+UNPRICED_ASSETS_QUERY = text("""
+    SELECT DISTINCT a.name
+    FROM portfolio_assets pa
+    JOIN assets a ON a.id = pa.asset_id
+    WHERE a.name <> ALL(CAST(:names AS varchar[]))
+""")
+
+PORTFOLIOS_HOLDING_QUERY = text("""
+    SELECT COUNT(DISTINCT pa.portfolio_id)
+    FROM portfolio_assets pa
+    JOIN assets a ON a.id = pa.asset_id
+    WHERE a.name = ANY(CAST(:names AS varchar[]))
+""")
+
+
 class PortfolioRepository(SQLAlchemyRepository):
     model = Portfolio
+
+    async def get_ids_by_user_ids(self, user_ids: list[int]) -> list[int]:
+        """id портфелей пользователей одним запросом"""
+        query = select(Portfolio.id).where(Portfolio.user_id.in_(user_ids))
+        res = await self.session.execute(query)
+        return list(res.scalars().all())
+
+    async def revalue_all(self, names: list[str], prices: list[float]) -> int:
+        """
+        Пересчитывает current_value всех портфелей по вектору цен одним UPDATE.
+
+        Returns:
+            int: Сколько портфелей изменилось
+        """
+        res = await self.session.execute(REVALUE_ALL_QUERY, {"names": names, "prices": prices})
+        return res.rowcount
+
+    async def get_unpriced_asset_names(self, names: list[str]) -> list[str]:
+        """Активы в портфелях, которых нет среди names"""
+        res = await self.session.execute(UNPRICED_ASSETS_QUERY, {"names": names})
+        return list(res.scalars().all())
+
+    async def count_holding(self, names: list[str]) -> int:
+        """Сколько портфелей держит хотя бы один из активов names"""
+        res = await self.session.execute(PORTFOLIOS_HOLDING_QUERY, {"names": names})
+        return res.scalar_one()
@@ -20,7 +20,7 @@ class PortfolioAssetsRepository(SQLAlchemyRepository):
             )
             .select_from(pa)
             .join(a, pa.asset_id == a.id)
-            .where(pa.asset_id == asset_id and pa.portfolio_id == portfolio_id)
+            .where(pa.asset_id == asset_id, pa.portfolio_id == portfolio_id)
         )
         res = await self.session.execute(query)
         return res.mappings().first()
@@ -33,23 +33,23 @@ async def add_portfolio(new_portfolio: SPortfolioCreate, uow: UOWDep) -> int:
 
 
 @router.get("/{portfolio_id}")
-async def get_portfolio(portfolio_id: int, uow: UOWDep) -> SPortfolio:
+async def get_portfolio(portfolio_id: int, uow: UOWDep, currency: str = "usd") -> SPortfolio:
     portfolio = await PortfolioService().get_portfolio_by_id(uow, portfolio_id)
     if not portfolio:
         logger.warning(f"Portfolio not found: portfolio_id={portfolio_id}")
         raise PortfolioDoesntExistException()
     
-    return portfolio
+    return await PortfolioService().convert_portfolio(portfolio, currency)
 
 
 @router.get("/by_user_id/{user_id}")
-async def get_portfolio_by_user_id(user_id: int, uow: UOWDep) -> SPortfolio:
+async def get_portfolio_by_user_id(user_id: int, uow: UOWDep, currency: str = "usd") -> SPortfolio:
     portfolio = await PortfolioService().get_portfolio(uow, user_id=user_id)
     if not portfolio:
         logger.warning(f"Portfolio not found for user_id: {user_id}")
         raise PortfolioDoesntExistException()
     
-    return portfolio
+    return await PortfolioService().convert_portfolio(portfolio, currency)
 
 
 @router.delete("/{portfolio_id}")
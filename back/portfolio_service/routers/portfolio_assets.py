@@ -15,11 +15,13 @@ router = APIRouter(
 
 
 @router.get("/{portfolio_id}")
-async def get_portfolio_assets(uow: UOWDep, portfolio_id: int = Depends(user_owns_portfolio)) -> list[SPortfolioAssetMarketData]:
+async def get_portfolio_assets(uow: UOWDep, portfolio_id: int = Depends(user_owns_portfolio),
+                               currency: str = "usd") -> list[SPortfolioAssetMarketData]:
     logger.debug(f"Fetching all assets for portfolio_id: {portfolio_id}")
     
     try:
         portfolio_assets = await PortfolioAssetsService().get_all_portfolio_assets(uow, portfolio_id)
+        portfolio_assets = await PortfolioAssetsService().convert_portfolio_assets(portfolio_assets, currency)
         logger.debug(f"Found {len(portfolio_assets)} assets in portfolio_id: {portfolio_id}")
         return portfolio_assets
     except Exception as e:
@@ -29,6 +29,21 @@ async def add_transaction(
             raise
 
 
+@router.post("/bulk")
+async def add_transactions(
+        transactions: list[STransactionCreate],
+        uow: UOWDep,
+        portfolio_id: int = Depends(user_owns_portfolio),
+) -> list[int]:
+    try:
+        trans_ids = await TransactionsService().add_transactions(portfolio_id, uow, transactions)
+        logger.info(f"Bulk import: {len(trans_ids)} transactions created for portfolio_id={portfolio_id}")
+        return trans_ids
+    except Exception as e:
+        logger.error(f"Bulk transaction import failed for portfolio_id {portfolio_id}: {e}")
+        raise
+
+
 @router.get("/")
 async def get_transactions(
         uow: UOWDep,
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+import logging
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from back.portfolio_service.redis import redis_client
+from back.portfolio_service.services.asset_catalog import AssetCatalogService
+from back.portfolio_service.utils.uow import UnitOfWork
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SYNC_LOCK_KEY = "portfolio:asset_catalog_sync:lock"
+
+
+class AssetCatalogScheduler:
+    """APScheduler для периодической синхронизации каталога активов"""
+
+    def __init__(self, catalog_service: AssetCatalogService, sync_interval_hours: int = 24,
+                 lock_seconds: int = 15 * 60):
+        """
+        Args:
+            catalog_service: Сервис синхронизации каталога
+            sync_interval_hours: Интервал синхронизации в часах
+            lock_seconds: Сколько держится блокировка запуска; планировщик есть в каждом воркере gunicorn,
+                а синхронизацию должен выполнить только один из них
+        """
+        self.scheduler = AsyncIOScheduler()
+        self.catalog_service = catalog_service
+        self.sync_interval_hours = sync_interval_hours
+        self.lock_seconds = lock_seconds
+        self.is_running = False
+
+    async def sync_catalog(self) -> None:
+        try:
+            if not await redis_client.acquire_lock(CATALOG_SYNC_LOCK_KEY, self.lock_seconds):
+                logger.debug("Asset catalog sync is already running in another worker")
+                return
+            await self.catalog_service.sync(UnitOfWork())
+        except Exception as e:
+            logger.error(f"Asset catalog sync failed: {e}")
+
+    async def start(self) -> bool:
+        """Запускает планировщик"""
+        try:
+            if self.is_running:
+                logger.warning("Asset catalog scheduler is already running")
+                return True
+
+            self.scheduler.add_job(
+                self.sync_catalog,
+                trigger=IntervalTrigger(hours=self.sync_interval_hours),
+                id='asset_catalog_sync_job',
+                name='Asset Catalog Sync Job',
+                max_instances=1,
+                coalesce=True,
+                next_run_time=datetime.now() + timedelta(seconds=60)
+            )
+
+            self.scheduler.start()
+            self.is_running = True
+            logger.info(f"Asset catalog sync will run every {self.sync_interval_hours} hours")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to start asset catalog scheduler: {e}")
+            return False
+
+    async def stop(self) -> bool:
+        """Останавливает планировщик"""
+        try:
+            if not self.is_running:
+                return True
+
+            self.scheduler.shutdown(wait=True)
+            self.is_running = False
+            logger.info("Asset catalog scheduler stopped successfully")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error stopping asset catalog scheduler: {e}")
+            return False
@@ -14,6 +14,7 @@ class SAsset(BaseModel):
     name: str
     symbol: str
     asset_type: AssetType
+    is_active: bool = True
 
     class Config:
         from_attributes = True
@@ -6,6 +6,7 @@ class SPortfolio(BaseModel):
     user_id: int
     total_invested: float
     current_value: float
+    currency: str = "usd"
 
     class Config:
         from_attributes = True
@@ -19,6 +19,7 @@ class SPortfolioAssetMarketData(SPortfolioAsset):
     current_price: float
     usd_24h_change: float
     last_updated: str
+    currency: str = "usd"
 
 
 class SPortfolioAssetCreate(BaseModel):
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional
 
 from pydantic import BaseModel
 from datetime import datetime
@@ -27,5 +28,6 @@ class STransactionCreate(BaseModel):
     asset_id: int
     quantity: float
     transaction_type: TransactionType
-    price: float
+    # Если не указана - берется из истории цен на transaction_date
+    price: Optional[float] = None
     transaction_date: datetime
@@ -0,0 +1,121 @@
+import logging
+from dataclasses import dataclass, field
+
+import httpx
+
+from back.portfolio_service.redis import redis_client
+from back.portfolio_service.schemas.assets import AssetType
+from back.portfolio_service.utils.uow import IUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CatalogChanges:
+    upserts: dict[str, str] = field(default_factory=dict)
+    delisted: list[str] = field(default_factory=list)
+    rename_candidates: dict[str, list[str]] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.upserts or self.delisted)
+
+
+def diff_catalog(current: dict[str, tuple[str, bool]], coins: dict[str, str],
+                 allowed_new: set[str] | None = None) -> CatalogChanges:
+    """
+    Изменения каталога относительно списка провайдера.
+
+    Активный актив, пропавший из списка, снимается с листинга. Строки не переименовываются
+    автоматически: тикеры у CoinGecko часто совпадают у разных монет, и перенос позиций
+    на чужую монету хуже, чем снятие с листинга. Новые id с тем же тикером попадают
+    в rename_candidates для ручной проверки.
+
+    Args:
+        current: {name: (symbol, is_active)} из таблицы assets
+        coins: {id: SYMBOL} из списка провайдера
+        allowed_new: Какие новые id можно добавлять; None - любые
+    """
+    changes = CatalogChanges()
+    new_ids = [coin for coin in coins if coin not in current]
+    new_by_symbol: dict[str, list[str]] = {}
+    for coin in new_ids:
+        new_by_symbol.setdefault(coins[coin], []).append(coin)
+
+    for name, (symbol, is_active) in current.items():
+        if name in coins:
+            if coins[name] != symbol or not is_active:
+                changes.upserts[name] = coins[name]
+        elif is_active:
+            changes.delisted.append(name)
+            if symbol in new_by_symbol:
+                changes.rename_candidates[name] = new_by_symbol[symbol]
+
+    for coin in new_ids:
+        if allowed_new is None or coin in allowed_new:
+            changes.upserts[coin] = coins[coin]
+    return changes
+
+
+class AssetCatalogService:
+    """Синхронизация таблицы assets со списком монет провайдера (coins/list CoinGecko)"""
+
+    def __init__(self, catalog_url: str, api_key: str = "", max_rank: int = 1000,
+                 max_delist_ratio: float = 0.1, timeout: float = 30.0):
+        self.catalog_url = catalog_url
+        self.api_key = api_key
+        self.max_rank = max_rank
+        self.max_delist_ratio = max_delist_ratio
+        self.timeout = timeout
+
+    async def fetch_coins(self) -> dict[str, str]:
+        """{id: SYMBOL}; тикеры в верхнем регистре, как в assets.sql"""
+        headers = {"accept": "application/json"}
+        if self.api_key:
+            headers["x-cg-demo-api-key"] = self.api_key
+        async with httpx.AsyncClient(headers=headers, timeout=self.timeout) as client:
+            response = await client.get(self.catalog_url)
+            response.raise_for_status()
+        return {coin["id"]: coin["symbol"].upper() for coin in response.json() if coin.get("id") and coin.get("symbol")}
+
+    async def sync(self, uow: IUnitOfWork) -> CatalogChanges:
+        """Сверяет каталог и применяет все изменения одной транзакцией"""
+        coins = await self.fetch_coins()
+        if not coins:
+            logger.warning("Asset catalog sync skipped: provider returned an empty coin list")
+            return CatalogChanges()
+
+        allowed_new = None
+        if self.max_rank:
+            allowed_new = set(await redis_client.get_ranked_assets(self.max_rank))
+            if not allowed_new:
+                # Без рейтинга нельзя отличить заметные новые монеты от мусора: ждем следующего запуска
+                logger.warning("Asset catalog sync skipped: market rankings are empty")
+                return CatalogChanges()
+
+        async with uow:
+            current = await uow.assets.get_catalog(AssetType.crypto)
+            changes = diff_catalog(current, coins, allowed_new)
+
+            active = sum(1 for _, is_active in current.values() if is_active)
+            if len(changes.delisted) > max(1, int(active * self.max_delist_ratio)):
+                logger.error(f"Asset catalog sync: {len(changes.delisted)} of {active} assets missing from the "
+                             f"provider list, skipping delisting")
+                changes.delisted, changes.rename_candidates = [], {}
+
+            if changes.upserts:
+                await uow.assets.upsert_catalog(list(changes.upserts), list(changes.upserts.values()))
+            if changes.delisted:
+                await uow.assets.delist_catalog(changes.delisted)
+            held_delisted = await uow.assets.get_held_delisted()
+            await uow.commit()
+
+        logger.info(f"Asset catalog synced with {len(coins)} provider coins: {len(changes.upserts)} upserted, "
+                    f"{len(changes.delisted)} delisted")
+        if changes.rename_candidates:
+            candidates = ", ".join(f"{name} -> {'/'.join(ids)}" for name, ids in sorted(changes.rename_candidates.items()))
+            logger.warning(f"Delisted assets with new listings under the same ticker, check for renames manually: "
+                           f"{candidates}")
+        if held_delisted:
+            logger.warning(f"Delisted assets still held in portfolios: "
+                           f"{', '.join(f'{name} ({holders})' for name, holders in sorted(held_delisted.items()))}")
+        return changes
@@ -0,0 +1,76 @@
+import logging
+import time
+
+from back.market_data_service.snapshot_format import FIELDS_PER_RECORD
+from back.portfolio_service.redis import redis_client
+from back.portfolio_service.utils.uow import IUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+REVALUATION_LOCK_KEY = "portfolio:revaluation:{version}"
+
+
+class BulkRevaluationService:
+    """
+    Пересчет стоимости всех портфелей по снимку рынка.
+
+    Цены всего снимка уходят в БД одним запросом (см. PortfolioRepository.revalue_all), поэтому число
+    обращений к БД не зависит от числа портфелей. Каждая версия снимка пересчитывается один раз на все
+    воркеры; запоздавшие события о старых снимках пропускаются, так как берется последний снимок.
+
+    Активам портфелей, которых нет в снимке (например, выпавшим из отслеживания), подставляется
+    последняя известная цена из market_data:{asset}. Портфели с активами вовсе без цены запрос
+    не трогает, их число пишется в лог.
+    """
+
+    def __init__(self, lock_seconds: int = 60 * 60):
+        self.lock_seconds = lock_seconds
+
+    async def revalue_all(self, uow: IUnitOfWork) -> int | None:
+        """
+        Returns:
+            int | None: Сколько портфелей изменилось, None если пересчет не понадобился
+        """
+        snapshot = await redis_client.get_snapshot()
+        if snapshot is None:
+            logger.warning("Bulk revaluation skipped: no market snapshot in Redis")
+            return None
+        lock_key = REVALUATION_LOCK_KEY.format(version=snapshot.version)
+        if not await redis_client.acquire_lock(lock_key, self.lock_seconds):
+            logger.debug(f"Snapshot {snapshot.version} is already revalued")
+            return None
+
+        started = time.perf_counter()
+        try:
+            async with uow:
+                names, prices = list(snapshot.assets), snapshot.values[0::FIELDS_PER_RECORD].tolist()
+                unpriced = await uow.portfolio.get_unpriced_asset_names(names)
+                if unpriced:
+                    last_known = await self._last_known_prices(unpriced)
+                    names += list(last_known)
+                    prices += list(last_known.values())
+                    unpriced = [asset for asset in unpriced if asset not in last_known]
+
+                updated = await uow.portfolio.revalue_all(names, prices)
+                skipped = await uow.portfolio.count_holding(unpriced) if unpriced else 0
+                await uow.commit()
+        except Exception:
+            # Иначе эту версию никто не пересчитает, пока не истечет блокировка
+            await redis_client.release_lock(lock_key)
+            raise
+
+        if skipped:
+            logger.warning(f"Bulk revaluation skipped {skipped} portfolios holding assets without a price: "
+                           f"{', '.join(sorted(unpriced)[:10])}")
+        logger.info(f"Revalued portfolios for snapshot {snapshot.version}: {updated} changed "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return updated
+
+    @staticmethod
+    async def _last_known_prices(assets: list[str]) -> dict[str, float]:
+        market_data = await redis_client.get_assets(assets)
+        return {asset: float(data["current_price"]) for asset, data in market_data.items()
+                if data.get("current_price")}
+
+
+bulk_revaluation_service = BulkRevaluationService()
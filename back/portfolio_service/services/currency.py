@@ -0,0 +1,60 @@
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+from back.portfolio_service.exceptions import UnsupportedCurrencyException
+from back.portfolio_service.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+BASE_CURRENCY = "usd"
+
+
+class FxRates:
+    """Курсы market_data_service: сколько единиц валюты в 1 USD"""
+
+    def __init__(self, rates: Dict[str, float], updated_at: Optional[float]):
+        self.rates = {BASE_CURRENCY: 1.0, **rates}
+        self.updated_at = updated_at
+
+    def rate(self, currency: str) -> float:
+        rate = self.rates.get(currency.lower())
+        if rate is None:
+            raise UnsupportedCurrencyException()
+        return rate
+
+    def convert(self, values: Sequence[float], currency: str) -> List[float]:
+        """Переводит значения в USD в валюту currency одним умножением на курс"""
+        rate = self.rate(currency)
+        return [value * rate for value in values]
+
+
+class CurrencyService:
+    """
+    Кеш курсов в памяти процесса: market_data:fx перечитывается не чаще раза в cache_seconds.
+    Свежесть самих курсов отслеживается по market_data:fx:updated_at.
+    """
+
+    def __init__(self, cache_seconds: float = 30.0, stale_after_seconds: float = 60 * 60):
+        self.cache_seconds = cache_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self._rates: Optional[FxRates] = None
+        self._fetched_at = 0.0
+
+    async def get_rates(self) -> FxRates:
+        if self._rates is None or time.monotonic() - self._fetched_at > self.cache_seconds:
+            rates, updated_at = await redis_client.get_fx_rates()
+            self._rates = FxRates(rates, updated_at)
+            self._fetched_at = time.monotonic()
+            if updated_at and time.time() - updated_at > self.stale_after_seconds:
+                logger.warning(f"FX rates are stale: last updated {time.time() - updated_at:.0f}s ago")
+        return self._rates
+
+    async def convert(self, values: Sequence[float], currency: str) -> List[float]:
+        if currency.lower() == BASE_CURRENCY:
+            return list(values)
+        rates = await self.get_rates()
+        return rates.convert(values, currency)
+
+
+currency_service = CurrencyService()
@@ -1,6 +1,7 @@
 import logging
 from back.portfolio_service.exceptions import UserDoesntExistException
-from back.portfolio_service.schemas.portfolio import SPortfolioCreate, SPortfolioUpdate
+from back.portfolio_service.schemas.portfolio import SPortfolio, SPortfolioCreate, SPortfolioUpdate
+from back.portfolio_service.services.currency import currency_service
 from back.portfolio_service.services.portfolio_assets import PortfolioAssetsService
 from back.portfolio_service.utils.uow import IUnitOfWork
 
@@ -28,6 +29,16 @@ class PortfolioService:
             portfolio = await uow.portfolio.get_one(**kwargs)
             return portfolio
 
+    async def convert_portfolio(self, portfolio: SPortfolio, currency: str) -> SPortfolio:
+        """Стоимость портфеля (хранится в USD) в валюте currency"""
+        total_invested, current_value = await currency_service.convert(
+            [portfolio.total_invested, portfolio.current_value], currency)
+        return portfolio.model_copy(update={
+            "total_invested": total_invested,
+            "current_value": current_value,
+            "currency": currency.lower(),
+        })
+
     async def update_portfolio(self, uow: IUnitOfWork, portfolio_id: int, portfolio: SPortfolioUpdate):
         async with uow:
             await uow.portfolio.update(portfolio_id, portfolio.model_dump())
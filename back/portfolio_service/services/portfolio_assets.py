@@ -1,3 +1,5 @@
+from back.portfolio_service.redis import redis_client
+from back.portfolio_service.services.currency import currency_service
 from back.portfolio_service.utils.uow import IUnitOfWork
 
 
@@ -15,10 +17,7 @@ class PortfolioAssetsService:
         for portfolio_asset in portfolio_assets:
             assets.append(portfolio_asset["name"])
 
-        from back.portfolio_service.redis import redis_client
-        await redis_client.connect()
         market_data = await redis_client.get_assets(assets)
-        await redis_client.close()
 
         for portfolio_asset in portfolio_assets:
             portfolio_asset["current_price"] = float(market_data[portfolio_asset["name"]]["current_price"])
@@ -27,6 +26,14 @@ class PortfolioAssetsService:
 
         return portfolio_assets
 
+    async def convert_portfolio_assets(self, portfolio_assets: list[dict], currency: str) -> list[dict]:
+        """Цены активов в валюте currency: один курс на весь список"""
+        prices = await currency_service.convert([asset["current_price"] for asset in portfolio_assets], currency)
+        for portfolio_asset, price in zip(portfolio_assets, prices):
+            portfolio_asset["current_price"] = price
+            portfolio_asset["currency"] = currency.lower()
+        return portfolio_assets
+
     async def delete_portfolio_asset(self, uow: IUnitOfWork, asset_id: int):
         async with uow:
             await uow.portfolio_assets.delete(asset_id)
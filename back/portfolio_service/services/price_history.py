@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from back.config import PortfolioSettings
+from back.market_data_service.archive_format import TICKS, ArchiveReader, candles_kind
+from back.portfolio_service.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSeries:
+    """Цены актива, отсортированные по времени: два параллельных массива для бинарного поиска"""
+    __slots__ = ("timestamps", "prices", "version")
+
+    def __init__(self, timestamps: array, prices: array, version: int):
+        self.timestamps = timestamps
+        self.prices = prices
+        self.version = version
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def price_at(self, timestamp: float, max_gap_seconds: float) -> Optional[float]:
+        """Последняя известная цена не позже timestamp; None, если ближайшая точка старше max_gap_seconds"""
+        i = bisect_right(self.timestamps, timestamp) - 1
+        if i < 0 or timestamp - self.timestamps[i] > max_gap_seconds:
+            return None
+        return self.prices[i]
+
+
+SOURCES = ("ticks", "5m", "1h", "1d")
+# Источник ряда -> (kind архива, колонка цены); у свечей, как и в ряду, берется open
+ARCHIVE_SOURCES = {"ticks": (TICKS, "price"), **{source: (candles_kind(source), "open") for source in SOURCES[1:]}}
+
+
+def parse_points(members: List[bytes]) -> List[tuple[float, float]]:
+    """Тик "timestamp:price" или свеча "start:open:..." -> (timestamp, price)"""
+    points = []
+    for member in members:
+        fields = member.decode().split(":")
+        points.append((float(fields[0]), float(fields[1])))
+    return points
+
+
+def build_series(points: Dict[str, List[tuple[float, float]]], version: int) -> PriceSeries:
+    """
+    Склеивает ряд из тиков и свечей: каждый следующий (более грубый) источник
+    берется только для времени раньше начала предыдущего. Свеча дает точку (start, open).
+    """
+    timestamps, prices = array("d"), array("d")
+    boundary = float("inf")
+    chunks = []
+    for source in SOURCES:
+        source_points = points.get(source)
+        if not source_points:
+            continue
+        cut = bisect_left(source_points, (boundary,))
+        chunks.append(source_points[:cut])
+        boundary = min(boundary, source_points[0][0])
+
+    for chunk in reversed(chunks):
+        for timestamp, price in chunk:
+            timestamps.append(timestamp)
+            prices.append(price)
+    return PriceSeries(timestamps, prices, version)
+
+
+class AssetHistory:
+    """Загруженные точки актива по источникам; дочитываются с последней загруженной метки"""
+    __slots__ = ("points", "series")
+
+    def __init__(self):
+        self.points: Dict[str, List[tuple[float, float]]] = {source: [] for source in SOURCES}
+        self.series: Optional[PriceSeries] = None
+
+    def since(self) -> Dict[str, float]:
+        """
+        С какой метки дочитывать каждый источник. Последняя точка читается заново:
+        открытая свеча перезаписывается на месте, пока не закроется.
+        """
+        return {source: points[-1][0] for source, points in self.points.items() if points}
+
+    def extend(self, sources: Dict[str, List[bytes]], version: int) -> int:
+        added = 0
+        for source, members in sources.items():
+            new_points = parse_points(members)
+            if not new_points:
+                continue
+            points = self.points[source]
+            del points[bisect_left(points, (new_points[0][0],)):]
+            points.extend(new_points)
+            added += len(new_points)
+        self.series = build_series(self.points, version)
+        return added
+
+
+class PriceHistoryService:
+    """
+    Цена актива на произвольный момент по истории market_data_service.
+    Ряды кешируются в памяти процесса по активу. Когда сменилась версия снимка рынка,
+    из Redis дочитываются только записи новее уже загруженных (ZRANGEBYSCORE);
+    сам поиск - bisect по массиву. История, которую backfill допишет раньше уже
+    загруженной, появится в кеше после перезапуска процесса.
+
+    Моменты, для которых в Redis цены нет (история там хранится ограниченное время),
+    ищутся в колоночном архиве market_data_service.
+    """
+
+    def __init__(self, max_gap_seconds: float = 2 * 24 * 60 * 60, archive: ArchiveReader = None):
+        """
+        Args:
+            max_gap_seconds: Насколько ближайшая известная цена может быть старше запрошенного момента
+            archive: Архив истории; None - только Redis
+        """
+        self.max_gap_seconds = max_gap_seconds
+        self.archive = archive
+        self._history: Dict[str, AssetHistory] = {}
+
+    async def load(self, asset_names: List[str]) -> None:
+        """Дочитывает ряды устаревших активов: одна проверка версии и один пайплайн на всех"""
+        version = await redis_client.get_snapshot_version()
+        outdated = [name for name in set(asset_names)
+                    if name not in self._history or self._history[name].series.version != version]
+        if not outdated:
+            return
+
+        histories = {name: self._history.get(name) or AssetHistory() for name in outdated}
+        sources = await redis_client.get_price_series_sources(
+            outdated, {name: history.since() for name, history in histories.items()})
+        added = 0
+        for name, history in histories.items():
+            added += history.extend(sources[name], version)
+            self._history[name] = history
+        logger.debug(f"Loaded {added} price points for {len(outdated)} assets at snapshot version {version}")
+
+    def lookup(self, asset_name: str, when: datetime) -> Optional[float]:
+        """Цена из уже загруженного ряда (см. load); наивное время считается UTC"""
+        history = self._history.get(asset_name)
+        if history is None:
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return history.series.price_at(when.timestamp(), self.max_gap_seconds)
+
+    def lookup_archive(self, asset_name: str, when: datetime) -> Optional[float]:
+        """Последняя цена не позже when из архива (самая поздняя точка среди тиков и свечей)"""
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        timestamp = when.timestamp()
+        latest = None
+        for kind, column in ARCHIVE_SOURCES.values():
+            try:
+                rows = self.archive.read(kind, asset_name, timestamp - self.max_gap_seconds,
+                                         math.nextafter(timestamp, math.inf), ("timestamp", column))
+            except ValueError:
+                return None
+            if rows["timestamp"] and (latest is None or rows["timestamp"][-1] > latest[0]):
+                latest = (rows["timestamp"][-1], rows[column][-1])
+        return latest[1] if latest else None
+
+    async def get_price_at(self, asset_name: str, when: datetime) -> Optional[float]:
+        return (await self.get_prices_at([(asset_name, when)]))[0]
+
+    async def get_prices_at(self, requests: List[tuple[str, datetime]]) -> List[Optional[float]]:
+        """Пакетный вариант: [(asset_name, when), ...] -> [price | None, ...] в том же порядке"""
+        await self.load([asset_name for asset_name, _ in requests])
+        prices = [self.lookup(asset_name, when) for asset_name, when in requests]
+
+        misses = [i for i, price in enumerate(prices) if price is None]
+        if self.archive and misses:
+            archived = await asyncio.to_thread(
+                lambda: [self.lookup_archive(*requests[i]) for i in misses])
+            for i, price in zip(misses, archived):
+                prices[i] = price
+        return prices
+
+
+portfolio_settings = PortfolioSettings()
+price_history_service = PriceHistoryService(
+    archive=ArchiveReader(portfolio_settings.MARKET_ARCHIVE_DIR) if portfolio_settings.MARKET_ARCHIVE_DIR else None
+)
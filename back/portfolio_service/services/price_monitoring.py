@@ -11,6 +11,7 @@ from back.portfolio_service.models.assets import Assets
 from back.portfolio_service.repositories.portfolio_assets import PortfolioAssetsRepository
 from back.portfolio_service.message_broker.rabbitmq import rabbit_broker
 from back.portfolio_service.redis import redis_client
+from back.market_data_service.snapshot_format import MarketSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -40,15 +41,41 @@ class PriceMonitoringService:
                 
             logger.info(f"Found {len(unique_assets)} unique assets to monitor")
 
+            snapshot = await self._get_market_snapshot()
             for asset in unique_assets:
-                await self._check_asset_price_change(asset)
+                record = snapshot.get(asset.name) if snapshot else None
+                if record:
+                    current_price, price_change_24h, _ = record
+                    await self._evaluate_price_change(asset, current_price, price_change_24h)
+                else:
+                    await self._check_asset_price_change(asset)
                 
             logger.info("Price monitoring check completed")
             
         except Exception as e:
             logger.error(f"Error in price monitoring: {e}")
             
-    async def _get_unique_portfolio_assets(self) -> List[Assets]:
+    async def check_price_change_events(self, changes: List[Dict]) -> None:
+        """
+        Проверяет только активы из события market_data_service об изменении цен.
+
+        Args:
+            changes: [{"asset", "old_price", "new_price", "usd_24h_change"}, ...]
+        """
+        try:
+            changes_by_asset = {change["asset"]: change for change in changes}
+            held_assets = await self._get_unique_portfolio_assets(list(changes_by_asset))
+
+            logger.info(f"Price change event: {len(changes)} changed assets, {len(held_assets)} held in portfolios")
+
+            for asset in held_assets:
+                change = changes_by_asset[asset.name]
+                await self._evaluate_price_change(asset, float(change["new_price"]), float(change["usd_24h_change"]))
+
+        except Exception as e:
+            logger.error(f"Error handling price change event: {e}")
+
+    async def _get_unique_portfolio_assets(self, asset_names: Optional[List[str]] = None) -> List[Assets]:
         """Получает все уникальные активы из портфелей пользователей"""
         async with async_session_maker() as session:
             # Получаем все активы, которые есть в портфелях пользователей
@@ -58,6 +85,8 @@ class PriceMonitoringService:
                 .filter(PortfolioAssets.quantity > 0)
                 .distinct()
             )
+            if asset_names is not None:
+                query = query.filter(Assets.name.in_(asset_names))
             result = await session.execute(query)
             return result.scalars().all()
             
@@ -72,21 +101,24 @@ class PriceMonitoringService:
                 
             current_price = float(market_data.get("current_price", 0))
             price_change_24h = float(market_data.get("usd_24h_change", 0))
-            
-            if current_price == 0:
-                logger.warning(f"Invalid price data for asset {asset.name}")
-                return
-                
 
-            if abs(price_change_24h) >= self.price_change_threshold:
-                if await self._should_send_alert(asset.name):
-                    await self._send_price_alerts(asset, current_price, price_change_24h)
-                    await self._mark_alert_sent(asset.name)
-                else:
-                    logger.debug(f"Skipping alert for {asset.name} - already sent within cooldown period")
+            await self._evaluate_price_change(asset, current_price, price_change_24h)
             
         except Exception as e:
             logger.error(f"Error checking price for {asset.name} ({asset.symbol}): {e}")
+
+    async def _evaluate_price_change(self, asset: Assets, current_price: float, price_change_24h: float) -> None:
+        """Отправляет уведомления, если изменение за 24ч превышает порог и cooldown истек"""
+        if current_price == 0:
+            logger.warning(f"Invalid price data for asset {asset.name}")
+            return
+
+        if abs(price_change_24h) >= self.price_change_threshold:
+            if await self._should_send_alert(asset.name):
+                await self._send_price_alerts(asset, current_price, price_change_24h)
+                await self._mark_alert_sent(asset.name)
+            else:
+                logger.debug(f"Skipping alert for {asset.name} - already sent within cooldown period")
             
     async def _send_price_alerts(
         self, 
@@ -134,6 +166,14 @@ class PriceMonitoringService:
             user_ids = await repository.get_users_with_asset(asset_name)
             return user_ids
             
+    async def _get_market_snapshot(self) -> Optional[MarketSnapshot]:
+        """Получает полный бинарный снимок рынка одним запросом; None, если его еще нет"""
+        try:
+            return await redis_client.get_snapshot()
+        except Exception as e:
+            logger.error(f"Error getting market snapshot from Redis: {e}")
+            return None
+
     async def _get_market_data_from_redis(self, asset_symbol: str) -> Optional[Dict[str, str]]:
         """Получает market data для актива из Redis (сохраненные market_data_service)"""
         try:
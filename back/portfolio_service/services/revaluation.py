@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from back.config import PortfolioSettings
+from back.portfolio_service.services.portfolio import PortfolioService
+from back.portfolio_service.utils.uow import UnitOfWork
+
+logger = logging.getLogger(__name__)
+
+portfolio_settings = PortfolioSettings()
+
+
+class PortfolioRevaluationQueue:
+    """
+    Фоновый пересчет current_value портфелей с антидребезгом.
+
+    Запрос только отмечает пользователя в очереди; воркер пересчитывает его портфель (у пользователя
+    он один), когда запросы от него затихли на debounce_seconds, но не позже max_delay_seconds после
+    первой отметки. Серия запросов схлопывается в один пересчет, а ответ не ждет транзакцию записи.
+    """
+
+    def __init__(self, debounce_seconds: float = 2.0, max_delay_seconds: float = 10.0):
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._pending: Dict[int, Tuple[float, float]] = {}  # user_id -> (первая отметка, последняя отметка)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, user_id: int) -> None:
+        now = time.monotonic()
+        first_seen = self._pending.get(user_id, (now, now))[0]
+        self._pending[user_id] = (first_seen, now)
+        self._wakeup.set()
+
+    def _deadline(self, first_seen: float, last_seen: float) -> float:
+        return min(last_seen + self.debounce_seconds, first_seen + self.max_delay_seconds)
+
+    def _pop_due(self, now: float) -> List[int]:
+        due = [user_id for user_id, (first_seen, last_seen) in self._pending.items()
+               if self._deadline(first_seen, last_seen) <= now]
+        for user_id in due:
+            del self._pending[user_id]
+        return due
+
+    async def _revalue(self, user_ids: List[int]) -> None:
+        try:
+            uow = UnitOfWork()
+            async with uow:
+                portfolio_ids = await uow.portfolio.get_ids_by_user_ids(user_ids)
+        except Exception as e:
+            logger.error(f"Failed to resolve portfolios for revaluation of {len(user_ids)} users: {e}")
+            return
+
+        for portfolio_id in portfolio_ids:
+            try:
+                await PortfolioService().update_portfolio_value(UnitOfWork(), portfolio_id)
+            except Exception:
+                pass  # уже залогировано в update_portfolio_value, остальные портфели пересчитываем дальше
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            due = self._pop_due(now)
+            if due:
+                await self._revalue(due)
+                continue
+
+            # Новые отметки не дают дедлайн раньше уже ожидающих, поэтому достаточно спать до ближайшего
+            next_deadline = min(self._deadline(*seen) for seen in self._pending.values())
+            await asyncio.sleep(next_deadline - now)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Portfolio revaluation worker started (debounce {self.debounce_seconds}s, "
+                        f"max delay {self.max_delay_seconds}s)")
+
+    async def stop(self) -> None:
+        """Останавливает воркер и пересчитывает все, что осталось в очереди"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._pending:
+            user_ids = list(self._pending)
+            self._pending.clear()
+            await self._revalue(user_ids)
+        logger.info("Portfolio revaluation worker stopped")
+
+
+revaluation_queue = PortfolioRevaluationQueue(
+    debounce_seconds=portfolio_settings.PORTFOLIO_REVALUATION_DEBOUNCE_SECONDS,
+    max_delay_seconds=portfolio_settings.PORTFOLIO_REVALUATION_MAX_DELAY_SECONDS,
+)
@@ -1,8 +1,10 @@
 import logging
 from back.portfolio_service.exceptions import PortfolioAssetDoesntExistCannotSellException, \
-    TransactionDoesntExistsException, TransactionCannotConductException
+    TransactionDoesntExistsException, TransactionCannotConductException, TransactionPriceUnavailableException, \
+    AssetDoesntExistException
 from back.portfolio_service.schemas.transactions import STransactionCreate, TransactionType
 from back.portfolio_service.schemas.portfolio_assets import SPortfolioAssetCreate, SPortfolioAssetUpdate
+from back.portfolio_service.services.price_history import price_history_service
 from back.portfolio_service.utils.uow import IUnitOfWork
 
 logger = logging.getLogger(__name__)
@@ -10,67 +12,114 @@ logger = logging.getLogger(__name__)
 
 class TransactionsService:
     async def add_transaction(self, portfolio_id: int, uow: IUnitOfWork, transaction: STransactionCreate):
-        try:
-            async with uow:
-                trans_dict = transaction.model_dump()
-                trans_dict["portfolio_id"] = portfolio_id
-                transaction_id = await uow.transactions.add(trans_dict)
-                
-                portfolio_asset = await uow.portfolio_assets.get_one(portfolio_id=portfolio_id,
-                                                           asset_id=transaction.asset_id)
-                portfolio = await uow.portfolio.get_one(id=portfolio_id)
+        async with uow:
+            [transaction] = await self._fill_missing_prices(uow, [transaction])
+            transaction_id = await self._apply_transaction(portfolio_id, uow, transaction)
+            await uow.commit()
+            return transaction_id
+
+    async def add_transactions(self, portfolio_id: int, uow: IUnitOfWork,
+                               transactions: list[STransactionCreate]) -> list[int]:
+        """
+        Пакетное добавление (импорт задним числом): транзакции применяются по возрастанию
+        transaction_date в одной транзакции БД, недостающие цены берутся из истории.
+
+        Returns:
+            list: id созданных транзакций в порядке входного списка
+        """
+        async with uow:
+            transactions = await self._fill_missing_prices(uow, transactions)
+            order = sorted(range(len(transactions)), key=lambda i: transactions[i].transaction_date)
+
+            transaction_ids = [0] * len(transactions)
+            for i in order:
+                transaction_ids[i] = await self._apply_transaction(portfolio_id, uow, transactions[i])
+            await uow.commit()
+            return transaction_ids
+
+    async def _fill_missing_prices(self, uow: IUnitOfWork,
+                                   transactions: list[STransactionCreate]) -> list[STransactionCreate]:
+        """Подставляет цену на transaction_date туда, где она не указана"""
+        missing = [transaction for transaction in transactions if transaction.price is None]
+        if not missing:
+            return transactions
+
+        asset_names = await uow.assets.get_names(list({transaction.asset_id for transaction in missing}))
+        requests = []
+        for transaction in missing:
+            if transaction.asset_id not in asset_names:
+                raise AssetDoesntExistException()
+            requests.append((asset_names[transaction.asset_id], transaction.transaction_date))
+
+        prices = iter(await price_history_service.get_prices_at(requests))
+        filled = []
+        for transaction in transactions:
+            if transaction.price is None:
+                price = next(prices)
+                if price is None:
+                    logger.warning(f"No price history for asset_id={transaction.asset_id} "
+                                   f"at {transaction.transaction_date.isoformat()}")
+                    raise TransactionPriceUnavailableException()
+                transaction = transaction.model_copy(update={"price": price})
+            filled.append(transaction)
+        return filled
+
+    async def _apply_transaction(self, portfolio_id: int, uow: IUnitOfWork, transaction: STransactionCreate) -> int:
+        """Записывает транзакцию и пересчитывает позицию и total_invested; коммит - на вызывающем"""
+        trans_dict = transaction.model_dump()
+        trans_dict["portfolio_id"] = portfolio_id
+        transaction_id = await uow.transactions.add(trans_dict)
+
+        portfolio_asset = await uow.portfolio_assets.get_one(portfolio_id=portfolio_id,
+                                                             asset_id=transaction.asset_id)
+        portfolio = await uow.portfolio.get_one(id=portfolio_id)
+
+        if portfolio_asset:
+            if transaction.transaction_type == TransactionType.buy:
+                logger.debug(f"Processing BUY transaction: adding {transaction.quantity} to existing {portfolio_asset.quantity}")
+                new_portfolio_asset = SPortfolioAssetUpdate(
+                    portfolio_id=portfolio_id,
+                    asset_id=transaction.asset_id,
+                    quantity=portfolio_asset.quantity + transaction.quantity
+                )
+                total_invested = portfolio.total_invested + (transaction.price * transaction.quantity)
+                await uow.portfolio_assets.update(portfolio_asset.id, new_portfolio_asset.model_dump())
+
+            elif transaction.transaction_type == TransactionType.sell:
+                if transaction.quantity > portfolio_asset.quantity:
+                    logger.warning(f"SELL transaction failed: insufficient quantity. Requested: {transaction.quantity}, Available: {portfolio_asset.quantity}")
+                    raise TransactionCannotConductException()
+
+                elif transaction.quantity == portfolio_asset.quantity:
+                    logger.debug(f"Processing SELL transaction: removing all {transaction.quantity} (complete sell)")
+                    await uow.portfolio_assets.delete(portfolio_asset.id)
+                    total_invested = portfolio.total_invested - (transaction.price * transaction.quantity)
 
-                if portfolio_asset:
-                    if transaction.transaction_type == TransactionType.buy:
-                        logger.debug(f"Processing BUY transaction: adding {transaction.quantity} to existing {portfolio_asset.quantity}")
-                        new_portfolio_asset = SPortfolioAssetUpdate(
-                            portfolio_id=portfolio_id,
-                            asset_id=transaction.asset_id,
-                            quantity=portfolio_asset.quantity + transaction.quantity
-                        )
-                        total_invested = portfolio.total_invested + (transaction.price * transaction.quantity)
-                        await uow.portfolio_assets.update(portfolio_asset.id, new_portfolio_asset.model_dump())
-                        
-                    elif transaction.transaction_type == TransactionType.sell:
-                        if transaction.quantity > portfolio_asset.quantity:
-                            logger.warning(f"SELL transaction failed: insufficient quantity. Requested: {transaction.quantity}, Available: {portfolio_asset.quantity}")
-                            raise TransactionCannotConductException()
-
-                        elif transaction.quantity == portfolio_asset.quantity:
-                            logger.debug(f"Processing SELL transaction: removing all {transaction.quantity} (complete sell)")
-                            await uow.portfolio_assets.delete(portfolio_asset.id)
-                            total_invested = portfolio.total_invested - (transaction.price * transaction.quantity)
-
-                        else:
-                            logger.debug(f"Processing SELL transaction: reducing from {portfolio_asset.quantity} to {portfolio_asset.quantity - transaction.quantity}")
-                            new_portfolio_asset = SPortfolioAssetUpdate(
-                                portfolio_id=portfolio_id,
-                                asset_id=transaction.asset_id,
-                                quantity=portfolio_asset.quantity - transaction.quantity
-                            )
-                            total_invested = portfolio.total_invested - (transaction.price * transaction.quantity)
-                            await uow.portfolio_assets.update(portfolio_asset.id, new_portfolio_asset.model_dump())
                 else:
-                    if transaction.transaction_type == TransactionType.buy:
-                        logger.debug(f"Processing BUY transaction: creating new portfolio asset with quantity {transaction.quantity}")
-                        new_portfolio_asset = SPortfolioAssetCreate(
-                            portfolio_id=portfolio_id,
-                            asset_id=transaction.asset_id,
-                            quantity=transaction.quantity
-                        )
-                        total_invested = portfolio.total_invested + (transaction.price * transaction.quantity)
-                    else:
-                        logger.warning(f"SELL transaction failed: asset not found in portfolio")
-                        raise PortfolioAssetDoesntExistCannotSellException()
-                    await uow.portfolio_assets.add(new_portfolio_asset.model_dump())
-
-                await uow.portfolio.update(portfolio_id, {'total_invested': total_invested})
-                await uow.commit()
-                
-                return transaction_id
-                
-        except Exception as e:
-            raise e
+                    logger.debug(f"Processing SELL transaction: reducing from {portfolio_asset.quantity} to {portfolio_asset.quantity - transaction.quantity}")
+                    new_portfolio_asset = SPortfolioAssetUpdate(
+                        portfolio_id=portfolio_id,
+                        asset_id=transaction.asset_id,
+                        quantity=portfolio_asset.quantity - transaction.quantity
+                    )
+                    total_invested = portfolio.total_invested - (transaction.price * transaction.quantity)
+                    await uow.portfolio_assets.update(portfolio_asset.id, new_portfolio_asset.model_dump())
+        else:
+            if transaction.transaction_type == TransactionType.buy:
+                logger.debug(f"Processing BUY transaction: creating new portfolio asset with quantity {transaction.quantity}")
+                new_portfolio_asset = SPortfolioAssetCreate(
+                    portfolio_id=portfolio_id,
+                    asset_id=transaction.asset_id,
+                    quantity=transaction.quantity
+                )
+                total_invested = portfolio.total_invested + (transaction.price * transaction.quantity)
+            else:
+                logger.warning(f"SELL transaction failed: asset not found in portfolio")
+                raise PortfolioAssetDoesntExistCannotSellException()
+            await uow.portfolio_assets.add(new_portfolio_asset.model_dump())
+
+        await uow.portfolio.update(portfolio_id, {'total_invested': total_invested})
+        return transaction_id
 
     async def get_transaction(self, uow: IUnitOfWork, transaction_id: int):
         async with uow:
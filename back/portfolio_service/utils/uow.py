@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Type
 
-from back.portfolio_service.database import async_session_maker
+from back.portfolio_service.database import async_session_maker, engine
 from back.portfolio_service.repositories.assets import AssetsRepository
 from back.portfolio_service.repositories.portfolio import PortfolioRepository
 from back.portfolio_service.repositories.portfolio_assets import PortfolioAssetsRepository
@@ -38,21 +38,47 @@ class IUnitOfWork(ABC):
 
 
 class UnitOfWork:
+    """
+    Реентерабельный UoW: вложенные `async with uow` используют одну сессию и одно соединение из пула.
+
+    Соединение берется на самом внешнем входе и возвращается в пул на самом внешнем выходе, внутренние
+    выходы ничего не закрывают. Фиксация явная: commit() фиксирует все, что сделано в сессии к этому
+    моменту, незафиксированное откатывается на внешнем выходе или на выходе по исключению.
+    """
+
     def __init__(self):
         self.session_factory = async_session_maker
+        self.session = None
+        self._connection = None
+        self._depth = 0
 
     async def __aenter__(self):
-        self.session = self.session_factory()
+        if self._depth == 0:
+            self._connection = await engine.connect()
+            self.session = self.session_factory(bind=self._connection)
 
-        self.portfolio = PortfolioRepository(self.session)
-        self.assets = AssetsRepository(self.session)
-        self.portfolio_assets = PortfolioAssetsRepository(self.session)
-        self.transactions = TransactionsRepository(self.session)
-        self.users = UsersRepository(self.session)
+            self.portfolio = PortfolioRepository(self.session)
+            self.assets = AssetsRepository(self.session)
+            self.portfolio_assets = PortfolioAssetsRepository(self.session)
+            self.transactions = TransactionsRepository(self.session)
+            self.users = UsersRepository(self.session)
+        self._depth += 1
+        return self
 
-    async def __aexit__(self, *args):
-        await self.rollback()
-        await self.session.close()
+    async def __aexit__(self, exc_type, *args):
+        self._depth -= 1
+        if self._depth > 0:
+            if exc_type is not None:
+                await self.rollback()
+            return
+
+        try:
+            await self.rollback()
+            await self.session.close()
+        finally:
+            await self._connection.close()
+            self.session = None
+            self._connection = None
 
     async def commit(self):
         await self.session.commit()
@@ -7,22 +7,31 @@ from aiogram_dialog.widgets.kbd import Button, Select, Cancel, Back, ScrollingGr
 from aiogram_dialog.widgets.text import Const, Format
 from datetime import datetime
 
-from bot.services.market_data import get_popular_cryptocurrencies, get_multiple_crypto_prices, get_crypto_price
+from bot.services.market_data import get_popular_cryptocurrencies, get_multiple_crypto_prices, get_crypto_price, \
+    get_stale_assets
 
 router = Router(name="market_data")
 
+RANKINGS = [("market_cap", "Капитализация"), ("volume_24h", "Объем 24ч"), ("change_24h", "Рост 24ч")]
+
+
 class MarketDataStates(StatesGroup):
     main = State()
     detail = State()
 
 async def get_crypto_data(dialog_manager: DialogManager, **kwargs):
     """Получаем данные о криптовалютах"""
-    crypto_list = await get_popular_cryptocurrencies()
+    rank_by = dialog_manager.dialog_data.get("rank_by", "market_cap")
+    crypto_list = await get_popular_cryptocurrencies(rank_by)
     crypto_data = await get_multiple_crypto_prices(crypto_list)
+    stale_assets = await get_stale_assets(crypto_list)
     
     # Подготавливаем данные для отображения
     crypto_items = []
     for crypto, data in crypto_data.items():
+        if "error" in data:
+            # В рейтинге есть активы, которые сервис не отслеживает
+            continue
         price = data.get("current_price")
         change = data.get("usd_24h_change")
         
@@ -44,6 +53,8 @@ async def get_crypto_data(dialog_manager: DialogManager, **kwargs):
                 emoji = "⚪"
                 
             display_text = f"{crypto}: ${price_formatted} ({emoji} {change_formatted}%)"
+            if crypto in stale_assets:
+                display_text = f"⚠️ {display_text}"
         else:
             display_text = f"{crypto}: данные недоступны"
             
@@ -52,7 +63,8 @@ async def get_crypto_data(dialog_manager: DialogManager, **kwargs):
     return {
         "crypto_data": crypto_data,
         "crypto_items": crypto_items,
-        "selected_crypto": dialog_manager.dialog_data.get("selected_crypto", "")
+        "selected_crypto": dialog_manager.dialog_data.get("selected_crypto", ""),
+        "rankings": [(key, f"• {title}" if key == rank_by else title) for key, title in RANKINGS],
     }
 
 async def get_crypto_detail(dialog_manager: DialogManager, **kwargs):
@@ -60,6 +72,7 @@ async def get_crypto_detail(dialog_manager: DialogManager, **kwargs):
     selected = dialog_manager.dialog_data.get("selected_crypto", "")
     
     crypto_data = await get_crypto_price(selected)
+    is_stale = bool(await get_stale_assets([selected]))
     
     # Форматируем цену с двумя знаками после запятой
     price = crypto_data.get("current_price", "данные отсутствуют")
@@ -96,9 +109,15 @@ async def get_crypto_detail(dialog_manager: DialogManager, **kwargs):
         "price": price_formatted,
         "change_24h": change_formatted,
         "change_emoji": change_emoji,
-        "last_updated": last_updated_formatted
+        "last_updated": last_updated_formatted,
+        "is_stale": is_stale
     }
 
+async def on_ranking_selected(callback: CallbackQuery, widget: Select, manager: DialogManager, item_id: str):
+    """Переключение сортировки списка"""
+    manager.dialog_data["rank_by"] = item_id
+
+
 async def on_crypto_selected(callback: CallbackQuery, widget: Select, manager: DialogManager, item_id: str):
     """Обработчик выбора криптовалюты"""
     manager.dialog_data["selected_crypto"] = item_id
@@ -118,6 +137,13 @@ dialog = Dialog(
     Window(
         Const("🪙 Курсы криптовалют"),
         Const("Выберите криптовалюту из списка:"),
+        Select(
+            Format("{item[1]}"),
+            id="ranking_select",
+            item_id_getter=lambda x: x[0],
+            items="rankings",
+            on_click=on_ranking_selected
+        ),
         ScrollingGroup(
             Select(
                 Format("{item[1]}"),
@@ -141,6 +167,7 @@ dialog = Dialog(
         Format("💰 Текущая цена: ${price}"),
         Format("📈 Изменение за 24ч: {change_emoji} {change_24h}%"),
         Format("🕒 Последнее обновление: {last_updated}"),
+        Const("⚠️ Данные устарели: цена давно не обновлялась", when="is_stale"),
         Back(Const("⬅️ Назад к списку")),
         Cancel(Const("❌ Закрыть")),
         state=MarketDataStates.detail,
@@ -24,7 +24,7 @@ async def assets_getter(dialog_manager: DialogManager, **kwargs) -> dict:
     # получить ассеты
     assets = await get_assets()
     return {
-        'assets': [(asset["id"], asset["symbol"]) for asset in assets]
+        'assets': [(asset["id"], asset["symbol"]) for asset in assets if asset.get("is_active", True)]
     }
 
 
@@ -50,6 +50,12 @@ async def on_add_price(message: Message, mi: MessageInput, dm: DialogManager):
     await dm.switch_to(TransactionsStates.confirm)
 
 
+async def on_market_price(callback: CallbackQuery, button: Button, dm: DialogManager):
+    # цену подставит portfolio_service из истории цен на момент транзакции
+    dm.dialog_data['price'] = None
+    await dm.switch_to(TransactionsStates.confirm)
+
+
 async def confirm_transaction_getter(dialog_manager: DialogManager, **kwargs) -> dict:
     assets = await get_assets()
     selected_asset_id = dialog_manager.dialog_data.get('selected_asset_id', None)
@@ -64,7 +70,7 @@ async def confirm_transaction_getter(dialog_manager: DialogManager, **kwargs) ->
         'transaction': f"Актив: {asset['symbol']}\n"
                        f"Тип транзакции: {transaction_type}\n"
                        f"Количество: {dialog_manager.dialog_data['quantity']}\n"
-                       f"Цена: {dialog_manager.dialog_data['price']}",
+                       f"Цена: {dialog_manager.dialog_data['price'] or 'рыночная'}",
     }
 
 
@@ -137,6 +143,7 @@ dialog = Dialog(
     Window(
         Const("Введите цену за единицу"),
         MessageInput(on_add_price, content_types=ContentType.TEXT),
+        Button(Const("По рыночной цене"), id="market_price", on_click=on_market_price),
         SwitchTo(Const("Назад"), id="back", state=TransactionsStates.add_quantity),
         state=TransactionsStates.add_price
     ),
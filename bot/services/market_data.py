@@ -1,6 +1,15 @@
+import json
+import time
+from datetime import datetime
+
+from back.market_data_service.snapshot_format import SNAPSHOT_BLOB_KEY, decode_snapshot
 from bot.core.loader import market_redis as redis
 from bot.services.portfolios import get_assets
 
+# Порог устаревания, пока market_data:health нет (как MARKET_STALE_AFTER_MINUTES по умолчанию)
+DEFAULT_STALE_AFTER_SECONDS = 30 * 60
+
+
 async def get_crypto_price(crypto_asset: str) -> dict:
     """
     Получение цены криптовалюты из Redis
@@ -30,21 +39,141 @@ async def get_multiple_crypto_prices(crypto_assets: list[str]) -> dict:
     Returns:
         dict: Словарь с данными о криптовалютах
     """
-    result = {}
-    
+    blob = await redis.get(SNAPSHOT_BLOB_KEY)
+    if not blob:
+        # Бинарного снимка еще нет - читаем хэши по одному
+        return {asset: await get_crypto_price(asset) for asset in crypto_assets}
+
+    snapshot = decode_snapshot(blob)
+    result, missing = {}, []
     for asset in crypto_assets:
-        result[asset] = await get_crypto_price(asset)
-    
-    return result
+        record = snapshot.get(asset)
+        if record is None:
+            missing.append(asset)
+            continue
+        current_price, usd_24h_change, last_updated = record
+        result[asset] = {
+            "current_price": str(current_price),
+            "usd_24h_change": str(usd_24h_change),
+            "last_updated": datetime.fromtimestamp(last_updated).isoformat()
+        }
 
+    # Активов, которых еще нет в бинарном снимке (например, только что добавленных), ищем в хэшах
+    if missing:
+        async with redis.pipeline(transaction=False) as pipe:
+            for asset in missing:
+                pipe.hgetall(f"market_data:{asset}")
+            hashes = await pipe.execute()
+        for asset, crypto_info in zip(missing, hashes):
+            result[asset] = ({k.decode(): v.decode() for k, v in crypto_info.items()} if crypto_info
+                             else {"error": f"Данные для {asset} не найдены"})
 
-async def get_popular_cryptocurrencies() -> list[str]:
+    return {asset: result[asset] for asset in crypto_assets}
+
+
+async def get_snapshot_version() -> int:
+    """
+    Получение версии текущего снимка рыночных данных
+
+    Returns:
+        int: Номер версии (0, если снимок еще не записан)
+    """
+    version = await redis.get("market_data:version")
+    return int(version) if version else 0
+
+
+async def get_stale_assets(crypto_assets: list[str]) -> set[str]:
+    """
+    Криптовалюты, данные которых давно не обновлялись.
+    Возраст считается по last_updated в момент чтения, так что остановка market_data_service
+    тоже видна; порог берется из market_data:health.
+
+    Args:
+        crypto_assets: Список идентификаторов криптовалют
+
+    Returns:
+        set: Идентификаторы с устаревшими ценами
+    """
+    blob, health = await redis.mget(SNAPSHOT_BLOB_KEY, "market_data:health")
+    stale_after = json.loads(health)["stale_after_seconds"] if health else DEFAULT_STALE_AFTER_SECONDS
+
+    last_updated = {}
+    if blob:
+        snapshot = decode_snapshot(blob)
+        for asset in crypto_assets:
+            record = snapshot.get(asset)
+            if record is not None:
+                last_updated[asset] = record[2]
+
+    # Активы, которых нет в бинарном снимке, проверяем по хэшам
+    missing = [asset for asset in crypto_assets if asset not in last_updated]
+    if missing:
+        async with redis.pipeline(transaction=False) as pipe:
+            for asset in missing:
+                pipe.hget(f"market_data:{asset}", "last_updated")
+            values = await pipe.execute()
+        for asset, value in zip(missing, values):
+            if value:
+                last_updated[asset] = datetime.fromisoformat(value.decode()).timestamp()
+
+    now = time.time()
+    return {asset for asset in crypto_assets
+            if asset not in last_updated or now - last_updated[asset] > stale_after}
+
+
+async def get_top_assets(rank_by: str = "market_cap", limit: int | None = 50) -> list[str]:
+    """
+    Топ активов по рейтингу market_data_service - один ZREVRANGE
+
+    Args:
+        rank_by: market_cap, volume_24h или change_24h
+        limit: Сколько активов вернуть; None - весь рейтинг
+
+    Returns:
+        list: Идентификаторы по убыванию метрики (пустой, если рейтинг еще не посчитан)
+    """
+    members = await redis.zrevrange(f"market_rank:{rank_by}", 0, -1 if limit is None else limit - 1)
+    return [member.decode() for member in members]
+
+
+async def get_tracked_assets(crypto_assets: list[str]) -> set[str]:
+    """
+    Криптовалюты, для которых market_data_service записывает цены
+
+    Args:
+        crypto_assets: Список идентификаторов криптовалют
+
+    Returns:
+        set: Идентификаторы, которые есть в бинарном снимке (или в хэшах market_data:{asset}, пока снимка нет)
+    """
+    blob = await redis.get(SNAPSHOT_BLOB_KEY)
+    if blob:
+        snapshot = decode_snapshot(blob)
+        return {asset for asset in crypto_assets if asset in snapshot}
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for asset in crypto_assets:
+            pipe.exists(f"market_data:{asset}")
+        flags = await pipe.execute()
+    return {asset for asset, exists in zip(crypto_assets, flags) if exists}
+
+
+async def get_popular_cryptocurrencies(rank_by: str = "market_cap", limit: int = 50) -> list[str]:
     """
     Получение списка популярных криптовалют 
     
     Returns:
         list: Список идентификаторов популярных криптовалют
     """
+    # Рейтинг покрывает весь топ CoinGecko, а цены есть только у отслеживаемых активов:
+    # берем весь рейтинг и оставляем первые limit из них
+    ranked = await get_top_assets(rank_by, limit=None)
+    tracked = await get_tracked_assets(ranked)
+    top_assets = [asset for asset in ranked if asset in tracked][:limit]
+    if top_assets:
+        return top_assets
+
+    # Рейтинга еще нет - показываем каталог активов
     assets = await get_assets()
     # В реальном приложении можно получать этот список из Redis или конфига
     return [asset["name"] for asset in assets]
\ No newline at end of file
@@ -59,7 +59,7 @@ async def get_assets():
 async def add_transaction(
     back_user_id: int, back_portfolio_id: int,
     asset_id: int, transaction_type: str,
-    quantity: float, price: int
+    quantity: float, price: float | None
 ):
     async with ServiceClient({"gateway": settings.gateway_url}) as client:
         try:
@@ -0,0 +1,5 @@
+import os
+
+# Обязательные настройки сервисов без значений по умолчанию: модули создают settings при импорте
+os.environ.setdefault("COINGECKO_API_KEY", "test")
+os.environ.setdefault("COINGECKO_URL", "http://localhost")
@@ -0,0 +1,61 @@
+import os
+
+from back.market_data_service.archive_format import TICKS, ArchiveWriter, month_of
+
+DAY = 24 * 60 * 60
+MAY = 1714521600.0  # 2024-05-01
+JUNE = MAY + 31 * DAY
+
+
+def ticks(start: float, count: int, price: float = 100.0) -> list[tuple[float, float]]:
+    return [(start + i * DAY, price + i) for i in range(count)]
+
+
+def stored(writer: ArchiveWriter, asset: str = "bitcoin") -> list[tuple[float, float]]:
+    columns = writer.read(TICKS, asset, 0, JUNE + 365 * DAY)
+    return list(zip(columns["timestamp"], columns["price"]))
+
+
+def test_append_skips_rows_not_newer_than_archive(tmp_path):
+    writer = ArchiveWriter(str(tmp_path))
+
+    assert writer.append(TICKS, "bitcoin", ticks(JUNE, 3)) == 3
+    assert writer.append(TICKS, "bitcoin", ticks(MAY, 2)) == 0
+    assert stored(writer) == ticks(JUNE, 3)
+
+
+def test_merge_writes_back_dated_months(tmp_path):
+    writer = ArchiveWriter(str(tmp_path))
+    writer.append(TICKS, "bitcoin", ticks(JUNE, 3))
+
+    assert writer.merge(TICKS, "bitcoin", ticks(MAY - 3 * DAY, 5, price=50.0)) == 5
+    assert writer.months(TICKS, "bitcoin") == ["2024-04", "2024-05", "2024-06"]
+    assert stored(writer) == ticks(MAY - 3 * DAY, 5, price=50.0) + ticks(JUNE, 3)
+    assert writer.first_timestamp(TICKS, "bitcoin") == MAY - 3 * DAY
+    assert writer.last_timestamp(TICKS, "bitcoin") == JUNE + 2 * DAY
+
+
+def test_merge_interleaves_and_keeps_existing_rows(tmp_path):
+    writer = ArchiveWriter(str(tmp_path))
+    writer.append(TICKS, "bitcoin", [(MAY + DAY, 1.0), (MAY + 3 * DAY, 3.0)])
+
+    added = writer.merge(TICKS, "bitcoin", [(MAY, 0.0), (MAY + DAY, 99.0), (MAY + 2 * DAY, 2.0)])
+
+    assert added == 2
+    assert stored(writer) == [(MAY, 0.0), (MAY + DAY, 1.0), (MAY + 2 * DAY, 2.0), (MAY + 3 * DAY, 3.0)]
+    assert writer.merge(TICKS, "bitcoin", [(MAY, 0.0)]) == 0
+
+
+def test_interrupted_partition_replace_is_recovered(tmp_path):
+    writer = ArchiveWriter(str(tmp_path))
+    writer.append(TICKS, "bitcoin", ticks(MAY, 2))
+    asset_dir = os.path.join(str(tmp_path), TICKS, "bitcoin")
+    # Падение между двумя rename: старая партиция уже отодвинута, новая еще не на месте
+    os.rename(os.path.join(asset_dir, month_of(MAY)), os.path.join(asset_dir, f".{month_of(MAY)}.old"))
+    os.makedirs(os.path.join(asset_dir, f".{month_of(MAY)}.tmp"))
+
+    assert writer.months(TICKS, "bitcoin") == []
+    writer.merge(TICKS, "bitcoin", [(MAY + 5 * DAY, 7.0)])
+
+    assert sorted(os.listdir(asset_dir)) == [".lock", month_of(MAY)]
+    assert stored(writer) == ticks(MAY, 2) + [(MAY + 5 * DAY, 7.0)]
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+from back.market_data_service.archive_format import TICKS, candles_kind
+from back.market_data_service.backfill import DAY_SECONDS, HistoryBackfill, align_to_day
+
+
+START = 100 * DAY_SECONDS
+LIVE_START = 400 * DAY_SECONDS
+
+
+def test_align_to_day():
+    assert align_to_day(START + 3600.5) == START
+    assert align_to_day(START) == START
+
+
+def test_first_run_loads_up_to_live_data():
+    assert HistoryBackfill.plan(START, LIVE_START, None) == (START, START, LIVE_START)
+
+
+def test_interrupted_run_resumes_from_checkpoint():
+    checkpoint = (START, START + 30 * DAY_SECONDS, LIVE_START)
+
+    assert HistoryBackfill.plan(START, LIVE_START, checkpoint) == (START, START + 30 * DAY_SECONDS, LIVE_START)
+
+
+def test_shallower_request_resumes_previous_range():
+    checkpoint = (START, START + 30 * DAY_SECONDS, LIVE_START)
+    shallower = START + 10 * DAY_SECONDS
+
+    assert HistoryBackfill.plan(shallower, LIVE_START, checkpoint) == (START, START + 30 * DAY_SECONDS, LIVE_START)
+
+
+def test_completed_run_has_nothing_left():
+    checkpoint = (START, LIVE_START, LIVE_START)
+    range_start, resume_from, range_end = HistoryBackfill.plan(START, LIVE_START, checkpoint)
+
+    assert resume_from >= range_end
+
+
+def test_deeper_request_after_completed_run_loads_only_older_history():
+    checkpoint = (START, LIVE_START, LIVE_START)
+    deeper = START - 50 * DAY_SECONDS
+
+    assert HistoryBackfill.plan(deeper, LIVE_START, checkpoint) == (deeper, deeper, START)
+
+
+def test_deeper_request_after_interrupted_run_restarts_whole_range():
+    checkpoint = (START, START + 30 * DAY_SECONDS, LIVE_START)
+    deeper = START - 50 * DAY_SECONDS
+
+    assert HistoryBackfill.plan(deeper, LIVE_START, checkpoint) == (deeper, deeper, LIVE_START)
+
+
+def make_backfill(archive=None, **retention_days) -> HistoryBackfill:
+    redis_client = SimpleNamespace(
+        history_retention_seconds=2 * DAY_SECONDS,
+        candle_retention_seconds={resolution: days * DAY_SECONDS for resolution, days in retention_days.items()},
+    )
+    return HistoryBackfill(None, redis_client, days=365, archive=archive)
+
+
+def test_depth_without_archive_is_limited_by_longest_retention():
+    assert make_backfill(**{"1h": 14, "1d": 90}).max_days() == 90
+    assert make_backfill(**{"1h": 14}).max_days() is None
+
+
+def test_history_older_than_retention_goes_to_archive():
+    backfill = make_backfill(**{"1h": 14, "1d": 90})
+    now = LIVE_START
+    ticks = [(now - days * DAY_SECONDS, float(days)) for days in (100, 30, 1)]
+
+    redis_ticks, redis_candles, archived = backfill.split_chunk(ticks, backfill.build_candles("bitcoin", ticks), now)
+
+    assert redis_ticks == [(now - DAY_SECONDS, 1.0)]
+    assert sorted((resolution, candle.start) for resolution, candle in redis_candles) == [
+        ("1d", now - 30 * DAY_SECONDS), ("1d", now - DAY_SECONDS), ("1h", now - DAY_SECONDS)]
+    assert archived[TICKS] == [(now - 100 * DAY_SECONDS, 100.0), (now - 30 * DAY_SECONDS, 30.0)]
+    assert [row[0] for row in archived[candles_kind("1d")]] == [now - 100 * DAY_SECONDS]
+    assert [row[0] for row in archived[candles_kind("1h")]] == [now - 100 * DAY_SECONDS, now - 30 * DAY_SECONDS]
@@ -0,0 +1,46 @@
+from back.market_data_service.events import SnapshotDiffer
+from back.market_data_service.metrics import CycleMetrics, MarketDataMetrics
+from back.market_data_service.updater import MarketDataUpdater
+
+NOW = 1717000000.0
+
+
+def make_updater() -> MarketDataUpdater:
+    differ = SnapshotDiffer()
+    differ.apply({
+        "bitcoin": {"current_price": 60000.0, "usd_24h_change": 1.0, "last_updated_unix": NOW},
+        "delisted": {"current_price": 0.01, "usd_24h_change": 0.0, "last_updated_unix": NOW - 3600},
+    })
+    metrics = MarketDataMetrics(stale_after_seconds=600)
+    return MarketDataUpdater(None, None, None, differ, metrics=metrics)
+
+
+def record(updater: MarketDataUpdater, assets: list[str], now: float = NOW):
+    updater.metrics.record_cycle(CycleMetrics(started_at=now, requested=len(assets), written=len(assets)),
+                                 updater.snapshot_differ.last_updated, assets, now=now)
+
+
+def test_untracked_asset_keeps_health_degraded_until_pruned():
+    updater = make_updater()
+    record(updater, ["bitcoin", "delisted"])
+
+    assert updater.metrics.health()["status"] == "degraded"
+    assert updater.metrics.stale_assets == {"delisted"}
+
+    updater.retain(["bitcoin"])
+    assert updater.metrics.stale_assets == set()
+    assert updater.metrics.health()["status"] == "ok"
+
+    record(updater, ["bitcoin"], now=NOW + 60)
+    health = updater.metrics.health()
+    assert health["status"] == "ok"
+    assert health["assets_total"] == 1
+    assert "delisted" not in updater.snapshot_differ.records({})
+
+
+def test_missing_data_for_tracked_asset_is_stale():
+    metrics = MarketDataMetrics(stale_after_seconds=600)
+    metrics.record_cycle(CycleMetrics(started_at=NOW, requested=1), {}, ["bitcoin"], now=NOW)
+
+    assert metrics.stale_assets == {"bitcoin"}
+    assert metrics.health()["status"] == "degraded"
@@ -0,0 +1,118 @@
+import random
+from statistics import median
+
+import pytest
+
+from back.market_data_service.outliers import OutlierFilter, RollingMedian
+
+
+def reference_mad(values: list[float]) -> float:
+    center = median(values)
+    return median(abs(value - center) for value in values)
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 6, 30])
+def test_rolling_median_and_mad_match_reference(size):
+    rng = random.Random(size)
+    window = RollingMedian(size)
+    recent = []
+    for _ in range(200):
+        value = rng.choice([rng.uniform(90, 110), 100.0])
+        window.add(value)
+        recent = (recent + [value])[-size:]
+
+        assert len(window) == len(recent)
+        assert window.median() == pytest.approx(median(recent))
+        assert window.mad() == pytest.approx(reference_mad(recent))
+
+
+def test_rolling_median_clear():
+    window = RollingMedian(3)
+    for value in (1.0, 2.0, 3.0):
+        window.add(value)
+    window.clear()
+    window.add(10.0)
+
+    assert len(window) == 1
+    assert window.median() == 10.0
+    assert window.mad() == 0.0
+
+
+def seeded_filter(**kwargs) -> OutlierFilter:
+    outlier_filter = OutlierFilter(window=10, min_samples=5, **kwargs)
+    outlier_filter.seed("bitcoin", [(t, 100.0 + (t % 3) * 0.1) for t in range(10)])
+    return outlier_filter
+
+
+def test_passes_everything_until_min_samples():
+    outlier_filter = OutlierFilter(window=10, min_samples=5)
+    for t, price in enumerate((100.0, 101.0, 99.0, 100.0)):
+        assert outlier_filter.check("bitcoin", t, price)
+
+    assert outlier_filter.check("bitcoin", 4, 1000.0)
+
+
+def test_normal_ticks_pass():
+    outlier_filter = seeded_filter()
+
+    assert outlier_filter.check("bitcoin", 10, 100.2)
+    assert "bitcoin" not in outlier_filter.quarantine
+
+
+def test_flat_series_tolerates_small_moves():
+    # MAD плоского ряда равен нулю, обычное колебание не должно считаться выбросом
+    outlier_filter = OutlierFilter(window=10, min_samples=5)
+    outlier_filter.seed("usd-coin", [(t, 1.0) for t in range(10)])
+
+    assert outlier_filter.check("usd-coin", 10, 1.002)
+
+
+def test_spike_is_quarantined_and_dropped_when_price_returns():
+    outlier_filter = seeded_filter()
+
+    assert not outlier_filter.check("bitcoin", 10, 1000.0)
+    assert outlier_filter.quarantine["bitcoin"].price == 1000.0
+
+    assert outlier_filter.check("bitcoin", 11, 100.1)
+    assert "bitcoin" not in outlier_filter.quarantine
+    assert 1000.0 not in outlier_filter.windows["bitcoin"].values
+
+
+def test_new_level_is_accepted_after_confirmation():
+    outlier_filter = seeded_filter()
+
+    assert not outlier_filter.check("bitcoin", 10, 150.0)
+    assert outlier_filter.check("bitcoin", 11, 151.0)
+    assert "bitcoin" not in outlier_filter.quarantine
+    # Окно начинается заново с подтвержденного уровня
+    assert list(outlier_filter.windows["bitcoin"].values) == [150.0, 151.0]
+    assert outlier_filter.last_timestamps["bitcoin"] == 11
+
+
+def test_repeated_quarantined_tick_is_not_a_confirmation():
+    outlier_filter = seeded_filter()
+
+    assert not outlier_filter.check("bitcoin", 10, 150.0)
+    assert not outlier_filter.check("bitcoin", 10, 150.0)
+    assert "bitcoin" in outlier_filter.quarantine
+
+
+def test_repeated_accepted_tick_passes():
+    outlier_filter = seeded_filter()
+
+    assert outlier_filter.check("bitcoin", 9, 5000.0)
+
+
+def test_unconfirmed_second_spike_replaces_quarantine():
+    outlier_filter = seeded_filter()
+
+    assert not outlier_filter.check("bitcoin", 10, 150.0)
+    assert not outlier_filter.check("bitcoin", 11, 50.0)
+    assert outlier_filter.quarantine["bitcoin"].price == 50.0
+
+
+def test_assets_are_independent():
+    outlier_filter = seeded_filter()
+
+    assert outlier_filter.check("ethereum", 0, 3000.0)
+    assert not outlier_filter.check("bitcoin", 10, 3000.0)
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from back.market_data_service.events import SnapshotDiffer
+from back.market_data_service.refresh_scheduler import RefreshTier, TieredRefreshScheduler
+
+
+def make_scheduler(holders: dict[str, int], changes: dict[str, float], budget: float,
+                   max_ids_length: int = 61) -> TieredRefreshScheduler:
+    universe = SimpleNamespace(assets=list(holders), holders=holders)
+    differ = SnapshotDiffer()
+    differ.changes_24h = changes
+    tiers = [
+        RefreshTier("hot", interval_minutes=1, min_holders=5, min_volatility=5.0),
+        RefreshTier("warm", interval_minutes=3, min_holders=1, min_volatility=2.0),
+        RefreshTier("cold", interval_minutes=15, min_holders=0, min_volatility=0.0),
+    ]
+    return TieredRefreshScheduler(None, None, universe, differ, None, max_ids_length=max_ids_length,
+                                  budget_per_minute=budget, tiers=tiers)
+
+
+def tier_assets(scheduler: TieredRefreshScheduler) -> dict[str, list[str]]:
+    return {tier.name: tier.assets for tier in scheduler.tiers}
+
+
+def test_assets_are_tiered_by_holders_and_volatility():
+    scheduler = make_scheduler(
+        holders={"bitcoin": 10, "ethereum": 2, "pepe": 0, "dogecoin": 0},
+        changes={"pepe": -7.5, "dogecoin": 0.3},
+        budget=100,
+    )
+    scheduler.assign_tiers()
+
+    assert tier_assets(scheduler) == {"hot": ["bitcoin", "pepe"], "warm": ["ethereum"], "cold": ["dogecoin"]}
+    assert [tier.interval_minutes for tier in scheduler.tiers] == [1, 3, 15]
+
+
+def test_lowest_priority_assets_are_demoted_when_over_budget():
+    # id из 60 символов с запятой - ровно один чанк: hot стоит 1 запрос в минуту на актив, warm - 1/3
+    holders = {"a" * 60: 9, "b" * 60: 8, "c" * 60: 7}
+    scheduler = make_scheduler(holders, changes={}, budget=2.5)
+    scheduler.assign_tiers()
+
+    # Из hot вниз уходит наименее популярный актив, и он встает первым в warm
+    assert tier_assets(scheduler) == {"hot": ["a" * 60, "b" * 60], "warm": ["c" * 60], "cold": []}
+    assert scheduler.tiers[0].interval_minutes == 1
+
+
+def test_last_tier_interval_is_stretched_when_demotion_is_not_enough():
+    holders = {f"{i:02d}" + "x" * 58: 0 for i in range(4)}
+    scheduler = make_scheduler(holders, changes={}, budget=0.1)
+    scheduler.assign_tiers()
+
+    cold = scheduler.tiers[-1]
+    assert len(cold.assets) == 4
+    # 4 чанка при бюджете 0.1 запроса в минуту
+    assert cold.interval_minutes == 40
+    assert sum(tier["requests_per_minute"] for tier in scheduler.get_schedule()) <= 0.1
+
+
+def test_reassign_restores_base_intervals():
+    holders = {f"{i:02d}" + "x" * 58: 0 for i in range(4)}
+    scheduler = make_scheduler(holders, changes={}, budget=0.1)
+    scheduler.assign_tiers()
+    scheduler.budget_per_minute = 100
+    scheduler.assign_tiers()
+
+    assert scheduler.tiers[-1].interval_minutes == 15
@@ -0,0 +1,55 @@
+import pytest
+
+from back.market_data_service.snapshot_format import HEADER, SnapshotFormatError, decode_snapshot, encode_snapshot
+
+
+RECORDS = {
+    "bitcoin": (64250.5, -1.25, 1717000000.0),
+    "ethereum": (3100.0, 2.5, 1717000030.0),
+    "usd-coin": (1.0, 0.0, 1717000060.0),
+}
+
+
+def test_round_trip():
+    snapshot = decode_snapshot(encode_snapshot(42, 1717000100.5, RECORDS))
+
+    assert snapshot.version == 42
+    assert snapshot.updated_at == 1717000100.5
+    assert snapshot.assets == list(RECORDS)
+    assert len(snapshot) == 3
+    for asset, record in RECORDS.items():
+        assert asset in snapshot
+        assert snapshot.get(asset) == record
+        assert snapshot.price(asset) == record[0]
+
+
+def test_missing_asset():
+    snapshot = decode_snapshot(encode_snapshot(1, 0.0, RECORDS))
+
+    assert "dogecoin" not in snapshot
+    assert snapshot.get("dogecoin") is None
+    assert snapshot.price("dogecoin") is None
+
+
+def test_empty_snapshot():
+    snapshot = decode_snapshot(encode_snapshot(7, 1.0, {}))
+
+    assert snapshot.version == 7
+    assert len(snapshot) == 0
+    assert snapshot.assets == []
+
+
+def test_truncated_blob_is_rejected():
+    blob = encode_snapshot(1, 0.0, RECORDS)
+
+    with pytest.raises(SnapshotFormatError):
+        decode_snapshot(blob[:HEADER.size - 1])
+    with pytest.raises(SnapshotFormatError):
+        decode_snapshot(blob[:-1])
+
+
+def test_unknown_magic_is_rejected():
+    blob = encode_snapshot(1, 0.0, RECORDS)
+
+    with pytest.raises(SnapshotFormatError):
+        decode_snapshot(b"XXXX" + blob[4:])
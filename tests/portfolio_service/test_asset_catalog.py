@@ -0,0 +1,50 @@
+from back.portfolio_service.services.asset_catalog import diff_catalog
+
+
+def test_unchanged_catalog_has_no_changes():
+    current = {"bitcoin": ("BTC", True), "ethereum": ("ETH", True)}
+    coins = {"bitcoin": "BTC", "ethereum": "ETH"}
+
+    assert not diff_catalog(current, coins)
+
+
+def test_symbol_change_and_relisting_are_upserted():
+    current = {"polygon": ("MATIC", True), "luna": ("LUNA", False)}
+    coins = {"polygon": "POL", "luna": "LUNA"}
+
+    changes = diff_catalog(current, coins)
+
+    assert changes.upserts == {"polygon": "POL", "luna": "LUNA"}
+    assert changes.delisted == []
+
+
+def test_vanished_asset_is_delisted():
+    current = {"bitcoin": ("BTC", True), "dead-coin": ("DEAD", True), "old-coin": ("OLD", False)}
+    coins = {"bitcoin": "BTC"}
+
+    changes = diff_catalog(current, coins)
+
+    # Уже снятый актив повторно не снимается
+    assert changes.delisted == ["dead-coin"]
+    assert changes.upserts == {}
+
+
+def test_same_ticker_is_a_rename_candidate_not_a_rename():
+    current = {"matic-network": ("MATIC", True)}
+    coins = {"polygon-ecosystem-token": "MATIC", "matic-meme": "MATIC", "bitcoin": "BTC"}
+
+    changes = diff_catalog(current, coins, allowed_new={"polygon-ecosystem-token"})
+
+    assert changes.delisted == ["matic-network"]
+    assert changes.rename_candidates == {"matic-network": ["polygon-ecosystem-token", "matic-meme"]}
+    # Кандидат добавляется как обычный новый листинг, только если проходит allowed_new
+    assert changes.upserts == {"polygon-ecosystem-token": "MATIC"}
+
+
+def test_new_listings_are_filtered_by_allowed_new():
+    current = {"bitcoin": ("BTC", True)}
+    coins = {"bitcoin": "BTC", "solana": "SOL", "random-token": "RND"}
+
+    assert diff_catalog(current, coins).upserts == {"solana": "SOL", "random-token": "RND"}
+    assert diff_catalog(current, coins, allowed_new={"solana"}).upserts == {"solana": "SOL"}
+    assert diff_catalog(current, coins, allowed_new=set()).upserts == {}
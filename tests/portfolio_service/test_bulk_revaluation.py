@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from back.market_data_service.snapshot_format import decode_snapshot, encode_snapshot
+from back.portfolio_service.services import bulk_revaluation
+from back.portfolio_service.services.bulk_revaluation import BulkRevaluationService
+
+
+class FakeRedis:
+    def __init__(self, market_data: dict[str, dict]):
+        self.snapshot = decode_snapshot(encode_snapshot(3, 0.0, {"bitcoin": (60000.0, 0.0, 0.0)}))
+        self.market_data = market_data
+        self.locks = set()
+
+    async def get_snapshot(self):
+        return self.snapshot
+
+    async def acquire_lock(self, key, ttl_seconds):
+        if key in self.locks:
+            return False
+        self.locks.add(key)
+        return True
+
+    async def release_lock(self, key):
+        self.locks.discard(key)
+
+    async def get_assets(self, assets):
+        return {asset: self.market_data.get(asset, {}) for asset in assets}
+
+
+class FakePortfolios:
+    def __init__(self, held: dict[int, list[str]], fail: bool = False):
+        self.held = held
+        self.fail = fail
+        self.revalued_with = None
+
+    async def get_unpriced_asset_names(self, names):
+        return sorted({asset for assets in self.held.values() for asset in assets} - set(names))
+
+    async def revalue_all(self, names, prices):
+        if self.fail:
+            raise RuntimeError("db is down")
+        self.revalued_with = dict(zip(names, prices))
+        return sum(all(asset in self.revalued_with for asset in assets) for assets in self.held.values())
+
+    async def count_holding(self, names):
+        return sum(any(asset in names for asset in assets) for assets in self.held.values())
+
+
+class FakeUoW:
+    def __init__(self, portfolio: FakePortfolios):
+        self.portfolio = portfolio
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        self.committed = True
+
+
+def test_missing_assets_use_last_known_price(monkeypatch, caplog):
+    redis = FakeRedis({"delisted": {"current_price": "2.5"}})
+    monkeypatch.setattr(bulk_revaluation, "redis_client", redis)
+    uow = FakeUoW(FakePortfolios({1: ["bitcoin", "delisted"], 2: ["bitcoin", "unknown"], 3: ["bitcoin"]}))
+
+    updated = asyncio.run(BulkRevaluationService().revalue_all(uow))
+
+    assert updated == 2
+    assert uow.portfolio.revalued_with == {"bitcoin": 60000.0, "delisted": 2.5}
+    assert uow.committed
+    assert "skipped 1 portfolios" in caplog.text and "unknown" in caplog.text
+
+
+def test_lock_is_released_when_revaluation_fails(monkeypatch):
+    redis = FakeRedis({})
+    monkeypatch.setattr(bulk_revaluation, "redis_client", redis)
+    service = BulkRevaluationService()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.revalue_all(FakeUoW(FakePortfolios({1: ["bitcoin"]}, fail=True))))
+    assert redis.locks == set()
+
+    assert asyncio.run(service.revalue_all(FakeUoW(FakePortfolios({1: ["bitcoin"]})))) == 1
+    # После успешного пересчета версия заблокирована для остальных воркеров
+    assert asyncio.run(service.revalue_all(FakeUoW(FakePortfolios({1: ["bitcoin"]})))) is None
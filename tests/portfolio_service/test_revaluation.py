@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from back.portfolio_service.services.revaluation import PortfolioRevaluationQueue
+
+
+class RecordingQueue(PortfolioRevaluationQueue):
+    """Очередь без базы: вместо пересчета запоминает пачки пользователей и время"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    async def _revalue(self, user_ids):
+        self.batches.append((time.monotonic(), sorted(user_ids)))
+
+
+def test_deadline_is_debounced_and_capped():
+    queue = PortfolioRevaluationQueue(debounce_seconds=2.0, max_delay_seconds=10.0)
+
+    assert queue._deadline(first_seen=0.0, last_seen=1.0) == 3.0
+    assert queue._deadline(first_seen=0.0, last_seen=9.0) == 10.0
+
+
+def test_pop_due_takes_only_expired_users():
+    queue = PortfolioRevaluationQueue(debounce_seconds=2.0, max_delay_seconds=10.0)
+    queue._pending = {1: (0.0, 0.5), 2: (0.0, 5.0), 3: (0.0, 9.5)}
+
+    assert queue._pop_due(3.0) == [1]
+    assert sorted(queue._pending) == [2, 3]
+    assert sorted(queue._pop_due(10.0)) == [2, 3]
+
+
+def test_burst_collapses_into_one_revaluation():
+    async def scenario():
+        queue = RecordingQueue(debounce_seconds=0.05, max_delay_seconds=1.0)
+        queue.start()
+        for _ in range(5):
+            queue.enqueue(1)
+            queue.enqueue(2)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.15)
+        await queue.stop()
+        return queue.batches
+
+    batches = asyncio.run(scenario())
+    assert [user_ids for _, user_ids in batches] == [[1, 2]]
+
+
+def test_steady_requests_are_flushed_by_max_delay():
+    async def scenario():
+        queue = RecordingQueue(debounce_seconds=0.05, max_delay_seconds=0.15)
+        queue.start()
+        started = time.monotonic()
+        # Запросы чаще debounce: без max_delay пересчет не наступил бы никогда
+        while time.monotonic() - started < 0.4:
+            queue.enqueue(1)
+            await asyncio.sleep(0.02)
+        await queue.stop()
+        return started, queue.batches
+
+    started, batches = asyncio.run(scenario())
+    first_at, first_users = batches[0]
+    assert first_users == [1]
+    assert 0.15 <= first_at - started < 0.3
+    assert len(batches) >= 2
+
+
+def test_stop_flushes_pending_users():
+    async def scenario():
+        queue = RecordingQueue(debounce_seconds=10.0, max_delay_seconds=60.0)
+        queue.start()
+        queue.enqueue(7)
+        await asyncio.sleep(0)
+        await queue.stop()
+        return queue.batches
+
+    assert [user_ids for _, user_ids in asyncio.run(scenario())] == [[7]]
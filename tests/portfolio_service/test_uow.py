@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from back.portfolio_service.utils import uow as uow_module
+from back.portfolio_service.utils.uow import UnitOfWork
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """UnitOfWork поверх SQLite-файла; считает выдачи соединений из пула"""
+    # NullPool: тесты гоняют разные event loop, соединения между ними переиспользовать нельзя
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'uow.db'}", poolclass=NullPool)
+    db = SimpleNamespace(engine=engine, checkouts=0)
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(*args):
+        db.checkouts += 1
+
+    async def create_table():
+        async with engine.begin() as connection:
+            await connection.execute(text("CREATE TABLE items (name TEXT)"))
+
+    asyncio.run(create_table())
+    db.checkouts = 0
+    monkeypatch.setattr(uow_module, "engine", engine)
+    monkeypatch.setattr(uow_module, "async_session_maker",
+                        sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    yield db
+    asyncio.run(engine.dispose())
+
+
+async def insert(uow: UnitOfWork, name: str):
+    await uow.session.execute(text("INSERT INTO items (name) VALUES (:name)"), {"name": name})
+
+
+async def names(engine) -> list[str]:
+    async with engine.connect() as connection:
+        return list((await connection.execute(text("SELECT name FROM items ORDER BY name"))).scalars())
+
+
+def test_nested_blocks_share_one_session_and_connection(db):
+    async def scenario():
+        uow = UnitOfWork()
+        async with uow:
+            outer_session = uow.session
+            async with uow:
+                assert uow.session is outer_session
+                await insert(uow, "inner")
+            # Внутренний выход ничего не закрывает и не откатывает
+            assert uow.session is outer_session
+            await insert(uow, "outer")
+            await uow.commit()
+        assert uow.session is None
+        return db.checkouts
+
+    assert asyncio.run(scenario()) == 1
+    assert asyncio.run(names(db.engine)) == ["inner", "outer"]
+
+
+def test_uncommitted_work_is_rolled_back_on_outer_exit(db):
+    async def scenario():
+        uow = UnitOfWork()
+        async with uow:
+            await insert(uow, "lost")
+
+    asyncio.run(scenario())
+    assert asyncio.run(names(db.engine)) == []
+
+
+def test_exception_in_nested_block_rolls_back_uncommitted_work(db):
+    async def scenario():
+        uow = UnitOfWork()
+        async with uow:
+            await insert(uow, "kept")
+            await uow.commit()
+            with pytest.raises(RuntimeError):
+                async with uow:
+                    await insert(uow, "discarded")
+                    raise RuntimeError("boom")
+            await insert(uow, "after")
+            await uow.commit()
+
+    asyncio.run(scenario())
+    assert asyncio.run(names(db.engine)) == ["after", "kept"]
+
+
+def test_sequential_blocks_reacquire_connection(db):
+    async def scenario():
+        uow = UnitOfWork()
+        for name in ("first", "second"):
+            async with uow:
+                await insert(uow, name)
+                await uow.commit()
+        return db.checkouts
+
+    assert asyncio.run(scenario()) == 2
+    assert asyncio.run(names(db.engine)) == ["first", "second"]